@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+asyncio HTTP 클라이언트 (aiohttp)
+
+func_txy.request_get / request_post 의 async 버전.
+하나의 ClientSession(연결 풀)을 공유하고, Semaphore 로 동시 요청 수를 제한한다.
+ClientSession / Semaphore 는 만들어진 이벤트 루프에 묶이므로 루프마다 따로 만든다
+(같은 프로세스에서 asyncio.run 을 여러 번 호출해도 닫힌 루프의 세션을 쓰지 않도록).
+aiohttp 는 선택 의존성이라 실제로 async 요청을 보낼 때 import 한다.
+"""
+
+import json
+
+from requests.cookies import RequestsCookieJar
+
+from lib.rate_limit import rate_limiter
+
+CONCURRENCY = 200
+LIMIT_PER_HOST = 32
+
+
+class AsyncResponse(object):
+    """requests.Response 와 같은 방식으로 쓰는 최소 응답 객체"""
+
+    def __init__(self, status_code, url, content, headers, cookies, encoding):
+        self.status_code = status_code
+        self.url = url
+        self.content = content
+        self.headers = headers
+        self.cookies = cookies
+        self.encoding = encoding or "utf-8"
+
+    @property
+    def text(self) -> str:
+        return self.content.decode(self.encoding, errors="replace")
+
+    def json(self):
+        return json.loads(self.text)
+
+
+class AsyncClient(object):
+    def __init__(self, concurrency=CONCURRENCY, limit_per_host=LIMIT_PER_HOST, name="aio", rate_limit=None):
+        """
+        :param name: rate_limiter 클라이언트 이름 - host 별 한도를 requests 클라이언트와 따로 둠
+        :param rate_limit: 이 클라이언트의 HostLimiter 옵션 (예: {"limit": 128}, 기본 rate_limit.CLIENT_DEFAULTS)
+        """
+        self.concurrency = concurrency
+        self.limit_per_host = limit_per_host
+        self.name = name
+        if rate_limit:
+            rate_limiter.configure_client(name, **rate_limit)
+        self._sessions = {}  # event loop -> (ClientSession, Semaphore)
+
+    async def _state(self):
+        import asyncio
+
+        import aiohttp
+
+        loop = asyncio.get_running_loop()
+        state = self._sessions.get(loop)
+        if state is None or state[0].closed:
+            # 이미 닫힌 루프의 세션은 다시 쓸 수 없으므로 버림
+            for old in [old for old in self._sessions if old.is_closed()]:
+                del self._sessions[old]
+            connector = aiohttp.TCPConnector(
+                limit=self.concurrency, limit_per_host=self.limit_per_host
+            )
+            # 응답 쿠키를 저장하지 않음 - 요청마다 호출자가 쿠키를 직접 넘긴다
+            session = aiohttp.ClientSession(
+                connector=connector, cookie_jar=aiohttp.DummyCookieJar()
+            )
+            state = (session, asyncio.Semaphore(self.concurrency))
+            self._sessions[loop] = state
+        return state
+
+    async def session(self):
+        """현재 이벤트 루프의 ClientSession"""
+        return (await self._state())[0]
+
+    async def request(
+        self,
+        method,
+        url,
+        params=None,
+        data=None,
+        files=None,
+        headers=None,
+        timeout=10,
+        cookies=None,
+        proxies=None,
+    ) -> AsyncResponse:
+        import aiohttp
+
+        session, semaphore = await self._state()
+        if params:
+            params = {k: v if isinstance(v, str) else str(v) for k, v in params.items()}
+        if files:
+            data = form_data(files)
+        proxy = None
+        if proxies:
+            proxy = proxies.get("https" if url.startswith("https") else "http")
+
+        async with rate_limiter.slot(url, self.name) as slot, semaphore:
+            async with session.request(
+                method,
+                url,
+                params=params,
+                data=data,
+                headers=headers,
+                cookies=cookies,
+                proxy=proxy,
+                timeout=aiohttp.ClientTimeout(total=timeout),
+            ) as resp:
+                content = await resp.read()
+                slot.report(resp.status, content, proxied=proxy is not None)
+                jar = RequestsCookieJar()
+                for name, morsel in resp.cookies.items():
+                    jar.set(name, morsel.value)
+                return AsyncResponse(
+                    status_code=resp.status,
+                    url=str(resp.url),
+                    content=content,
+                    headers=dict(resp.headers),
+                    cookies=jar,
+                    encoding=resp.get_encoding() if content else None,
+                )
+
+    async def close(self):
+        """현재 이벤트 루프의 세션 닫기"""
+        import asyncio
+
+        state = self._sessions.pop(asyncio.get_running_loop(), None)
+        if state is not None:
+            await state[0].close()
+
+    async def __aenter__(self):
+        await self.session()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+
+def form_data(files):
+    """requests 의 files={"name": (filename, value)} 형식을 multipart FormData 로 변환"""
+    import aiohttp
+
+    form = aiohttp.FormData()
+    for key, (filename, value) in files.items():
+        if filename is None:
+            form.add_field(key, str(value))
+        else:
+            form.add_field(key, value, filename=filename)
+    return form
+
+
+_client = None
+
+
+def get_client() -> AsyncClient:
+    """프로세스 공용 AsyncClient"""
+    global _client
+    if _client is None:
+        _client = AsyncClient()
+    return _client
+
+
+async def request_post(
+    url,
+    params=None,
+    data=None,
+    files=None,
+    headers=None,
+    timeout=10,
+    cookies=None,
+    proxies=None,
+    client=None,
+):
+    client = client or get_client()
+    return await client.request(
+        "POST",
+        url,
+        params=params,
+        data=data,
+        files=files,
+        headers=headers,
+        timeout=timeout,
+        cookies=cookies,
+        proxies=proxies,
+    )
+
+
+async def request_get(
+    url, params=None, headers=None, timeout=10, cookies=None, proxies=None, client=None
+):
+    client = client or get_client()
+    return await client.request(
+        "GET",
+        url,
+        params=params,
+        headers=headers,
+        timeout=timeout,
+        cookies=cookies,
+        proxies=proxies,
+    )
@@ -2,22 +2,27 @@
 # -*- coding: utf-8 -*-
 
 
-import base64
 import json
-import re
+import logging
 from typing import Dict
 
 import requests
 from requests.cookies import RequestsCookieJar
 
+from lib import aio, payload
 from lib.ali1688.sign import Sign
+from lib.ali1688.token_manager import get_token_manager, is_token_expired, token_cookies
 from lib.func_txy import now, request_get, request_post
 
+log = logging.getLogger(__name__)
+
 
 class Ali1688(object):
     def __init__(self):
         self.t = now()
         self.app_key = "12574478"
+        # requests proxies dict (None 이면 직접 연결)
+        self.proxies = None
 
     def headers(self):
         headres = {
@@ -32,6 +37,7 @@ class Token(Ali1688):
         self.hostname = hostname
         self.token_url = f"https://{self.hostname}/h5/{self.api.lower()}/1.0/"
         self.cookies: RequestsCookieJar
+        self.token_manager = None
         super(Token, self).__init__()
 
     def get_token_params(self) -> Dict[str, str]:
@@ -50,7 +56,16 @@ class Token(Ali1688):
     def request(self) -> requests.request:
         params = self.get_token_params()
         headers = self.headers()
-        req = request_get(url=self.token_url, params=params, headers=headers)
+        req = request_get(url=self.token_url, params=params, headers=headers, proxies=self.proxies)
+        self.cookies: RequestsCookieJar = req.cookies
+        return req
+
+    async def request_async(self, client=None):
+        params = self.get_token_params()
+        headers = self.headers()
+        req = await aio.request_get(
+            url=self.token_url, params=params, headers=headers, proxies=self.proxies, client=client
+        )
         self.cookies: RequestsCookieJar = req.cookies
         return req
 
@@ -64,28 +79,78 @@ class Token(Ali1688):
 
         self.token: str = cookie_list[0]
 
-    def get_sign(self, data: str, t: int) -> str:
-        text = f"{self.token}&{t}&{self.app_key}&{data}"
+    def fetch_token_cookies(self) -> dict:
+        """새 _m_h5_tk 발급 (TokenManager 의 fetch)"""
+        token = Token(api=self.api, hostname=self.hostname)
+        token.proxies = self.proxies
+        return token.request().cookies.get_dict()
+
+    def set_token_cookies(self, cookies: dict):
+        """_m_h5_tk / _m_h5_tk_enc 교체 (다른 쿠키는 유지)"""
+        cookies = token_cookies(cookies)
+        if not isinstance(getattr(self, "cookies", None), RequestsCookieJar):
+            self.cookies = RequestsCookieJar()
+        for cookie in list(self.cookies):
+            if cookie.name in cookies:
+                self.cookies.clear(cookie.domain, cookie.path, cookie.name)
+        for name, value in cookies.items():
+            self.cookies.set(name, value)
+        self._get_token()
+
+    def renew_token(self, response_cookies) -> bool:
+        """
+        토큰 만료 응답 후 새 토큰으로 교체 (만료 응답에 새 _m_h5_tk 가 같이 오면 그것을 사용)
+        :return: 교체했으면 True
+        """
+        new_cookies = response_cookies.get_dict() if hasattr(response_cookies, "get_dict") else dict(response_cookies or {})
+        if self.token_manager is not None:
+            self.set_token_cookies(self.token_manager.invalidate(new_cookies))
+            return True
+        if new_cookies.get("_m_h5_tk"):
+            self.set_token_cookies(new_cookies)
+            return True
+        return False
+
+    def sign_prefix(self, t: int) -> str:
+        return f"{self.token}&{t}&{self.app_key}&"
+
+    def get_sign(self, data, t: int) -> str:
+        """
+        :param data: JSON 문자열 또는 sign_prefix(t) 로 md5 를 같이 계산한 payload.Payload
+        """
         sign = Sign()
+        if isinstance(data, payload.Payload):
+            if sign.backend == "fast" and data.md5 is not None:
+                # payload JSON 은 ASCII 이고 n() 이 치환하는 문자열이 없어 fast_sign 과 같은 값
+                return data.hexdigest()
+            data = data.value()
+        text = f"{self.sign_prefix(t)}{data}"
         sign_str = sign.sign(text)
         return sign_str
 
 
 class Ali1688Upload(Token):
-    def __init__(self, api: str = "mtop.1688.imageService.putImage", hostname="h5api.m.taobao.com", manual_cookie=None):
+    def __init__(self, api: str = "mtop.1688.imageService.putImage", hostname="h5api.m.taobao.com", manual_cookie=None, lazy=False):
         super(Ali1688Upload, self).__init__(api=api, hostname=hostname)
         self.upload_url = f"https://{self.hostname}/h5/{self.api.lower()}/1.0"
-        
+        self.token = ""
+
         if manual_cookie:
             # 수동 쿠키 설정
             self.cookies = RequestsCookieJar()
             self.cookies.set("_m_h5_tk", manual_cookie)
         else:
-            self.request()
-        
+            # ⭐ 토큰은 만료 시각과 함께 캐시 / 프로세스 간 공유 (생성할 때마다 발급 요청하지 않음)
+            self.token_manager = get_token_manager(self.hostname, self.fetch_token_cookies)
+            if lazy:
+                # lazy 모드: upload_async 에서 토큰 발급
+                return
+            self.set_token_cookies(self.token_manager.cookies())
+            return
+
         self._get_token()
 
-    def get_params(self, data: str, t: int, jsv: str = "2.4.11") -> Dict[str, str]:
+    def get_params(self, data, t: int, jsv: str = "2.4.11") -> Dict[str, str]:
         sign_str = self.get_sign(data=data, t=t)
         params = {
             "jsv": jsv,
@@ -100,34 +165,86 @@ class Ali1688Upload(Token):
         }
         return params
 
-    def get_data(self, filename: str) -> Dict[str, str]:
-        # get file bytes
-        with open(filename, "rb") as f:
-            b64_bytes = base64.b64encode(f.read())
-        data = json.dumps(
+    def data_template(self) -> str:
+        # payload.IMAGE_PLACEHOLDER 자리에 base64 이미지가 들어감
+        return json.dumps(
             {
-                "imageBase64": str(b64_bytes).replace("b'", "").replace("'", ""),
+                "imageBase64": payload.IMAGE_PLACEHOLDER,
                 "appName": "searchImageUpload",
                 "appKey": "pvvljh1grxcmaay2vgpe9nb68gg9ueg2",
             },
             separators=(",", ":"),
         )
-        return {"data": data}
 
-    def upload(self, filename: str) -> requests.request:
-        # upload image
+    def get_data(self, filename: str = None, b64: str = None, image: bytes = None, t: int = None) -> payload.Payload:
+        """
+        form body "data=<JSON>" - 이미지는 filename(mmap) / image(bytes) / b64(이미 인코딩된 문자열) 중 하나
+        t 를 주면 sign 용 md5 도 같이 계산
+        """
+        return payload.form_payload(
+            "data",
+            image=image,
+            filename=filename,
+            b64=b64,
+            template=self.data_template(),
+            digest_prefix=None if t is None else self.sign_prefix(t),
+        )
+
+    def _prepare_upload(self, filename: str = None, b64: str = None, image: bytes = None):
+        if self.token_manager is not None:
+            # 백그라운드로 갱신된 토큰이 있으면 반영 (메모리 캐시라 요청 없음)
+            self.set_token_cookies(self.token_manager.cookies())
         t = now()
-        data = self.get_data(filename=filename)
-        params = self.get_params(data=data.get("data", ""), t=t)
+        data = self.get_data(filename=filename, b64=b64, image=image, t=t)
+        params = self.get_params(data=data, t=t)
         headers = self.headers()
         headers["Content-Type"] = "application/x-www-form-urlencoded"
+        return params, headers, data.body
+
+    def upload(self, filename: str = None, b64: str = None, image: bytes = None, retry: bool = True, proxies=None) -> requests.request:
+        """
+        :param proxies: 이번 요청만 다른 프록시로 (hedge 요청) - 없으면 self.proxies
+        """
+        # upload image
+        params, headers, data = self._prepare_upload(filename=filename, b64=b64, image=image)
         req = request_post(
             url=self.upload_url,
             params=params,
             headers=headers,
             data=data,
             cookies=self.cookies.get_dict(),
+            proxies=proxies or self.proxies,
         )
+        # ⭐ 토큰 만료 응답이면 새 토큰으로 한 번만 다시 시도
+        if retry and is_token_expired(req.text) and self.renew_token(req.cookies):
+            log.warning("🔑 _m_h5_tk 만료 - 새 토큰으로 재시도")
+            return self.upload(filename=filename, b64=b64, image=image, retry=False, proxies=proxies)
+        return req
+
+    async def upload_async(self, filename: str = None, b64: str = None, image: bytes = None, client=None, retry: bool = True) -> aio.AsyncResponse:
+        import asyncio
+
+        if not self.token:
+            if self.token_manager is not None:
+                self.set_token_cookies(await asyncio.to_thread(self.token_manager.cookies))
+            else:
+                await self.request_async(client=client)
+                self._get_token()
+        # 파일 읽기 + base64 + sign 은 CPU 작업이라 이벤트 루프 밖에서 실행
+        params, headers, data = await asyncio.to_thread(self._prepare_upload, filename, b64, image)
+        req = await aio.request_post(
+            url=self.upload_url,
+            params=params,
+            headers=headers,
+            data=data,
+            cookies=self.cookies.get_dict(),
+            proxies=self.proxies,
+            client=client,
+        )
+        if retry and is_token_expired(req.text):
+            renewed = await asyncio.to_thread(self.renew_token, req.cookies)
+            if renewed:
+                return await self.upload_async(filename=filename, b64=b64, image=image, client=client, retry=False)
         return req
 
 
@@ -162,7 +279,7 @@ class WorldTaobao(Ali1688Upload):
         # CHANGE_USER_AGENT 환경변수가 설정되어 있으면 다른 User-Agent 사용
         if os.environ.get('CHANGE_USER_AGENT') == 'true':
             user_agent = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-            print(f"🔄 User-Agent 변경됨: {user_agent}")
+            log.info(f"🔄 User-Agent 변경됨: {user_agent}")
 
         headers = {
             "User-Agent": user_agent,
@@ -173,65 +290,47 @@ class WorldTaobao(Ali1688Upload):
         return headers
 
     def _load_all_cookies_from_file(self):
-        """쿠키 파일에서 모든 타오바오 쿠키 읽어서 세션에 설정"""
-        import json
-        import os
+        """쿠키 파일에서 모든 타오바오 쿠키 읽어서 세션에 설정 (파싱 결과는 cookie_store 가 캐시)"""
+        from lib.cookie_store import get_cookie_store
 
-        cookie_file_path = os.path.expanduser(r"~\AppData\Roaming\Predvia\taobao_cookies.json")
-
-        if not os.path.exists(cookie_file_path):
-            print("⚠️ 쿠키 파일을 찾을 수 없음 - 기본 쿠키만 사용")
+        store = get_cookie_store()
+        if not store.has_saved_cookies():
+            log.warning("⚠️ 쿠키 파일을 찾을 수 없음 - 기본 쿠키만 사용")
             return
 
         try:
-            print("🔍 쿠키 파일에서 토큰 찾는 중...")
-            print(f"📁 쿠키 파일 경로: {cookie_file_path}")
+            log.debug("🔍 쿠키 파일에서 토큰 찾는 중...")
+            log.debug(f"📁 쿠키 파일 경로: {store.saved_path}")
 
-            with open(cookie_file_path, 'r', encoding='utf-8') as f:
-                saved_cookies = json.load(f)
+            saved_jar = store.jar("saved")
 
-            print(f"✅ 쿠키 파일 발견!")
+            log.info(f"✅ 쿠키 파일 발견!")
 
             # _m_h5_tk 토큰 확인 (이미 설정되어 있음)
-            if '_m_h5_tk' in saved_cookies:
-                token = saved_cookies['_m_h5_tk']
-                print(f"🔑 쿠키 파일에서 토큰 발견: {token[:20]}...")
+            token = store.saved_cookies().get('_m_h5_tk')
+            if token:
+                log.info(f"🔑 쿠키 파일에서 토큰 발견: {token[:20]}...")
 
-            # 모든 타오바오 쿠키를 세션에 설정
-            print("🍪 모든 타오바오 쿠키를 세션에 설정 중...")
-            for cookie_name, cookie_value in saved_cookies.items():
-                if cookie_value:  # 값이 있는 쿠키만 설정
-                    self.cookies.set(cookie_name, cookie_value, domain='.taobao.com')
-                    print(f"🔧 쿠키 설정: {cookie_name}")
+            # 모든 타오바오 쿠키를 세션에 설정 (공용 jar 는 그대로 두고 복사)
+            log.debug("🍪 모든 타오바오 쿠키를 세션에 설정 중...")
+            self.cookies.update(saved_jar)
 
-            print(f"✅ 총 {len(saved_cookies)}개 쿠키 설정 완료")
+            log.info(f"✅ 총 {len(saved_jar)}개 쿠키 설정 완료")
 
         except Exception as e:
-            print(f"⚠️ 쿠키 파일 로드 오류: {e}")
+            log.warning(f"⚠️ 쿠키 파일 로드 오류: {e}")
 
     def _create_session(self):
         """타오바오 세션 생성"""
-        import sqlite3
-        import os
-        
+        from lib.cookie_store import get_cookie_store
+
         session = requests.Session()
-        cookie_path = os.path.expanduser(r"~\AppData\Local\Google\Chrome\User Data\Default\Network\Cookies")
-        
         try:
-            conn = sqlite3.connect(cookie_path)
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT name, value FROM cookies 
-                WHERE host_key LIKE '%taobao%' AND value != ''
-            """)
-            
-            for name, value in cursor.fetchall():
-                session.cookies.set(name, value, domain='.taobao.com')
-            
-            conn.close()
-        except:
+            # Chrome 쿠키 DB 는 복사 없이 읽기 전용으로 열고, 파일이 그대로면 캐시 사용
+            session.cookies.update(get_cookie_store().jar("chrome"))
+        except Exception:
             pass
-        
+
         # User-Agent 설정 (환경변수로 변경 가능)
         import os
         user_agent = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
@@ -239,7 +338,7 @@ class WorldTaobao(Ali1688Upload):
         # CHANGE_USER_AGENT 환경변수가 설정되어 있으면 다른 User-Agent 사용
         if os.environ.get('CHANGE_USER_AGENT') == 'true':
             user_agent = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-            print(f"🔄 User-Agent 변경됨: {user_agent}")
+            log.info(f"🔄 User-Agent 변경됨: {user_agent}")
 
         session.headers.update({
             'User-Agent': user_agent,
@@ -248,17 +347,10 @@ class WorldTaobao(Ali1688Upload):
         
         return session
 
-    def get_data(self, filename: str) -> Dict[str, str]:
-        # get file bytes
-        with open(filename, "rb") as f:
-            b64_bytes = base64.b64encode(f.read())
-
-        # ⭐ Base64 문자열 변환 (패딩은 끝에만 있으므로 rstrip 사용)
-        strimg = b64_bytes.decode('ascii').rstrip('=')
-
+    def data_template(self) -> str:
         params = json.dumps(
             {
-                "strimg": strimg,
+                "strimg": payload.IMAGE_PLACEHOLDER,
                 "pcGraphSearch": True,
                 "sortOrder": 0,
                 "tab": "all",
@@ -266,16 +358,71 @@ class WorldTaobao(Ali1688Upload):
             },
             separators=(",", ":"),
         )
+        # params 는 JSON 안의 JSON 문자열 (base64 는 escape 할 문자가 없어 placeholder 그대로 남음)
+        return json.dumps({"params": params, "appId": "34850"}, separators=(",", ":"), )
+
+    def get_data(self, filename: str = None, b64: str = None, image: bytes = None, t: int = None) -> payload.Payload:
+        # ⭐ Base64 패딩('=')은 끝에만 있으므로 마지막 조각에서만 제거
+        return payload.form_payload(
+            "data",
+            image=image,
+            filename=filename,
+            b64=b64,
+            template=self.data_template(),
+            strip_padding=True,
+            digest_prefix=None if t is None else self.sign_prefix(t),
+        )
 
-        data = json.dumps({"params": params, "appId": "34850"}, separators=(",", ":"), )
-
-        return {"data": data}
+    def get_search_url(self, image_id: str, page: int = 1) -> str:
+        url = f"https://s.taobao.com/search?imgfile=&commend=all&ssid=s5-e&search_type=item&sourceId=tb.index&spm=a21bo.jianhua.201856-taobao-item.1&ie=utf8&initiative_id=tbindexz_20170306&imageId={image_id}"
+        if page > 1:
+            from lib.taobao_search import page_offset
+            url += f"&s={page_offset(page)}"
+        return url
 
-    def search(self, image_id: str):
+    def search(self, image_id: str, proxies=None):
         """이미지 ID로 상품 검색"""
-        search_url = f"https://s.taobao.com/search?imgfile=&commend=all&ssid=s5-e&search_type=item&sourceId=tb.index&spm=a21bo.jianhua.201856-taobao-item.1&ie=utf8&initiative_id=tbindexz_20170306&imageId={image_id}"
         headers = self.headers()
-        return request_get(url=search_url, headers=headers)
+        return request_get(url=self.get_search_url(image_id), headers=headers, proxies=proxies or self.proxies)
+
+    async def search_async(self, image_id: str, client=None):
+        headers = self.headers()
+        return await aio.request_get(
+            url=self.get_search_url(image_id), headers=headers, proxies=self.proxies, client=client
+        )
+
+    def search_page_items(self, image_id: str, page: int, proxies=None) -> list:
+        """검색 결과 page 페이지의 상품 dict 목록"""
+        from lib.taobao_search import parse_items
+
+        req = request_get(url=self.get_search_url(image_id, page), headers=self.headers(), proxies=proxies or self.proxies)
+        return parse_items(req.text)
+
+    def search_pages(self, image_id: str, max_items: int = None, max_pages: int = None, window: int = None, min_similarity: float = None, fetch_page=None):
+        """
+        결과 여러 페이지를 동시에 받아 (page, items) 를 페이지 순서대로 yield
+        :param max_items: 필요한 상품 수 (기본 200) - 페이지 예산은 이 수를 채우는 만큼
+        :param max_pages: 이미지당 최대 페이지 수
+        :param window: 동시에 요청하는 페이지 수
+        :param min_similarity: 이 유사도 아래 상품이 나오면 멈춤 (유사도 필드가 있을 때)
+        :param fetch_page: fetch_page(page) -> 상품 목록 (기본 search_page_items, hedge 를 씌울 때 교체)
+        """
+        from lib import taobao_search
+
+        max_items = max_items or taobao_search.MAX_ITEMS
+        pages = taobao_search.page_count(max_items, max_pages)
+        count = 0
+        for page, items in taobao_search.prefetch_pages(
+            fetch_page or (lambda p: self.search_page_items(image_id, p)),
+            pages,
+            window=window or taobao_search.PAGE_WINDOW,
+            min_similarity=min_similarity,
+        ):
+            items = items[: max_items - count]
+            count += len(items)
+            yield page, items
+            if count >= max_items:
+                return
 
 
 class Ali1688ImageSearch(Ali1688):
@@ -293,6 +440,16 @@ class Ali1688ImageSearch(Ali1688):
         req = request_get(url=self.url, params=params, headers=headers)
         return req
 
-    def check_goods(self, html: str):
-        # todo
-        re.findall(r"window.data.offerresultData = successDataCheck\(.*?\)", html)
+    async def request_async(self, image_id: str, client=None) -> aio.AsyncResponse:
+        params = self.get_params(image_id=image_id)
+        headers = self.headers()
+        req = await aio.request_get(
+            url=self.url, params=params, headers=headers, client=client
+        )
+        return req
+
+    def check_goods(self, html: str) -> list:
+        """검색 결과 페이지의 window.data.offerresultData -> 상품 목록 (lib.ali1688.offers.normalize_offer 형식)"""
+        from lib.ali1688.offers import extract_offers
+
+        return extract_offers(html)
@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+1688 이미지 검색 결과 페이지에서 상품 목록 추출
+
+페이지 안의 스크립트
+
+    window.data.offerresultData = successDataCheck({...});
+
+에서 {...} 부분만 잘라 json.loads 한다 (DOM 파싱 없음).
+marker 는 str.find 로 찾고, 끝 위치는 정규식 토큰(문자열 리터럴 통째로 / 중괄호) 한 번 훑기로
+중괄호 짝을 맞춰 찾는다 - 문자열 안의 { } 와 \\" 는 건너뛰므로 글자 단위 Python 루프가 없다.
+"""
+
+import json
+import re
+
+MARKER = "window.data.offerresultData"
+# 문자열 리터럴 전체 또는 중괄호 하나
+_TOKEN = re.compile(r'"[^"\\]*(?:\\.[^"\\]*)*"|[{}]')
+
+
+def find_payload(html: str, marker: str = MARKER):
+    """marker 뒤 첫 {...} 의 (start, end) - 없거나 닫히지 않았으면 None"""
+    pos = html.find(marker)
+    if pos < 0:
+        return None
+    start = html.find("{", pos + len(marker))
+    if start < 0:
+        return None
+
+    depth = 0
+    for token in _TOKEN.finditer(html, start):
+        ch = token.group()
+        if ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+            if depth == 0:
+                return start, token.end()
+    return None
+
+
+def extract_payload(html: str, marker: str = MARKER):
+    """offerresultData JSON (없거나 JSON 이 아니면 None)"""
+    span = find_payload(html, marker)
+    if span is None:
+        return None
+    try:
+        return json.loads(html[span[0]:span[1]])
+    except ValueError:
+        return None
+
+
+def _first(source: dict, *paths, default=None):
+    """점(.)으로 이은 경로 중 처음으로 값이 있는 것"""
+    for path in paths:
+        value = source
+        for key in path.split("."):
+            if not isinstance(value, dict):
+                value = None
+                break
+            value = value.get(key)
+        if value not in (None, "", [], {}):
+            return value
+    return default
+
+
+def _number(value, cast=float):
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return cast(value)
+    digits = re.search(r"\d+(?:\.\d+)?", str(value))
+    return cast(float(digits.group())) if digits else None
+
+
+def _offer_list(payload):
+    """payload 안의 상품 목록 (페이지 버전마다 위치가 달라서 알려진 위치를 차례로 확인)"""
+    if isinstance(payload, list):
+        return payload
+    offers = _first(payload, "data.offerList", "offerList", "data.data.offerList", "data.items", "items")
+    return offers if isinstance(offers, list) else []
+
+
+def price_tiers(offer: dict):
+    """[(최소 수량, 단가), ...] 수량 오름차순"""
+    tiers = _first(
+        offer,
+        "tradePrice.offerPrice.quantityPrices",
+        "tradePrice.quantityPrices",
+        "priceInfo.quantityPrices",
+        "quantityPrices",
+        default=[],
+    )
+    result = []
+    for tier in tiers if isinstance(tiers, list) else []:
+        if not isinstance(tier, dict):
+            continue
+        quantity = _number(_first(tier, "quantity", "beginAmount", "startQuantity"), int)
+        price = _number(_first(tier, "valueString", "price", "value"))
+        if price is not None:
+            result.append((quantity or 1, price))
+    if not result:
+        price = _number(_first(offer, "tradePrice.offerPrice.valueString", "priceInfo.price", "price"))
+        if price is not None:
+            result.append((1, price))
+    return sorted(result)
+
+
+def normalize_offer(offer: dict) -> dict:
+    offer_id = _first(offer, "id", "offerId", "information.id")
+    tiers = price_tiers(offer)
+    moq = _number(_first(offer, "tradeQuantity.quantityBegin", "quantityBegin", "moq", "minOrderQuantity"), int)
+    if moq is None and tiers:
+        moq = tiers[0][0]
+    return {
+        "offer_id": str(offer_id) if offer_id is not None else None,
+        "title": _first(offer, "information.subject", "subject", "title"),
+        "price_tiers": tiers,
+        "moq": moq,
+        "seller": _first(offer, "company.name", "company.shopName", "companyName", "sellerName", "loginId"),
+        "image_url": _first(offer, "image.imgUrl", "image.imgUrlOf290x290", "imageUrl", "imgUrl", "offerPicUrl"),
+        "url": _first(offer, "information.detailUrl", "detailUrl", "odUrl")
+        or (f"https://detail.1688.com/offer/{offer_id}.html" if offer_id else None),
+    }
+
+
+def extract_offers(html: str) -> list:
+    """검색 결과 페이지 -> 정규화된 상품 목록 (offerresultData 가 없으면 빈 목록)"""
+    payload = extract_payload(html)
+    if payload is None:
+        return []
+    return [normalize_offer(offer) for offer in _offer_list(payload) if isinstance(offer, dict)]
@@ -3,8 +3,13 @@
 
 
 import ctypes
+import hashlib
+import os
 import struct
 
+# sign 구현 선택: "fast" (hashlib) / "reference" (원래 순수 파이썬 구현)
+BACKEND = os.environ.get("SIGN_BACKEND", "fast")
+
 
 def struct_format(num):
     if num > 0:
@@ -40,10 +45,33 @@ def unsigned_right_shitf(n, i):
     return int_overflow(n >> i)
 
 
+def fast_sign(a):
+    """
+    hashlib.md5 로 계산한 sign - Sign.reference_sign 과 byte 단위로 같은 결과
+    Sign.n() 은 BMP 문자(lone surrogate 포함)에 대해 UTF-8(surrogatepass) 인코딩과 같다.
+    BMP 밖 문자는 n() 이 255 보다 큰 값을 만들어 표준 MD5 와 달라지므로 None 을 반환한다.
+    """
+    a = a.replace(r"/\r\n/g", "\n")
+    if a.isascii():
+        data = a.encode("ascii")
+    elif max(map(ord, a)) > 0xFFFF:
+        return None
+    else:
+        data = a.encode("utf-8", "surrogatepass")
+    return hashlib.md5(data).hexdigest()
+
+
 class Sign(object):
     # 1688 upload image sign upload
-    def __init__(self):
-        pass
+    def __init__(self, backend=None):
+        self.backend = backend or BACKEND
+
+    def sign(self, a):
+        if self.backend == "fast":
+            res = fast_sign(a)
+            if res is not None:
+                return res
+        return self.reference_sign(a)
 
     def b(self, a, b):
         return struct_format(left_shift(a, b) | unsigned_right_shitf(a, 32 - b))
@@ -148,7 +176,7 @@ class Sign(object):
                     b += chr(63 & d | 128)
         return b
 
-    def sign(self, a):
+    def reference_sign(self, a):
         o = p = q = r = s = t = u = v = w = ""
         x = []
         y = 7
@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+mtop _m_h5_tk 토큰 관리
+
+_m_h5_tk 쿠키 값은 "<token>_<만료 시각(ms)>" 형태라 만료 시각을 바로 알 수 있다.
+발급받은 쿠키(_m_h5_tk, _m_h5_tk_enc)를 만료 시각과 함께
+
+  - 프로세스 메모리에 캐시하고 만료 REFRESH_MARGIN 초 전에 백그라운드 스레드로 갱신,
+  - data/tokens.json 에 저장해 다른 프로세스(C# 이 띄우는 run.py 등)와 공유한다.
+
+파일은 .lock 파일을 잡고 읽고 쓰므로 여러 프로세스가 동시에 시작해도 발급은 한 번만 한다.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+
+DEFAULT_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data", "tokens.json"
+)
+log = logging.getLogger(__name__)
+
+# 만료 이만큼 전에 새로 발급 (초)
+REFRESH_MARGIN = 120
+TOKEN_COOKIES = ("_m_h5_tk", "_m_h5_tk_enc")
+# 토큰 만료 응답 - 응답 쿠키로 새 토큰이 같이 내려온다
+EXPIRED_CODES = ("FAIL_SYS_TOKEN_EXOIRED", "FAIL_SYS_TOKEN_EXPIRED", "FAIL_SYS_TOKEN_EMPTY")
+
+
+def token_expires_at(cookies: dict) -> float:
+    """_m_h5_tk 의 만료 시각 (초), 알 수 없으면 0"""
+    value = cookies.get("_m_h5_tk") or ""
+    _, _, suffix = value.rpartition("_")
+    try:
+        return int(suffix) / 1000
+    except ValueError:
+        return 0.0
+
+
+def token_cookies(cookies: dict) -> dict:
+    """토큰 쿠키만 추출"""
+    return {name: cookies[name] for name in TOKEN_COOKIES if cookies.get(name)}
+
+
+def is_token_expired(text: str) -> bool:
+    """mtop 응답 본문이 토큰 만료/없음 오류인지"""
+    return any(code in text for code in EXPIRED_CODES)
+
+
+class _FileLock(object):
+    """프로세스 간 배타 잠금 (Windows: msvcrt, 그 외: fcntl)"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    def __enter__(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._file = open(self.path, "a+b")
+        if os.name == "nt":
+            import msvcrt
+
+            self._file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK 은 10초 뒤 실패하므로 다시 시도
+                    continue
+        else:
+            import fcntl
+
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            if os.name == "nt":
+                import msvcrt
+
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                import fcntl
+
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        finally:
+            self._file.close()
+            self._file = None
+
+
+class TokenManager(object):
+    def __init__(self, key: str, fetch, path=DEFAULT_PATH, refresh_margin: float = REFRESH_MARGIN, background: bool = True):
+        """
+        :param key: 토큰 구분 (mtop hostname)
+        :param fetch: fetch() -> {"_m_h5_tk": ..., "_m_h5_tk_enc": ...} 새 토큰 발급 (네트워크)
+        :param path: 프로세스 간 공유 파일 (None 이면 메모리만)
+        :param background: 만료 전에 백그라운드 스레드로 미리 갱신
+        """
+        self.key = key
+        self.fetch = fetch
+        self.path = path
+        self.refresh_margin = refresh_margin
+        self.background = background
+        self._cookies = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+        self._timer = None
+
+    def _fresh(self, expires_at: float) -> bool:
+        return expires_at - self.refresh_margin > time.time()
+
+    def _read_file(self):
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_file(self, data: dict):
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
+
+    def _store(self, cookies: dict):
+        self._cookies = cookies
+        self._expires_at = token_expires_at(self._cookies)
+        self._schedule()
+
+    def _load_or_fetch(self, force: bool = False):
+        """파일 잠금 안에서: 다른 프로세스가 받아 둔 토큰이 유효하면 사용, 아니면 새로 발급"""
+        if not self.path:
+            self._store(self.fetch())
+            return
+        with _FileLock(f"{self.path}.lock"):
+            data = self._read_file()
+            entry = data.get(self.key) or {}
+            cookies = token_cookies(entry.get("cookies") or {})
+            expires_at = token_expires_at(cookies)
+            if force and cookies == self._cookies:
+                # 지금 쓰던 토큰이 거절됨 - 파일에 있는 것도 같은 토큰이면 새로 발급
+                expires_at = 0.0
+            if not self._fresh(expires_at):
+                cookies = token_cookies(self.fetch())
+                if not cookies.get("_m_h5_tk"):
+                    raise Exception("cookie not found _m_h5_tk")
+                data[self.key] = {"cookies": cookies, "fetched_at": time.time()}
+                self._write_file(data)
+            self._store(cookies)
+
+    def cookies(self) -> dict:
+        """유효한 토큰 쿠키 (메모리 -> 공유 파일 -> 새 발급 순)"""
+        with self._lock:
+            if self._cookies is None or not self._fresh(self._expires_at):
+                self._load_or_fetch()
+            return dict(self._cookies)
+
+    def invalidate(self, new_cookies: dict = None):
+        """
+        토큰 만료 응답을 받았을 때 호출
+        :param new_cookies: 만료 응답에 같이 온 새 쿠키 (있으면 발급 요청 없이 바로 사용, 공유 파일에도 저장)
+        """
+        with self._lock:
+            if new_cookies and new_cookies.get("_m_h5_tk") and self._fresh(token_expires_at(new_cookies)):
+                cookies = token_cookies(new_cookies)
+                if self.path:
+                    with _FileLock(f"{self.path}.lock"):
+                        data = self._read_file()
+                        data[self.key] = {"cookies": cookies, "fetched_at": time.time()}
+                        self._write_file(data)
+                self._store(cookies)
+            else:
+                self._load_or_fetch(force=True)
+            return dict(self._cookies)
+
+    def _schedule(self):
+        if not self.background or not self._expires_at:
+            return
+        if self._timer is not None:
+            self._timer.cancel()
+        delay = max(self._expires_at - self.refresh_margin - time.time(), 1)
+        self._timer = threading.Timer(delay, self._refresh)
+        # 한 번 실행하고 끝나는 CLI 가 종료를 기다리지 않도록 daemon
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _refresh(self):
+        try:
+            with self._lock:
+                self._load_or_fetch()
+        except Exception as e:
+            log.warning(f"⚠️ _m_h5_tk 백그라운드 갱신 실패: {e}")
+
+
+_managers = {}
+_managers_lock = threading.Lock()
+
+
+def get_token_manager(key: str, fetch) -> TokenManager:
+    """프로세스 공용 TokenManager (key 별 하나)"""
+    with _managers_lock:
+        if key not in _managers:
+            _managers[key] = TokenManager(key, fetch)
+        return _managers[key]
@@ -5,8 +5,13 @@ import os.path
 import pathlib
 import time
 
+from lib import aio
+from lib.breaker import breakers
 from lib.func_txy import get_random_str, request_get, request_post
 
+# ossUploadSecretKeyDataService 가 계속 실패하면 업로드마다 timeout 을 기다리지 않고 바로 실패
+SIGN_BREAKER = "alibaba:sign"
+
 
 class Alibaba(object):
     def __init__(self):
@@ -34,6 +39,17 @@ class Sign(Alibaba):
         req = request_get(url=self.sign_url, headers=self.headers)
         return req
 
+    def signed(self) -> dict:
+        """서명 응답 (data 가 없으면 서명 API 실패로 기록)"""
+        sign_req = self.sign().json()
+        if not sign_req.get("data", ""):
+            raise Exception("get sign error")
+        return sign_req
+
+    async def sign_async(self, client=None):
+        req = await aio.request_get(url=self.sign_url, headers=self.headers, client=client)
+        return req
+
 
 class Upload(Sign):
     """
@@ -55,9 +71,12 @@ class Upload(Sign):
         )
         return image_key
 
-    def get_requst_params(self, filename: str):
-        sign_req = self.sign()
-        sign_req = sign_req.json()
+    def get_requst_params(self, filename: str, bytestream: bytes = None):
+        # 로컬 파일 오류는 서명 API 실패로 세지 않도록 build_files 는 breaker 밖에서
+        sign_req = breakers.call(SIGN_BREAKER, self.signed)
+        return self.build_files(filename=filename, sign_req=sign_req, bytestream=bytestream)
+
+    def build_files(self, filename: str, sign_req: dict, bytestream: bytes = None):
         if not sign_req.get("data", ""):
             raise Exception("get sign error")
         data = sign_req.get("data", "")
@@ -79,10 +98,11 @@ class Upload(Sign):
         )
         name = get_random_str(5) + file_extension
 
-        if os.path.exists(filename):
-            bytestream = open(filename, "rb").read()
-        else:
-            raise Exception(f"not found {filename}")
+        if bytestream is None:
+            if os.path.exists(filename):
+                bytestream = open(filename, "rb").read()
+            else:
+                raise Exception(f"not found {filename}")
 
         files = {
             "name": (None, name),
@@ -96,14 +116,33 @@ class Upload(Sign):
         }
         return files, url, image_key
 
-    def upload(self, filename: str):
-        files, url, image_key = self.get_requst_params(filename=filename)
+    def upload(self, filename: str, bytestream: bytes = None):
+        files, url, image_key = self.get_requst_params(
+            filename=filename, bytestream=bytestream
+        )
         req = request_post(url, files=files, headers=self.headers)
         if not req.text:
             return image_key
         else:
             raise Exception("upload image failed")
 
+    async def upload_async(self, filename: str, bytestream: bytes = None, client=None):
+        import asyncio
+
+        async def signed():
+            sign_req = (await self.sign_async(client=client)).json()
+            if not sign_req.get("data", ""):
+                raise Exception("get sign error")
+            return sign_req
+
+        sign_req = await breakers.get(SIGN_BREAKER).call_async(signed)
+        files, url, image_key = await asyncio.to_thread(self.build_files, filename, sign_req, bytestream)
+        req = await aio.request_post(url, files=files, headers=self.headers, client=client)
+        if not req.text:
+            return image_key
+        else:
+            raise Exception("upload image failed")
+
 
 class ImageSearch(Alibaba):
     def __init__(self):
@@ -123,3 +162,14 @@ class ImageSearch(Alibaba):
         params = self.params(image_key=image_key)
         req = request_get(url=self.search_url, params=params, headers=self.headers)
         return req
+
+    async def search_async(self, image_key: str, client=None):
+        params = self.params(image_key=image_key)
+        req = await aio.request_get(
+            url=self.search_url, params=params, headers=self.headers, client=client
+        )
+        return req
+
+
+# circuit breaker probe - 서명 API 가 data 를 돌려주는지
+breakers.register_probe(SIGN_BREAKER, lambda: Sign().signed())
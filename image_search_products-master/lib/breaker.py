@@ -0,0 +1,309 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+마켓 / endpoint 별 circuit breaker
+
+알리바바 ossUploadSecretKeyDataService 나 이우고 홈페이지 token 같은 endpoint 가 죽으면
+작업마다 그 마켓에서 timeout 을 다 기다리게 된다. endpoint 마다
+
+  CLOSED     정상 - 최근 window 초 동안 호출이 min_calls 개 이상이고 실패율이 failure_rate 이상이면 OPEN
+  OPEN       호출하지 않고 바로 CircuitOpenError (마켓은 건너뜀) - open_for 초 뒤 HALF_OPEN
+  HALF_OPEN  probe 요청 하나만 통과 - 성공하면 CLOSED, 실패하면 다시 OPEN (open_for 는 2배씩, 최대 max_open_for)
+
+probe 는 open_for 가 지난 뒤 들어온 첫 요청이고, 작업자 모드 / 서버에서는 start_prober 가
+등록된 가벼운 요청(register_probe)으로 주기적으로 확인한다.
+
+C# 이 검색마다 프로세스를 새로 띄우므로 상태는 data/breakers.json 에 저장해 다음 실행에서 이어 쓴다.
+여러 프로세스가 동시에 끝나도 서로 덮어쓰지 않도록 파일 잠금 안에서 다시 읽고 breaker 마다 합친다
+(상태는 더 나중에 바뀐 쪽, 호출 기록은 양쪽을 합쳐서).
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+
+from lib.ali1688.token_manager import _FileLock
+
+DEFAULT_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "breakers.json"
+)
+
+log = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+WINDOW = 300.0
+MIN_CALLS = 3
+FAILURE_RATE = 0.5
+OPEN_FOR = 60.0
+MAX_OPEN_FOR = 600.0
+PROBE_INTERVAL = 15.0
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, key: str, retry_in: float):
+        super(CircuitOpenError, self).__init__(f"circuit open: {key} (retry in {retry_in:.0f}s)")
+        self.key = key
+        self.retry_in = retry_in
+
+
+class CircuitBreaker(object):
+    def __init__(self, key: str, window: float = WINDOW, min_calls: int = MIN_CALLS, failure_rate: float = FAILURE_RATE,
+                 open_for: float = OPEN_FOR, max_open_for: float = MAX_OPEN_FOR, clock=time.time):
+        """
+        :param window: 실패율을 볼 최근 시간 (초)
+        :param open_for: OPEN 유지 시간 (초) - probe 가 실패할 때마다 2배
+        :param clock: 테스트용 (기본 time.time - 파일에 저장하므로 wall clock)
+        """
+        self.key = key
+        self.window = window
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.base_open_for = open_for
+        self.max_open_for = max_open_for
+        self.clock = clock
+        self.state = CLOSED
+        self.open_for = open_for
+        self.open_until = 0.0
+        self.changed_at = 0.0
+        self.calls = deque()  # (time, ok)
+        self._new_calls = []  # 마지막 저장 뒤 이 프로세스에서 기록한 호출
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def _prune(self, now: float):
+        while self.calls and self.calls[0][0] < now - self.window:
+            self.calls.popleft()
+
+    def _open(self, now: float):
+        self.state = OPEN
+        self.changed_at = now
+        self.open_until = now + self.open_for
+        log.warning(f"🔌 [{self.key}] circuit open - {self.open_for:.0f}초 동안 요청하지 않음")
+
+    def retry_in(self) -> float:
+        return max(0.0, self.open_until - self.clock())
+
+    def allow(self) -> bool:
+        """지금 요청해도 되는지 (HALF_OPEN 이면 probe 하나만 True)"""
+        with self._lock:
+            if self.state == CLOSED:
+                return True
+            if self.state == OPEN and self.clock() >= self.open_until:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record(self, ok: bool):
+        with self._lock:
+            now = self.clock()
+            if self.state == HALF_OPEN:
+                self._probing = False
+                if ok:
+                    log.info(f"🔌 [{self.key}] probe 성공 - circuit closed")
+                    self.state = CLOSED
+                    self.changed_at = now
+                    self.open_for = self.base_open_for
+                    self.calls.clear()
+                else:
+                    self.open_for = min(self.max_open_for, self.open_for * 2)
+                    self._open(now)
+                return
+            if self.state == OPEN:
+                # OPEN 전에 보낸 요청의 결과 - 상태는 그대로
+                return
+            self.calls.append((now, ok))
+            self._new_calls.append((now, ok))
+            self._prune(now)
+            failures = sum(1 for _, call_ok in self.calls if not call_ok)
+            if len(self.calls) >= self.min_calls and failures / len(self.calls) >= self.failure_rate:
+                self._open(now)
+
+    def call(self, fn, *args, **kwargs):
+        """fn 실행 - OPEN 이면 바로 CircuitOpenError, 예외가 나면 실패로 기록"""
+        if not self.allow():
+            raise CircuitOpenError(self.key, self.retry_in())
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self.record(False)
+            raise
+        self.record(True)
+        return result
+
+    async def call_async(self, fn, *args, **kwargs):
+        """call 의 async 버전 (fn 은 coroutine 함수)"""
+        if not self.allow():
+            raise CircuitOpenError(self.key, self.retry_in())
+        try:
+            result = await fn(*args, **kwargs)
+        except Exception:
+            self.record(False)
+            raise
+        self.record(True)
+        return result
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            now = self.clock()
+            self._prune(now)
+            failures = sum(1 for _, ok in self.calls if not ok)
+            return {
+                "state": self.state,
+                "calls": len(self.calls),
+                "failures": failures,
+                "retry_in": round(max(0.0, self.open_until - now), 1) if self.state != CLOSED else 0,
+            }
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "state": OPEN if self.state == HALF_OPEN else self.state,
+                "open_for": self.open_for,
+                "open_until": self.open_until,
+                "changed_at": self.changed_at,
+                "calls": list(self.calls),
+            }
+
+    def merge(self, saved: dict) -> dict:
+        """
+        파일에 있는 (다른 프로세스가 저장한) 상태와 합친 저장용 dict
+        상태는 더 나중에 바뀐 쪽, 호출 기록은 파일 기록 + 이 프로세스의 새 호출 (마지막 상태 변경 이후만)
+        """
+        mine = self.to_dict()
+        with self._lock:
+            new_calls, self._new_calls = self._new_calls, []
+        saved = saved or {}
+        merged = dict(saved) if saved.get("changed_at", 0.0) > mine["changed_at"] else mine
+        oldest = max(merged.get("changed_at", 0.0), self.clock() - self.window)
+        calls = [tuple(call) for call in saved.get("calls", ())] + new_calls
+        merged["calls"] = sorted(call for call in set(calls) if call[0] >= oldest)
+        return merged
+
+    def restore(self, saved: dict):
+        with self._lock:
+            self.state = saved.get("state", CLOSED)
+            self.open_for = saved.get("open_for", self.base_open_for)
+            self.open_until = saved.get("open_until", 0.0)
+            self.changed_at = saved.get("changed_at", 0.0)
+            self.calls = deque(tuple(call) for call in saved.get("calls", ()))
+            self._prune(self.clock())
+
+
+class Breakers(object):
+    """key ("alibaba:sign", "yiwugo:token" ...) -> CircuitBreaker"""
+
+    def __init__(self, path=DEFAULT_PATH, **defaults):
+        """
+        :param path: 상태 저장 파일 (None 이면 저장 안 함)
+        """
+        self.path = path
+        self.defaults = defaults
+        self._breakers = {}
+        self._probes = {}
+        self._saved = None
+        self._lock = threading.Lock()
+        self._prober = None
+
+    def get(self, key: str) -> CircuitBreaker:
+        breaker = self._breakers.get(key)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.get(key)
+                if breaker is None:
+                    breaker = CircuitBreaker(key, **self.defaults)
+                    saved = self._load().get(key)
+                    if saved:
+                        breaker.restore(saved)
+                    self._breakers[key] = breaker
+        return breaker
+
+    def call(self, key: str, fn, *args, **kwargs):
+        return self.get(key).call(fn, *args, **kwargs)
+
+    def configure(self, **defaults):
+        """기본값 변경 (새 key 부터 적용)"""
+        with self._lock:
+            self.defaults.update(defaults)
+
+    def snapshot(self) -> dict:
+        return {key: breaker.snapshot() for key, breaker in list(self._breakers.items())}
+
+    def register_probe(self, key: str, probe):
+        """probe() - 해당 endpoint 에 보내는 가벼운 요청 (실패하면 예외)"""
+        self._probes[key] = probe
+
+    def probe_due(self):
+        """OPEN 시간이 지난 breaker 마다 등록된 probe 를 실행"""
+        for key, probe in list(self._probes.items()):
+            breaker = self._breakers.get(key)
+            if breaker is None or breaker.state == CLOSED or breaker.retry_in() > 0:
+                continue
+            try:
+                breaker.call(probe)
+            except CircuitOpenError:
+                pass
+            except Exception as e:
+                log.info(f"🔌 [{key}] probe 실패: {e}")
+
+    def start_prober(self, interval: float = PROBE_INTERVAL):
+        """작업자 모드 / 서버용 - 주기적으로 probe_due (daemon 스레드)"""
+        if self._prober is not None:
+            return
+
+        def loop():
+            while True:
+                time.sleep(interval)
+                self.probe_due()
+
+        self._prober = threading.Thread(target=loop, name="breaker-probe", daemon=True)
+        self._prober.start()
+
+    def _read_file(self) -> dict:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f).get("breakers", {})
+        except (OSError, ValueError, AttributeError) as e:
+            log.warning(f"⚠️ circuit breaker 상태 파일 로드 실패: {e}")
+            return {}
+
+    def _load(self) -> dict:
+        """잠금 안에서: 저장된 상태 (처음 한 번만 읽음)"""
+        if self._saved is None:
+            self._saved = {}
+            if self.path:
+                atexit.register(self.save)
+                self._saved = self._read_file()
+        return self._saved
+
+    def save(self):
+        """파일 잠금 안에서 다시 읽고 breaker 마다 합쳐서 저장"""
+        if not self.path or not self._breakers:
+            return
+        with _FileLock(f"{self.path}.lock"):
+            saved = self._read_file()
+            for key, breaker in list(self._breakers.items()):
+                saved[key] = breaker.merge(saved.get(key))
+            self._write_file({"saved_at": time.time(), "breakers": saved})
+
+    def _write_file(self, data: dict):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        # 다른 프로세스가 반쯤 쓴 파일을 읽지 않도록 임시 파일에 쓰고 교체
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
+
+
+breakers = Breakers()
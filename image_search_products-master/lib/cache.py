@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+이미지 업로드 결과 캐시 (SQLite)
+
+이미지 bytes 의 sha256 + 마켓 -> 업로드 결과(1688/타오바오 imageId, 알리바바 OSS image_key)
+같은 이미지를 다시 검색하면 업로드 없이 바로 search(image_id) 로 간다.
+WAL 모드 + busy_timeout 이라 여러 프로세스가 같은 파일을 동시에 써도 된다.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "image_cache.sqlite3"
+)
+DEFAULT_TTL = 24 * 60 * 60
+DEFAULT_MAX_ENTRIES = 100000
+# 만료/초과 정리는 프로세스 첫 put 과 이후 EVICT_EVERY 번마다 (put 마다 하면 COUNT(*) 로 O(n))
+EVICT_EVERY = 100
+
+
+def image_digest(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_digest(filename: str) -> str:
+    h = hashlib.sha256()
+    with open(filename, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ImageIdCache(object):
+    def __init__(self, path=DEFAULT_PATH, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._puts = 0
+        self._conn().executescript(
+            """
+            CREATE TABLE IF NOT EXISTS image_ids (
+                digest TEXT NOT NULL,
+                marketplace TEXT NOT NULL,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                used_at REAL NOT NULL,
+                PRIMARY KEY (digest, marketplace)
+            );
+            CREATE INDEX IF NOT EXISTS image_ids_used_at ON image_ids (used_at);
+            CREATE INDEX IF NOT EXISTS image_ids_created_at ON image_ids (created_at);
+            """
+        )
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite3 연결은 스레드마다 하나씩
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, marketplace: str, digest: str):
+        conn = self._conn()
+        now = time.time()
+        row = conn.execute(
+            "SELECT value, created_at FROM image_ids WHERE digest = ? AND marketplace = ?",
+            (digest, marketplace),
+        ).fetchone()
+        if row is None:
+            return None
+        value, created_at = row
+        if now - created_at > self.ttl:
+            self.invalidate(marketplace, digest)
+            return None
+        conn.execute(
+            "UPDATE image_ids SET used_at = ? WHERE digest = ? AND marketplace = ?",
+            (now, digest, marketplace),
+        )
+        return value
+
+    def put(self, marketplace: str, digest: str, value: str):
+        conn = self._conn()
+        now = time.time()
+        conn.execute(
+            "INSERT OR REPLACE INTO image_ids (digest, marketplace, value, created_at, used_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (digest, marketplace, value, now, now),
+        )
+        with self._lock:
+            evict = self._puts % EVICT_EVERY == 0
+            self._puts += 1
+        if evict:
+            self._evict(conn, now)
+
+    def invalidate(self, marketplace: str, digest: str):
+        self._conn().execute(
+            "DELETE FROM image_ids WHERE digest = ? AND marketplace = ?",
+            (digest, marketplace),
+        )
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        conn.execute("DELETE FROM image_ids WHERE created_at < ?", (now - self.ttl,))
+        (count,) = conn.execute("SELECT COUNT(*) FROM image_ids").fetchone()
+        if count > self.max_entries:
+            # 가장 오래 안 쓴 항목부터 삭제
+            conn.execute(
+                "DELETE FROM image_ids WHERE rowid IN "
+                "(SELECT rowid FROM image_ids ORDER BY used_at LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    def __len__(self):
+        (count,) = self._conn().execute("SELECT COUNT(*) FROM image_ids").fetchone()
+        return count
+
+
+_cache = None
+
+
+def get_cache() -> ImageIdCache:
+    """프로세스 공용 캐시"""
+    global _cache
+    if _cache is None:
+        _cache = ImageIdCache()
+    return _cache
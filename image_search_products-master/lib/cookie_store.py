@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+타오바오 쿠키 저장소 - Chrome 쿠키 DB / C# 이 저장한 taobao_cookies.json
+
+  - Chrome DB 는 복사하지 않고 읽기 전용(mode=ro)으로 연다 - Chrome 이 아직 -wal 에만 쓴 쿠키
+    (방금 갱신된 _m_h5_tk 등)도 보이도록 immutable 은 쓰지 않는다.
+    그래도 열 수 없으면(Chrome 이 파일을 독점) 예전처럼 임시 복사본(-wal 포함)으로 읽는다.
+  - taobao.com / .taobao.com 과 검색에 쓰는 하위 host (SUBDOMAINS, world.taobao.com 등) 의 쿠키.
+    host_key LIKE '%.taobao.com' 은 앞이 와일드카드라 인덱스를 못 쓰고 표 전체를 읽으므로
+    host_key IN (...) 으로 정확한 host 만 찾는다 (Chrome 의 host_key 인덱스 사용).
+  - DB / -wal / -journal 파일 mtime/크기가 바뀌지 않으면 파싱 결과를 그대로 재사용하고,
+    모든 호출자가 같은 RequestsCookieJar 를 받는다 (읽기 전용으로 사용, 수정하려면 자기 jar 에 복사).
+"""
+
+import json
+import logging
+import os
+import pathlib
+import threading
+
+CHROME_COOKIES_PATH = os.path.expanduser(r"~\AppData\Local\Google\Chrome\User Data\Default\Network\Cookies")
+SAVED_COOKIES_PATH = os.path.expanduser(r"~\AppData\Roaming\Predvia\taobao_cookies.json")
+COOKIE_DOMAIN = ".taobao.com"
+log = logging.getLogger(__name__)
+
+TAOBAO_DOMAIN = "taobao.com"
+# 쿠키를 읽을 하위 host ("" 은 도메인 자체) - 각각 "host" 와 ".host" 두 가지 host_key 로 찾음
+SUBDOMAINS = ("", "www", "m", "h5api.m", "world", "s", "item", "login", "i", "uland")
+# Chrome 이 DB 옆에 두는 파일 - 커밋 전 변경은 여기에만 있음
+SIDE_FILES = ("-wal", "-journal")
+
+
+def _file_key(path: str):
+    """(mtime_ns, size) - 파일이 없으면 None"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class CookieStore(object):
+    def __init__(self, chrome_path=CHROME_COOKIES_PATH, saved_path=SAVED_COOKIES_PATH, domain=TAOBAO_DOMAIN,
+                 subdomains=SUBDOMAINS):
+        self.chrome_path = chrome_path
+        self.saved_path = saved_path
+        self.domain = domain
+        self.subdomains = subdomains
+        self._lock = threading.Lock()
+        self._cache = {}  # name -> (file key, value)
+
+    def _cached(self, name: str, path: str, load, side_files=()):
+        key = _file_key(path)
+        if key is not None and side_files:
+            key = (key,) + tuple(_file_key(path + suffix) for suffix in side_files)
+        with self._lock:
+            cached = self._cache.get(name)
+            if cached is not None and cached[0] == key:
+                return cached[1]
+            value = load() if key is not None else {}
+            self._cache[name] = (key, value)
+            return value
+
+    def host_keys(self) -> list:
+        """찾을 host_key 목록 - "taobao.com", ".taobao.com", "world.taobao.com", ".world.taobao.com", ..."""
+        hosts = [f"{sub}.{self.domain}" if sub else self.domain for sub in self.subdomains]
+        return hosts + ["." + host for host in hosts]
+
+    def _query_chrome(self, path: str, uri: bool) -> dict:
+        import sqlite3
+
+        hosts = self.host_keys()
+        conn = sqlite3.connect(path, uri=uri)
+        try:
+            rows = conn.execute(
+                f"SELECT name, value FROM cookies WHERE host_key IN ({','.join('?' * len(hosts))}) AND value != ''",
+                hosts,
+            ).fetchall()
+        finally:
+            conn.close()
+        return dict(rows)
+
+    def _load_chrome(self) -> dict:
+        import sqlite3
+
+        try:
+            uri = pathlib.Path(self.chrome_path).absolute().as_uri() + "?mode=ro"
+            return self._query_chrome(uri, uri=True)
+        except sqlite3.Error as e:
+            log.warning(f"⚠️ Chrome 쿠키 DB 직접 읽기 실패 ({e}) - 임시 복사본 사용")
+
+        import shutil
+        import tempfile
+
+        with tempfile.TemporaryDirectory() as tmp:
+            temp_path = os.path.join(tmp, "Cookies")
+            shutil.copy2(self.chrome_path, temp_path)
+            for suffix in SIDE_FILES:
+                if os.path.exists(self.chrome_path + suffix):
+                    shutil.copy2(self.chrome_path + suffix, temp_path + suffix)
+            return self._query_chrome(temp_path, uri=False)
+
+    def _load_saved(self) -> dict:
+        with open(self.saved_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def chrome_cookies(self) -> dict:
+        """Chrome 쿠키 DB 의 타오바오 쿠키 {name: value} (파일이 없으면 빈 dict)"""
+        return self._cached("chrome", self.chrome_path, self._load_chrome, side_files=SIDE_FILES)
+
+    def saved_cookies(self) -> dict:
+        """C# 이 저장한 taobao_cookies.json {name: value} (파일이 없으면 빈 dict)"""
+        return self._cached("saved", self.saved_path, self._load_saved)
+
+    def has_saved_cookies(self) -> bool:
+        return _file_key(self.saved_path) is not None
+
+    def jar(self, source: str = "saved"):
+        """
+        공용 RequestsCookieJar (domain .taobao.com) - 호출자끼리 같은 객체를 공유하므로 수정하지 말 것
+        :param source: "saved" (taobao_cookies.json) / "chrome" (Chrome 쿠키 DB)
+        """
+        cookies = self.saved_cookies() if source == "saved" else self.chrome_cookies()
+        with self._lock:
+            cached = self._cache.get(f"jar:{source}")
+            if cached is not None and cached[0] is cookies:
+                return cached[1]
+
+            from requests.cookies import RequestsCookieJar
+
+            jar = RequestsCookieJar()
+            for name, value in cookies.items():
+                if value:
+                    jar.set(name, value, domain=COOKIE_DOMAIN)
+            self._cache[f"jar:{source}"] = (cookies, jar)
+            return jar
+
+
+_store = None
+
+
+def get_cookie_store() -> CookieStore:
+    """프로세스 공용 쿠키 저장소"""
+    global _store
+    if _store is None:
+        _store = CookieStore()
+    return _store
@@ -3,18 +3,99 @@
 
 
 import contextlib
+import http.cookiejar
 import random
 import string
+import threading
 import time
+from urllib.parse import urlsplit
 
 import requests
+from requests.adapters import HTTPAdapter
+
+from lib.rate_limit import rate_limiter
+from lib.retry import GET_POLICY, classify_status
+
+POOL_CONNECTIONS = 10
+POOL_MAXSIZE = 32
+
+
+class SessionManager(object):
+    """
+    host 별 requests.Session 관리 (keep-alive 연결 재사용)
+    OSS, h5api.m.taobao.com, s.1688.com, yiwugo 등 host 마다 별도 연결 풀을 가진다.
+    """
+
+    def __init__(self, pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE):
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def _create_session(self):
+        session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=self.pool_connections, pool_maxsize=self.pool_maxsize
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        # 응답 쿠키를 세션에 저장하지 않음 - 요청마다 호출자가 쿠키를 직접 넘긴다
+        session.cookies.set_policy(http.cookiejar.DefaultCookiePolicy(allowed_domains=[]))
+        return session
+
+    def get(self, url) -> requests.Session:
+        host = urlsplit(url).netloc
+        session = self._sessions.get(host)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(host)
+                if session is None:
+                    session = self._create_session()
+                    self._sessions[host] = session
+        return session
+
+    def configure(self, pool_connections=None, pool_maxsize=None):
+        """연결 풀 크기 변경 (기존 세션은 닫고 다시 생성)"""
+        with self._lock:
+            if pool_connections:
+                self.pool_connections = pool_connections
+            if pool_maxsize:
+                self.pool_maxsize = pool_maxsize
+            sessions, self._sessions = self._sessions, {}
+        for session in sessions.values():
+            session.close()
+
+    def close(self):
+        self.configure()
+
+
+session_manager = SessionManager()
 
 
 def request_post(
-    url, params=None, data=None, files=None, headers=None, timeout=10, cookies=None
+    url,
+    params=None,
+    data=None,
+    files=None,
+    headers=None,
+    timeout=10,
+    cookies=None,
+    proxies=None,
+    session=None,
+    retry=None,
 ):
-    with contextlib.closing(
-        requests.post(
+    """
+    :param retry: RetryPolicy - 업로드는 호출자가 재시도 방법(프록시/토큰)을 정하므로 기본은 재시도 안 함
+    """
+    session = session or session_manager.get(url)
+    if retry:
+        return retry.call(
+            lambda attempt: request_post(url, params, data, files, headers, timeout, cookies, proxies, session),
+            classify=lambda req: classify_status(req.status_code),
+        )
+    # host 별 속도 제한 - 응답(429/5xx/차단 ret)을 보고 rate 조절
+    with rate_limiter.slot(url) as slot, contextlib.closing(
+        session.post(
             url=url,
             params=params,
             data=data,
@@ -22,17 +103,36 @@ def request_post(
             headers=headers,
             cookies=cookies,
             timeout=timeout,
+            proxies=proxies,
         )
     ) as req:
+        slot.report(req.status_code, req.content, proxied=bool(proxies))
         return req
 
 
-def request_get(url, params=None, headers=None, timeout=10, cookies=None):
-    with contextlib.closing(
-        requests.get(
-            url=url, params=params, headers=headers, cookies=cookies, timeout=timeout
+def request_get(
+    url, params=None, headers=None, timeout=10, cookies=None, proxies=None, session=None, retry=GET_POLICY
+):
+    """
+    :param retry: RetryPolicy (기본: 연결 끊김 / 502~504 만 backoff 후 한 번 더, None 이면 재시도 안 함)
+    """
+    session = session or session_manager.get(url)
+    if retry:
+        return retry.call(
+            lambda attempt: request_get(url, params, headers, timeout, cookies, proxies, session, retry=None),
+            classify=lambda req: classify_status(req.status_code),
+        )
+    with rate_limiter.slot(url) as slot, contextlib.closing(
+        session.get(
+            url=url,
+            params=params,
+            headers=headers,
+            cookies=cookies,
+            timeout=timeout,
+            proxies=proxies,
         )
     ) as req:
+        slot.report(req.status_code, req.content, proxied=bool(proxies))
         return req
 
 
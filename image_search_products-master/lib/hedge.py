@@ -0,0 +1,210 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+hedged request - 느린 프록시 하나 때문에 생기는 꼬리 지연 줄이기
+
+요청이 최근 지연 시간의 percentile (기본 p95) 안에 끝나지 않으면 같은 요청을 다른 프록시로 하나 더 보내고
+먼저 성공한 응답을 쓴다. 진 쪽은 시작 전이면 취소하고, 이미 보낸 요청은 (requests 는 중간에 끊을 수 없으므로)
+결과만 버린다 - 그 요청도 timeout 안에는 끝난다.
+
+  - 두 번 보내도 되는 요청만 쓸 것: 검색 GET, 타오바오 이미지 업로드 (imageId 만 받음)
+  - budget: 요청 하나마다 ratio 개 (기본 0.1) 씩 쌓이고 hedge 하나에 1 개 - 프록시가 전부 느려져도
+    추가 요청은 전체의 ratio 까지라 부하가 두 배가 되지 않는다
+  - 지연 시간 표본이 min_samples 개가 안 되면 hedge 하지 않음 (기준 percentile 을 모름)
+
+지연 시간은 endpoint (key) 별로 따로 본다 - 업로드와 검색 페이지는 걸리는 시간이 다름.
+지연 시간은 작업이 실제로 시작된 때부터 잰다 (스레드 풀 대기 시간은 넣지 않음). hedge 요청은
+primary 와 다른 스레드 풀에서 실행한다 - 느린 primary 들 뒤에서 기다리면 hedge 하는 의미가 없음.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+log = logging.getLogger(__name__)
+
+PERCENTILE = 0.95
+BUDGET_RATIO = 0.1
+BUDGET_BURST = 5
+MIN_SAMPLES = 20
+MIN_DELAY = 0.2
+WINDOW = 200
+MAX_WORKERS = 16
+
+
+class LatencyWindow(object):
+    """최근 size 개 지연 시간 (초)"""
+
+    def __init__(self, size: int = WINDOW):
+        self.samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.samples)
+
+    def add(self, seconds: float):
+        with self._lock:
+            self.samples.append(seconds)
+
+    def percentile(self, q: float):
+        with self._lock:
+            if not self.samples:
+                return None
+            ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class HedgeBudget(object):
+    """요청마다 ratio 개씩 적립, hedge 하나에 1 개 사용 (최대 burst 개까지 적립)"""
+
+    def __init__(self, ratio: float = BUDGET_RATIO, burst: float = BUDGET_BURST):
+        self.ratio = ratio
+        self.burst = burst
+        self.tokens = 0.0
+        self._lock = threading.Lock()
+
+    def earn(self):
+        with self._lock:
+            self.tokens = min(self.burst, self.tokens + self.ratio)
+
+    def spend(self) -> bool:
+        with self._lock:
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class Hedger(object):
+    def __init__(self, percentile: float = PERCENTILE, budget: float = BUDGET_RATIO, min_samples: int = MIN_SAMPLES,
+                 min_delay: float = MIN_DELAY, window: int = WINDOW, executor=None, hedge_executor=None):
+        """
+        :param percentile: 이 percentile 지연 시간이 지나도 안 끝나면 hedge (0~1)
+        :param budget: 요청 수 대비 hedge 비율 상한
+        :param min_delay: hedge 까지 최소 대기 (초) - 빠른 요청을 괜히 두 번 보내지 않도록
+        :param executor: primary 용 스레드 풀 (기본 공용 "primary" 풀)
+        :param hedge_executor: hedge 용 스레드 풀 (기본 공용 "hedge" 풀)
+        """
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.min_delay = min_delay
+        self.latency = LatencyWindow(window)
+        self.budget = HedgeBudget(budget)
+        self.executor = executor
+        self.hedge_executor = hedge_executor
+        self.requests = 0
+        self.hedged = 0
+        self.wins = 0
+
+    def delay(self):
+        """hedge 를 보내기까지 기다릴 시간 (표본이 부족하면 None)"""
+        if len(self.latency) < self.min_samples:
+            return None
+        return max(self.min_delay, self.latency.percentile(self.percentile))
+
+    def _timed(self, fn, started):
+        # 제출한 때가 아니라 실제로 시작한 때부터 (started 에 시작 시각을 남김)
+        started.append(time.monotonic())
+        result = fn()
+        # 진 요청도 끝나면 기록 - 느린 요청이 percentile 에서 빠지지 않도록
+        self.latency.add(time.monotonic() - started[0])
+        return result
+
+    def call(self, primary, hedge=None, on_lose=None):
+        """
+        primary() 실행, delay() 안에 안 끝나면 hedge() (같은 요청, 다른 프록시) 도 실행하고 먼저 성공한 결과
+        둘 다 실패하면 먼저 난 오류를 다시 던짐
+        :param on_lose: on_lose(seconds) - hedge 결과를 쓸 때 이미 시작한 primary 에 대해 호출
+            (seconds: primary 가 시작한 뒤 지난 시간) - 진 프록시 점수 반영용
+        """
+        self.requests += 1
+        self.budget.earn()
+        delay = self.delay() if hedge is not None else None
+        if delay is None:
+            return self._timed(primary, [])
+
+        started = []
+        executor = self.executor or _get_executor("primary")
+        futures = {executor.submit(self._timed, primary, started): False}
+        done, _ = wait(futures, timeout=delay)
+        if not done and self.budget.spend():
+            self.hedged += 1
+            log.info(f"🪁 {delay:.2f}초 안에 응답 없음 - 다른 프록시로 같은 요청 한 번 더")
+            futures[(self.hedge_executor or _get_executor("hedge")).submit(self._timed, hedge, [])] = True
+
+        error = None
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    error = error or e
+                    continue
+                for other in pending:
+                    other.cancel()
+                if futures[future]:
+                    self.wins += 1
+                    if on_lose is not None and started:
+                        on_lose(time.monotonic() - started[0])
+                return result
+        raise error
+
+    def snapshot(self) -> dict:
+        delay = self.delay()
+        return {
+            "delay": None if delay is None else round(delay, 3),
+            "requests": self.requests,
+            "hedged": self.hedged,
+            "wins": self.wins,
+        }
+
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def _get_executor(name: str) -> ThreadPoolExecutor:
+    """공용 스레드 풀 ("primary" / "hedge")"""
+    executor = _executors.get(name)
+    if executor is None:
+        with _executors_lock:
+            executor = _executors.get(name)
+            if executor is None:
+                executor = _executors[name] = ThreadPoolExecutor(
+                    max_workers=MAX_WORKERS, thread_name_prefix=f"hedge-{name}"
+                )
+    return executor
+
+
+class Hedgers(object):
+    """endpoint key -> Hedger (작업자/스레드가 달라도 같은 지연 시간 표본과 budget 을 공유)"""
+
+    def __init__(self, **defaults):
+        self.defaults = defaults
+        self._hedgers = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Hedger:
+        hedger = self._hedgers.get(key)
+        if hedger is None:
+            with self._lock:
+                hedger = self._hedgers.get(key)
+                if hedger is None:
+                    hedger = self._hedgers[key] = Hedger(**self.defaults)
+        return hedger
+
+    def configure(self, **defaults):
+        """기본값 변경 (새 key 부터 적용)"""
+        with self._lock:
+            self.defaults.update(defaults)
+
+    def snapshot(self) -> dict:
+        return {key: hedger.snapshot() for key, hedger in list(self._hedgers.items())}
+
+
+hedgers = Hedgers()
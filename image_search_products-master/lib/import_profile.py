@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+--startup-profile: 모듈별 import 시간 측정
+
+builtins.__import__ 를 감싸서 처음 import 되는 모듈마다 누적 시간(하위 import 포함)과
+자기 시간(하위 import 제외)을 기록한다. python -X importtime 과 비슷하지만
+C# 에서 띄운 프로세스에도 인수 하나로 켤 수 있다.
+"""
+
+import builtins
+import sys
+import time
+
+
+class ImportProfiler(object):
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.records = []  # (name, self_ms, total_ms, depth)
+        self.marks = []  # (label, ms)
+        self._stack = []
+        self._original = None
+
+    def install(self):
+        self._original = builtins.__import__
+        builtins.__import__ = self._import
+        return self
+
+    def uninstall(self):
+        if self._original is not None:
+            builtins.__import__ = self._original
+            self._original = None
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        package = (globals or {}).get("__package__") if level else None
+        key = _resolve(name, package, level)
+        if key in sys.modules:
+            return self._original(name, globals, locals, fromlist, level)
+
+        self._stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            return self._original(name, globals, locals, fromlist, level)
+        finally:
+            total = time.perf_counter() - start
+            children = self._stack.pop()
+            if self._stack:
+                self._stack[-1] += total
+            self.records.append((key, (total - children) * 1000, total * 1000, len(self._stack)))
+
+    def mark(self, label: str):
+        """시작부터 지금까지 걸린 시간 기록 (예: argv 처리 시작)"""
+        self.marks.append((label, (time.perf_counter() - self.started) * 1000))
+
+    def report(self, out=None, limit: int = 30):
+        out = out or sys.stdout
+        print("=== startup profile (import 시간, ms) ===", file=out)
+        print(f"{'self':>9} {'total':>9}  module", file=out)
+        for name, self_ms, total_ms, depth in sorted(self.records, key=lambda r: -r[2])[:limit]:
+            print(f"{self_ms:9.1f} {total_ms:9.1f}  {'  ' * depth}{name}", file=out)
+        top_level = sum(r[2] for r in self.records if r[3] == 0)
+        print(f"{'':9} {top_level:9.1f}  (전체 import)", file=out)
+        for label, ms in self.marks:
+            print(f"{'':9} {ms:9.1f}  [{label}]", file=out)
+        out.flush()
+
+
+def _resolve(name: str, package, level: int) -> str:
+    if not level or not package:
+        return name
+    base = package.rsplit(".", level - 1)[0]
+    return f"{base}.{name}" if name else base
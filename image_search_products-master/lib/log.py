@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+로그 출력 - print + sys.stdout.flush() 대신 logging
+
+  - 기본(운영)은 WARNING 이상만 출력, -v 는 INFO (예전 이모지 진단 출력), -vv 는 DEBUG (쿠키 목록 등)
+  - 로그 호출은 queue 에 넣기만 하고, 쓰기 스레드가 쌓인 줄을 한 번에 쓰고 한 번만 flush 한다
+    (예전에는 print 한 번마다 pipe write + flush)
+  - 출력 대상은 쓰는 시점의 sys.stdout - C# 은 stdout 에서 오류 문자열을 찾고, --serve 는 stdout 을 stderr 로 바꿔 둔다
+
+logging.handlers 의 QueueHandler/QueueListener 는 socket/pickle 까지 import 해서 시작이 느려지므로
+같은 역할의 작은 클래스 두 개를 쓴다.
+"""
+
+import atexit
+import logging
+import queue
+import sys
+import threading
+
+FORMAT = "%(message)s"
+
+_writer = None
+
+
+def verbosity(argv) -> int:
+    """-v / -vv / --verbose 개수"""
+    level = 0
+    for arg in argv:
+        if arg == "--verbose":
+            level += 1
+        elif len(arg) > 1 and arg[0] == "-" and set(arg[1:]) == {"v"}:
+            level += len(arg) - 1
+    return level
+
+
+def level_for(verbose: int) -> int:
+    if verbose >= 2:
+        return logging.DEBUG
+    if verbose == 1:
+        return logging.INFO
+    return logging.WARNING
+
+
+class QueueHandler(logging.Handler):
+    """레코드를 문자열로 만들어 queue 에 넣기만 함 (호출한 스레드는 pipe 쓰기를 기다리지 않음)"""
+
+    def __init__(self, lines):
+        super(QueueHandler, self).__init__()
+        self.lines = lines
+
+    def emit(self, record):
+        try:
+            self.lines.put(self.format(record))
+        except Exception:
+            self.handleError(record)
+
+
+class LogWriter(object):
+    """queue 에 쌓인 로그 줄을 모아서 sys.stdout 에 쓰는 스레드"""
+
+    _STOP = object()
+
+    def __init__(self, lines):
+        self.lines = lines
+        self._thread = None
+
+    def start(self):
+        # 한 번 실행하고 끝나는 CLI 가 종료를 기다리지 않도록 daemon (남은 줄은 stop() 에서 씀)
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._thread.start()
+        return self
+
+    def _run(self):
+        stop = False
+        while not stop:
+            items = [self.lines.get()]
+            while True:
+                try:
+                    items.append(self.lines.get_nowait())
+                except queue.Empty:
+                    break
+
+            text, waiters = [], []
+            for item in items:
+                if item is self._STOP:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    waiters.append(item)
+                else:
+                    text.append(item)
+            if text:
+                out = sys.stdout
+                try:
+                    out.write("\n".join(text) + "\n")
+                    out.flush()
+                except (OSError, ValueError):
+                    pass
+            for waiter in waiters:
+                waiter.set()
+
+    def flush(self, timeout: float = 1.0):
+        """지금까지 넣은 줄을 다 쓸 때까지 대기"""
+        if self._thread is None or not self._thread.is_alive():
+            return
+        done = threading.Event()
+        self.lines.put(done)
+        done.wait(timeout)
+
+    def stop(self, timeout: float = 1.0):
+        if self._thread is None:
+            return
+        self.lines.put(self._STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+
+def setup_logging(verbose: int = 0):
+    """root logger 에 queue handler 설치 (여러 번 호출하면 레벨만 바꿈)"""
+    global _writer
+    root = logging.getLogger()
+    root.setLevel(level_for(verbose))
+    if _writer is not None:
+        return root
+
+    lines = queue.SimpleQueue()
+    handler = QueueHandler(lines)
+    handler.setFormatter(logging.Formatter(FORMAT))
+    root.addHandler(handler)
+    _writer = LogWriter(lines).start()
+    atexit.register(_writer.stop)
+    return root
+
+
+def flush_logs():
+    """로그와 직접 print 하는 결과 줄의 순서를 맞출 때 호출"""
+    if _writer is not None:
+        _writer.flush()
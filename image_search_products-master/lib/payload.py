@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+업로드 payload 를 큰 중간 문자열 없이 만들기
+
+이미지(파일은 mmap, bytes 는 memoryview)를 조각 단위로 base64 인코딩하고, 바로
+application/x-www-form-urlencoded 형태로 percent-encoding 해서 bytearray 하나에 붙인다.
+JSON 의 앞/뒤는 템플릿으로 미리 만들고, sign 용 md5 는 URL 인코딩 전 JSON 조각으로 update 한다.
+
+최종 body 는 base64 크기 + '+', '/' 의 %2B, %2F 확장 정도라 원본 이미지의 약 1.4배.
+"""
+
+import base64
+import hashlib
+import mmap
+import os
+from urllib.parse import quote_plus, unquote_plus
+
+# 3 의 배수 - 조각마다 base64 를 따로 인코딩해도 중간에 '=' 패딩이 생기지 않음
+CHUNK_SIZE = 3 * 8 * 1024
+IMAGE_PLACEHOLDER = "__IMAGE_BASE64__"
+
+
+class Payload(object):
+    """form body (bytearray) + JSON 원문 md5"""
+
+    def __init__(self, field: str, body: bytearray, md5=None):
+        self.field = field
+        self.body = body
+        self.md5 = md5
+
+    def hexdigest(self) -> str:
+        return self.md5.hexdigest()
+
+    def value(self) -> str:
+        """URL 인코딩 전 값 (전체 문자열을 만들므로 sign reference 구현 등에서만 사용)"""
+        return unquote_plus(self.body[len(self.field) + 1:].decode("ascii"))
+
+    def __len__(self):
+        return len(self.body)
+
+
+def split_template(template: str):
+    """IMAGE_PLACEHOLDER 를 기준으로 (앞, 뒤) 문자열"""
+    prefix, suffix = template.split(IMAGE_PLACEHOLDER)
+    return prefix, suffix
+
+
+def _quote_b64(chunk: bytes) -> bytes:
+    # base64 문자 중 form 인코딩이 필요한 것은 '+', '/', '=' 뿐
+    return chunk.replace(b"+", b"%2B").replace(b"/", b"%2F").replace(b"=", b"%3D")
+
+
+def _b64_chunks(image=None, filename=None, b64=None, strip_padding=False):
+    """base64 조각 (bytes) 을 차례로 생성"""
+    if b64 is not None:
+        if strip_padding:
+            b64 = b64.rstrip("=")
+        for start in range(0, len(b64), CHUNK_SIZE):
+            yield b64[start:start + CHUNK_SIZE].encode("ascii")
+        return
+
+    if filename is not None:
+        with open(filename, "rb") as f:
+            if not f.seek(0, 2):
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                yield from _b64_chunks(image=mm, strip_padding=strip_padding)
+        return
+
+    view = memoryview(image)
+    try:
+        size = len(view)
+        for start in range(0, size, CHUNK_SIZE):
+            chunk = base64.b64encode(view[start:start + CHUNK_SIZE])
+            if strip_padding and start + CHUNK_SIZE >= size:
+                chunk = chunk.rstrip(b"=")
+            yield chunk
+    finally:
+        view.release()
+
+
+def image_size(image=None, filename=None, b64=None) -> int:
+    """base64 인코딩 전 이미지 크기"""
+    if b64 is not None:
+        return len(b64) * 3 // 4
+    if filename is not None:
+        return os.path.getsize(filename)
+    return len(image)
+
+
+def form_payload(
+    field: str,
+    image=None,
+    filename: str = None,
+    b64: str = None,
+    template: str = IMAGE_PLACEHOLDER,
+    strip_padding: bool = False,
+    digest_prefix: str = None,
+) -> Payload:
+    """
+    f"{field}=" + quote_plus(template 의 IMAGE_PLACEHOLDER 를 base64 로 바꾼 문자열)
+
+    :param image: 이미지 bytes (또는 buffer) / filename: 파일 경로 (mmap) / b64: 이미 인코딩된 base64
+    :param template: IMAGE_PLACEHOLDER 가 한 번 들어간 JSON 등 (base64 는 JSON escape 가 필요 없음)
+    :param digest_prefix: 주면 digest_prefix + (URL 인코딩 전) 본문의 md5 를 같이 계산
+    """
+    prefix, suffix = split_template(template)
+    quoted_prefix = f"{field}={quote_plus(prefix)}".encode("ascii")
+    quoted_suffix = quote_plus(suffix).encode("ascii")
+
+    # 최종 크기로 한 번만 할당: base64 4/3 배 + percent-encoding 확장
+    # ('+', '/' 가 base64 문자의 1/32 씩, 각각 2 bytes 늘어나 평균 1/16 + 여유 1/256)
+    # bytearray 를 += 로 늘리면 재할당 여유분 때문에 최대 메모리가 더 커진다
+    b64_size = (image_size(image=image, filename=filename, b64=b64) + 2) // 3 * 4
+    body = bytearray(len(quoted_prefix) + b64_size * 17 // 16 + b64_size // 256 + len(quoted_suffix) + 64)
+    body[:len(quoted_prefix)] = quoted_prefix
+    pos = len(quoted_prefix)
+
+    md5 = None
+    if digest_prefix is not None:
+        md5 = hashlib.md5(f"{digest_prefix}{prefix}".encode("utf-8"))
+
+    for chunk in _b64_chunks(image=image, filename=filename, b64=b64, strip_padding=strip_padding):
+        if md5 is not None:
+            md5.update(chunk)
+        quoted = _quote_b64(chunk)
+        body[pos:pos + len(quoted)] = quoted
+        pos += len(quoted)
+
+    body[pos:] = quoted_suffix
+    if md5 is not None:
+        md5.update(suffix.encode("utf-8"))
+    return Payload(field, body, md5=md5)
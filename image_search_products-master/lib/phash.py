@@ -0,0 +1,308 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+perceptual hash 색인 - 살짝 잘리거나 워터마크/재압축된 같은 상품 사진 재사용
+
+dhash/phash 는 64bit 정수. 색인은 multi-index hashing:
+64bit 를 (max_distance + 1) 조각으로 나누면, 해밍 거리 <= max_distance 인 두 hash 는
+비둘기집 원리로 적어도 한 조각이 정확히 같다. 조각별 dict 로 후보를 찾고 거리만 확인한다.
+
+오래 떠 있는 프로세스(--serve, server.py, batch)는 메모리 색인(memory=True),
+한 번 실행하고 끝나는 CLI 는 전체를 읽지 않고 SQLite 조각 컬럼 색인으로 찾는다.
+Pillow 는 hash 를 계산할 때, numpy 는 phash(DCT) 에서만 import 한다 (CLI 시작 시간).
+
+저장 결과(타오바오 응답 전체)에는 imageId / 가격이 들어 있어 ttl (기본 7일) 이 지나면 쓰지 않고,
+add 할 때 가끔 (프로세스 첫 add, 이후 EVICT_EVERY 번마다) 만료 항목을 지운다 - 메모리 색인에서도 같이 뺀다.
+개수 제한은 기본으로 두지 않는다 (지금까지 검색한 모든 이미지와 비교) - 필요하면 max_entries 로.
+"""
+
+import importlib.util
+import io
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from lib.cache import DEFAULT_PATH
+
+HASH_BITS = 64
+DEFAULT_MAX_DISTANCE = 4
+# 상품 검색 결과는 며칠은 그대로 쓸 만함 (imageId 캐시의 하루보다 길게)
+DEFAULT_TTL = 7 * 24 * 60 * 60
+# None 이면 개수 제한 없음
+DEFAULT_MAX_ENTRIES = None
+EVICT_EVERY = 100
+
+
+def _gray_pixels(data: bytes, size) -> list:
+    """size 로 줄인 흑백 이미지의 픽셀 값 (행 우선)"""
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as img:
+        img = img.convert("L").resize(size, Image.LANCZOS)
+        return list(img.getdata())
+
+
+def dhash(data: bytes, size: int = 8) -> int:
+    """가로 방향 밝기 차이 hash (size x size bit) - 픽셀 72개라 numpy 없이 계산"""
+    pixels = _gray_pixels(data, (size + 1, size))
+    value = 0
+    for row in range(size):
+        offset = row * (size + 1)
+        for col in range(offset, offset + size):
+            value = (value << 1) | (pixels[col + 1] > pixels[col])
+    return value
+
+
+_DCT32 = None
+
+
+def _dct_matrix(n: int):
+    import numpy as np
+
+    k = np.arange(n)
+    matrix = np.cos(np.pi * (2 * k[None, :] + 1) * k[:, None] / (2 * n))
+    matrix[0] /= np.sqrt(2)
+    return matrix * np.sqrt(2 / n)
+
+
+def phash(data: bytes) -> int:
+    """32x32 DCT 저주파 8x8 계수의 중앙값 비교 hash"""
+    import numpy as np
+
+    global _DCT32
+    if _DCT32 is None:
+        _DCT32 = _dct_matrix(32)
+    pixels = np.asarray(_gray_pixels(data, (32, 32)), dtype=np.float32).reshape(32, 32)
+    low = (_DCT32 @ pixels @ _DCT32.T)[:8, :8].ravel()
+    bits = low > np.median(low[1:])
+    return int.from_bytes(np.packbits(bits.astype(np.uint8)).tobytes(), "big")
+
+
+if hasattr(int, "bit_count"):
+    def hamming(a: int, b: int) -> int:
+        return (a ^ b).bit_count()
+else:
+    def hamming(a: int, b: int) -> int:
+        return bin(a ^ b).count("1")
+
+
+class HammingIndex(object):
+    """multi-index hashing - 해밍 거리 max_distance 이내 검색"""
+
+    def __init__(self, max_distance: int = DEFAULT_MAX_DISTANCE):
+        self.max_distance = max_distance
+        chunks = max_distance + 1
+        widths = [HASH_BITS // chunks + (1 if i < HASH_BITS % chunks else 0) for i in range(chunks)]
+        self._chunks = []
+        shift = 0
+        for width in widths:
+            self._chunks.append((shift, (1 << width) - 1))
+            shift += width
+        self._tables = [{} for _ in self._chunks]
+        self._hashes = {}
+
+    def chunks(self, value: int):
+        return [(value >> shift) & mask for shift, mask in self._chunks]
+
+    def add(self, key, value: int):
+        self._hashes[key] = value
+        for table, chunk in zip(self._tables, self.chunks(value)):
+            table.setdefault(chunk, []).append(key)
+
+    def remove(self, key) -> bool:
+        value = self._hashes.pop(key, None)
+        if value is None:
+            return False
+        for table, chunk in zip(self._tables, self.chunks(value)):
+            keys = table.get(chunk)
+            if keys and key in keys:
+                keys.remove(key)
+                if not keys:
+                    del table[chunk]
+        return True
+
+    def search(self, value: int, max_distance: int = None):
+        """[(distance, key), ...] 거리 순"""
+        if max_distance is None or max_distance > self.max_distance:
+            max_distance = self.max_distance
+        found = {}
+        for table, chunk in zip(self._tables, self.chunks(value)):
+            for key in table.get(chunk, ()):
+                if key not in found:
+                    found[key] = hamming(value, self._hashes[key])
+        return sorted((d, key) for key, d in found.items() if d <= max_distance)
+
+    def __len__(self):
+        return len(self._hashes)
+
+
+def _to_signed(value: int) -> int:
+    # sqlite INTEGER 는 signed 64bit
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+# SQLite 조각 컬럼 색인 (c0 ~ c4) - 거리 DEFAULT_MAX_DISTANCE 까지 찾을 수 있음
+_SQL_LAYOUT = HammingIndex(max_distance=DEFAULT_MAX_DISTANCE)
+_SQL_COLUMNS = [f"c{i}" for i in range(DEFAULT_MAX_DISTANCE + 1)]
+
+
+class PerceptualIndex(object):
+    """
+    이전에 검색한 이미지의 perceptual hash -> 검색 결과 (SQLite 저장)
+    kind 로 결과 형태(search / fanout 등)를 구분한다.
+    """
+
+    def __init__(self, path=DEFAULT_PATH, max_distance: int = DEFAULT_MAX_DISTANCE, hash_func=dhash, memory=True,
+                 ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._puts = 0
+        self.hash_func = hash_func
+        self.max_distance = max_distance
+        self.index = HammingIndex(max_distance=max_distance) if memory else None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._last_id = 0
+        columns = "".join(f"{c} INTEGER NOT NULL, " for c in _SQL_COLUMNS)
+        self._conn().executescript(
+            f"""
+            CREATE TABLE IF NOT EXISTS phashes (
+                id INTEGER PRIMARY KEY,
+                hash INTEGER NOT NULL,
+                {columns}
+                kind TEXT NOT NULL,
+                path TEXT,
+                result TEXT NOT NULL,
+                created_at REAL NOT NULL
+            );
+            """
+            + "".join(
+                f"CREATE INDEX IF NOT EXISTS phashes_{c} ON phashes ({c});" for c in _SQL_COLUMNS
+            )
+            + "CREATE INDEX IF NOT EXISTS phashes_created_at ON phashes (created_at);"
+        )
+        if self.index is not None:
+            self._sync()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _sync(self):
+        """다른 프로세스가 추가한 항목까지 메모리 색인에 반영"""
+        rows = self._conn().execute(
+            "SELECT id, hash FROM phashes WHERE id > ? ORDER BY id", (self._last_id,)
+        ).fetchall()
+        with self._lock:
+            for row_id, value in rows:
+                if row_id > self._last_id:
+                    self.index.add(row_id, value & ((1 << 64) - 1))
+                    self._last_id = row_id
+
+    def hash(self, data: bytes) -> int:
+        return self.hash_func(data)
+
+    def _search_sql(self, value: int, max_distance: int):
+        where = " OR ".join(f"{c} = ?" for c in _SQL_COLUMNS)
+        rows = self._conn().execute(
+            f"SELECT id, hash FROM phashes WHERE {where}", _SQL_LAYOUT.chunks(value)
+        ).fetchall()
+        matches = []
+        for row_id, stored in rows:
+            distance = hamming(value, stored & ((1 << 64) - 1))
+            if distance <= max_distance:
+                matches.append((distance, row_id))
+        return sorted(matches)
+
+    def lookup(self, value: int, kind: str, max_distance: int = None):
+        """가장 가까운 저장 결과 {"distance", "path", "result"} 또는 None"""
+        if max_distance is None:
+            max_distance = self.max_distance
+        if self.index is not None:
+            self._sync()
+            with self._lock:
+                matches = self.index.search(value, max_distance=max_distance)
+        else:
+            matches = self._search_sql(value, min(max_distance, DEFAULT_MAX_DISTANCE))
+        conn = self._conn()
+        oldest = time.time() - self.ttl
+        for distance, row_id in matches:
+            row = conn.execute(
+                "SELECT path, result, kind, created_at FROM phashes WHERE id = ?", (row_id,)
+            ).fetchone()
+            if row is None:
+                # 다른 프로세스가 지운 행 - 메모리 색인에서도 뺌
+                self._forget([row_id])
+                continue
+            # 만료된 결과는 쓰지 않음 (지우는 것은 add 의 _evict)
+            if row[2] == kind and row[3] >= oldest:
+                return {"distance": distance, "path": row[0], "result": json.loads(row[1])}
+        return None
+
+    def _forget(self, row_ids):
+        if self.index is not None and row_ids:
+            with self._lock:
+                for row_id in row_ids:
+                    self.index.remove(row_id)
+
+    def add(self, value: int, kind: str, result, path: str = None):
+        columns = ", ".join(_SQL_COLUMNS)
+        conn = self._conn()
+        now = time.time()
+        conn.execute(
+            f"INSERT INTO phashes (hash, {columns}, kind, path, result, created_at) "
+            f"VALUES (?, {', '.join('?' for _ in _SQL_COLUMNS)}, ?, ?, ?, ?)",
+            (_to_signed(value), *_SQL_LAYOUT.chunks(value), kind, path,
+             json.dumps(result, ensure_ascii=False), now),
+        )
+        with self._lock:
+            evict = self._puts % EVICT_EVERY == 0
+            self._puts += 1
+        if evict:
+            self._evict(conn, now)
+        if self.index is not None:
+            self._sync()
+
+    def _evict(self, conn: sqlite3.Connection, now: float):
+        """만료 항목 (+ max_entries 가 있으면 초과분) 삭제 - 메모리 색인에서도 뺌"""
+        cutoff = now - self.ttl
+        expired = [row_id for (row_id,) in conn.execute("SELECT id FROM phashes WHERE created_at < ?", (cutoff,))]
+        if expired:
+            conn.execute("DELETE FROM phashes WHERE created_at < ?", (cutoff,))
+        if self.max_entries is not None:
+            (count,) = conn.execute("SELECT COUNT(*) FROM phashes").fetchone()
+            if count > self.max_entries:
+                # 오래된 항목부터 삭제
+                oldest = [row_id for (row_id,) in conn.execute(
+                    "SELECT id FROM phashes ORDER BY created_at LIMIT ?", (count - self.max_entries,)
+                )]
+                conn.executemany("DELETE FROM phashes WHERE id = ?", [(row_id,) for row_id in oldest])
+                expired += oldest
+        self._forget(expired)
+
+    def __len__(self):
+        (count,) = self._conn().execute("SELECT COUNT(*) FROM phashes").fetchone()
+        return count
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(memory: bool = True) -> PerceptualIndex:
+    """프로세스 공용 색인 (Pillow 가 없으면 ImportError)"""
+    if importlib.util.find_spec("PIL") is None:
+        raise ImportError("No module named 'PIL'")
+    with _indexes_lock:
+        if memory not in _indexes:
+            _indexes[memory] = PerceptualIndex(memory=memory)
+        return _indexes[memory]
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+단계별 스레드 파이프라인
+
+    read -> encode -> upload -> search -> (emit: 호출자)
+
+단계 사이는 크기가 정해진 queue.Queue 로 연결된다. 뒤 단계가 느리면 앞 단계가
+put() 에서 멈추므로(backpressure) 메모리에 올라가는 작업 수는 queue 크기로 제한된다.
+작업 목록(items)을 읽다가 예외가 나면 이미 넣은 작업은 끝까지 처리한 뒤 run() 이 그 예외를 다시 던진다
+(일부 결과만 쓰고 정상 종료한 것처럼 보이지 않도록).
+"""
+
+import queue
+import threading
+
+_STOP = object()
+
+
+class Stage(object):
+    def __init__(self, name: str, func, workers: int = 1):
+        """
+        :param func: func(job: dict) -> dict, 예외가 나면 job["error"] 에 기록하고 다음 단계는 건너뜀
+                     (job["skip"] 이 True 이면 남은 단계를 건너뛰고 바로 출력)
+        """
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+
+
+class Pipeline(object):
+    def __init__(self, stages, queue_size: int = 16):
+        self.stages = list(stages)
+        self.queue_size = queue_size
+
+    def _worker(self, stage: Stage, inbox: queue.Queue, outbox: queue.Queue, done: list, lock: threading.Lock, next_workers: int):
+        while True:
+            job = inbox.get()
+            if job is _STOP:
+                break
+            if "error" not in job and not job.get("skip"):
+                try:
+                    job = stage.func(job)
+                except Exception as e:
+                    job["error"] = f"{stage.name}: {e}"
+            outbox.put(job)
+
+        # 이 단계의 마지막 작업자가 끝나면 다음 단계 작업자 수만큼 종료 신호 전달
+        with lock:
+            done[0] += 1
+            last = done[0] == stage.workers
+        if last:
+            for _ in range(next_workers):
+                outbox.put(_STOP)
+
+    def _feed(self, items, inbox: queue.Queue, workers: int, errors: list):
+        try:
+            for item in items:
+                inbox.put(item)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            for _ in range(workers):
+                inbox.put(_STOP)
+
+    def run(self, items):
+        """items 를 흘려보내고 마지막 단계를 통과한 job 을 도착 순서대로 yield (items 의 예외는 마지막에 다시 던짐)"""
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        errors = []
+        threads = [
+            threading.Thread(
+                target=self._feed,
+                args=(items, queues[0], self.stages[0].workers, errors),
+                daemon=True,
+            )
+        ]
+        for i, stage in enumerate(self.stages):
+            next_workers = self.stages[i + 1].workers if i + 1 < len(self.stages) else 1
+            done, lock = [0], threading.Lock()
+            for _ in range(stage.workers):
+                threads.append(
+                    threading.Thread(
+                        target=self._worker,
+                        args=(stage, queues[i], queues[i + 1], done, lock, next_workers),
+                        name=f"{stage.name}-worker",
+                        daemon=True,
+                    )
+                )
+        for thread in threads:
+            thread.start()
+
+        outbox = queues[-1]
+        while True:
+            job = outbox.get()
+            if job is _STOP:
+                break
+            yield job
+        if errors:
+            raise errors[0]
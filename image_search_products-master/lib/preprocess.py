@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+업로드 전 이미지 전처리
+
+마켓별 최대 긴 변으로 축소하고, 메타데이터(EXIF 등)를 버리고, JPEG 로 다시 인코딩한다.
+EXIF 를 버리기 전에 Orientation 대로 회전해 둔다 (휴대폰 사진이 옆으로 누워서 올라가지 않도록).
+업로드가 timeout 나면 variants() 의 다음(더 작은) 이미지로 다시 시도한다.
+Pillow 는 선택 의존성이라 실제로 전처리할 때 import 한다.
+"""
+
+import base64
+import io
+
+# 마켓별 최대 긴 변 (px) - 이미지 검색은 이 이상 해상도가 필요 없다
+MAX_EDGE = {
+    "1688": 1200,
+    "taobao": 1000,
+    "alibaba": 1200,
+    "yiwugo": 1000,
+}
+DEFAULT_MAX_EDGE = 1000
+DEFAULT_QUALITY = 85
+
+# timeout 재시도 때 사용할 (긴 변 비율, JPEG 품질 차감)
+VARIANT_STEPS = ((1.0, 0), (0.7, 10), (0.5, 20))
+
+
+class Variant(object):
+    """업로드할 이미지 한 벌"""
+
+    def __init__(self, data: bytes, ext: str, original_size: int, b64: str = None):
+        self.data = data
+        self.ext = ext
+        self.original_size = original_size
+        self._b64 = b64
+
+    @property
+    def size(self) -> int:
+        return len(self.data)
+
+    @property
+    def saved(self) -> int:
+        return self.original_size - self.size
+
+    @property
+    def b64(self) -> str:
+        if self._b64 is None:
+            self._b64 = base64.b64encode(self.data).decode("ascii")
+        return self._b64
+
+    def source(self) -> dict:
+        """업로드 함수 인자 - 이미 인코딩된 base64 가 있으면 그대로, 없으면 bytes 로 넘겨 payload 에서 인코딩"""
+        if self._b64 is not None:
+            return {"b64": self._b64}
+        return {"image": self.data}
+
+
+# EXIF Orientation 태그
+ORIENTATION = 0x0112
+
+
+def preprocess(data: bytes, max_edge: int = DEFAULT_MAX_EDGE, quality: int = DEFAULT_QUALITY) -> bytes:
+    """EXIF 방향대로 회전 + 긴 변 max_edge 이하로 축소 + 메타데이터 제거 + JPEG 재인코딩"""
+    return _preprocess(data, max_edge, quality)[0]
+
+
+def _preprocess(data: bytes, max_edge: int, quality: int):
+    """-> (JPEG bytes, EXIF 방향 때문에 회전했는지)"""
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as img:
+        img.load()
+        rotated = img.getexif().get(ORIENTATION, 1) not in (0, 1)
+        if rotated:
+            img = ImageOps.exif_transpose(img)
+        if img.mode in ("RGBA", "LA", "P"):
+            # 투명 배경은 흰색으로
+            img = img.convert("RGBA")
+            background = Image.new("RGB", img.size, (255, 255, 255))
+            background.paste(img, mask=img.getchannel("A"))
+            img = background
+        elif img.mode != "RGB":
+            img = img.convert("RGB")
+        if max(img.size) > max_edge:
+            img.thumbnail((max_edge, max_edge), Image.LANCZOS)
+        out = io.BytesIO()
+        # exif 를 넘기지 않으면 메타데이터 없이 저장된다
+        img.save(out, format="JPEG", quality=quality, optimize=True)
+        return out.getvalue(), rotated
+
+
+def variants(data: bytes, marketplace: str, ext: str, quality: int = DEFAULT_QUALITY, b64: str = None):
+    """
+    업로드 시도 순서대로 이미지 생성
+    :param ext: 원본 확장자 (전처리 결과가 원본보다 크면 원본을 그대로 사용)
+    """
+    max_edge = MAX_EDGE.get(marketplace, DEFAULT_MAX_EDGE)
+    for scale, quality_drop in VARIANT_STEPS:
+        processed, rotated = _preprocess(data, int(max_edge * scale), max(quality - quality_drop, 30))
+        # 원본이 더 작아도 EXIF 방향이 있으면 회전한 이미지 사용 (마켓은 Orientation 을 보지 않음)
+        if scale == 1.0 and len(processed) >= len(data) and not rotated:
+            yield Variant(data, ext, len(data), b64=b64)
+        else:
+            yield Variant(processed, ".jpg", len(data))
@@ -0,0 +1,241 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+마켓 공통 상품 레코드 + 열(column) 단위 묶음
+
+  - Product: 1688 / 타오바오 / 알리바바 / 이우고 상품 한 개 (__slots__, dict 없음)
+  - ProductBatch: 같은 필드를 열마다 array / list 로 모아 둔 묶음
+    숫자는 array.array (8 byte), 마켓은 1 byte 코드, 문자열은 list 라서
+    결과 5만 건이 중첩 dict 로 들고 있을 때의 수 GB 가 아니라 수십 MB 안에 들어간다.
+    CSV / NumPy .npz 로 저장 (.npz 문자열 열은 UTF-8 bytes + offsets, pickle 없이 읽힘)
+
+알리바바 / 이우고 검색은 지금 검색 URL 만 돌려주므로 상품이 없고,
+상품 목록이 있는 1688 (offers) / 타오바오 (응답 data 의 상품 배열) 만 변환된다.
+"""
+
+import array
+import csv
+import math
+
+MARKETPLACES = ("1688", "taobao", "alibaba", "yiwugo")
+TEXT_FIELDS = ("item_id", "title", "seller", "image_url", "url")
+NUMBER_FIELDS = ("price_min", "price_max", "moq")
+
+
+class Product(object):
+    __slots__ = ("marketplace", "item_id", "title", "price_min", "price_max", "moq", "seller", "image_url", "url")
+
+    def __init__(self, marketplace, item_id=None, title=None, price_min=None, price_max=None, moq=None,
+                 seller=None, image_url=None, url=None):
+        self.marketplace = marketplace
+        self.item_id = item_id
+        self.title = title
+        self.price_min = price_min
+        self.price_max = price_max
+        self.moq = moq
+        self.seller = seller
+        self.image_url = image_url
+        self.url = url
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __repr__(self):
+        return f"Product({self.marketplace}, {self.item_id}, {self.title!r}, {self.price_min})"
+
+    @classmethod
+    def from_1688_offer(cls, offer: dict):
+        """lib.ali1688.offers.normalize_offer 결과 -> Product"""
+        prices = [price for _, price in offer.get("price_tiers") or ()]
+        return cls(
+            "1688",
+            item_id=offer.get("offer_id"),
+            title=offer.get("title"),
+            price_min=min(prices) if prices else None,
+            price_max=max(prices) if prices else None,
+            moq=offer.get("moq"),
+            seller=offer.get("seller"),
+            image_url=offer.get("image_url"),
+            url=offer.get("url"),
+        )
+
+    @classmethod
+    def from_taobao_item(cls, item: dict):
+        """타오바오 이미지 검색 응답의 상품 하나 -> Product"""
+        item_id = _get(item, "itemId", "item_id", "nid", "auctionId", "id")
+        price = _price(_get(item, "price", "priceWap", "promotionPrice", "reservePrice", "view_price"))
+        return cls(
+            "taobao",
+            item_id=str(item_id) if item_id is not None else None,
+            title=_get(item, "title", "raw_title", "itemName"),
+            price_min=price,
+            price_max=price,
+            moq=1,
+            seller=_get(item, "shopName", "shopTitle", "nick", "sellerNick"),
+            image_url=_absolute(_get(item, "pic", "picUrl", "pic_url", "image", "imgUrl")),
+            url=_absolute(_get(item, "url", "auctionURL", "detail_url", "itemUrl"))
+            or (f"https://item.taobao.com/item.htm?id={item_id}" if item_id else None),
+        )
+
+
+def _get(source: dict, *keys):
+    for key in keys:
+        value = source.get(key)
+        if value not in (None, ""):
+            return value
+    return None
+
+
+def _price(value):
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value).replace("¥", "").replace(",", "").strip()
+    try:
+        return float(text.split("-")[0])
+    except ValueError:
+        return None
+
+
+def _absolute(url):
+    if isinstance(url, str) and url.startswith("//"):
+        return "https:" + url
+    return url
+
+
+def _taobao_items(response: dict):
+    data = response.get("data") if isinstance(response, dict) else None
+    if not isinstance(data, dict):
+        return []
+    for key in ("itemsArray", "items", "itemList", "auctions", "resultList"):
+        items = data.get(key)
+        if isinstance(items, list):
+            return items
+    return []
+
+
+def products_from_result(marketplace: str, result: dict):
+    """search_marketplace / batch 결과 하나 -> Product 목록"""
+    if not isinstance(result, dict):
+        return []
+    if marketplace == "1688":
+        return [Product.from_1688_offer(offer) for offer in result.get("offers") or ()]
+    if marketplace == "taobao":
+        # 여러 페이지로 가져온 items 가 있으면 그것을, 없으면 업로드 응답 안의 상품
+        items = result.get("items") or _taobao_items(result.get("response") or result)
+        return [Product.from_taobao_item(item) for item in items if isinstance(item, dict)]
+    return []
+
+
+class ProductBatch(object):
+    """열 단위 상품 묶음 - query(검색한 이미지 경로)별 상품 행을 쌓음"""
+
+    def __init__(self):
+        self.marketplace = array.array("B")
+        self.price_min = array.array("d")
+        self.price_max = array.array("d")
+        self.moq = array.array("q")
+        self.query_index = array.array("I")
+        self.queries = []
+        self._query_ids = {}
+        for name in TEXT_FIELDS:
+            setattr(self, name, [])
+
+    def __len__(self):
+        return len(self.marketplace)
+
+    def _query(self, query: str) -> int:
+        index = self._query_ids.get(query)
+        if index is None:
+            index = self._query_ids[query] = len(self.queries)
+            self.queries.append(query)
+        return index
+
+    def append(self, query: str, product: Product):
+        self.query_index.append(self._query(query))
+        self.marketplace.append(MARKETPLACES.index(product.marketplace))
+        # 없는 값은 NaN / -1 (CSV 에서는 빈 칸)
+        self.price_min.append(math.nan if product.price_min is None else product.price_min)
+        self.price_max.append(math.nan if product.price_max is None else product.price_max)
+        self.moq.append(-1 if product.moq is None else product.moq)
+        for name in TEXT_FIELDS:
+            getattr(self, name).append(getattr(product, name) or "")
+
+    def extend(self, query: str, products):
+        for product in products:
+            self.append(query, product)
+
+    def add_results(self, query: str, results: dict):
+        """fanout / batch 결과 {marketplace: result} 에서 상품을 모두 추가"""
+        for marketplace, result in results.items():
+            self.extend(query, products_from_result(marketplace, result))
+
+    def row(self, i: int) -> Product:
+        price_min, price_max, moq = self.price_min[i], self.price_max[i], self.moq[i]
+        return Product(
+            MARKETPLACES[self.marketplace[i]],
+            price_min=None if math.isnan(price_min) else price_min,
+            price_max=None if math.isnan(price_max) else price_max,
+            moq=None if moq < 0 else moq,
+            **{name: getattr(self, name)[i] or None for name in TEXT_FIELDS},
+        )
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self.queries[self.query_index[i]], self.row(i)
+
+    def to_csv(self, path: str):
+        # Excel 에서 한자/한글이 깨지지 않도록 BOM 포함
+        with open(path, "w", encoding="utf-8-sig", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(("query", "marketplace") + TEXT_FIELDS + NUMBER_FIELDS)
+            for i in range(len(self)):
+                price_min, price_max, moq = self.price_min[i], self.price_max[i], self.moq[i]
+                writer.writerow(
+                    (self.queries[self.query_index[i]], MARKETPLACES[self.marketplace[i]])
+                    + tuple(getattr(self, name)[i] for name in TEXT_FIELDS)
+                    + (
+                        "" if math.isnan(price_min) else price_min,
+                        "" if math.isnan(price_max) else price_max,
+                        "" if moq < 0 else moq,
+                    )
+                )
+
+    def to_npz(self, path: str):
+        """
+        NumPy .npz 저장 (numpy 필요: pip install .[image])
+        문자열 열 <name> 은 <name>_data (uint8, UTF-8) + <name>_offsets (int64, 길이 n+1)
+        """
+        import numpy as np
+
+        arrays = {
+            "marketplace": np.frombuffer(self.marketplace, dtype=np.uint8),
+            "marketplaces": np.array(MARKETPLACES),
+            "price_min": np.frombuffer(self.price_min, dtype=np.float64),
+            "price_max": np.frombuffer(self.price_max, dtype=np.float64),
+            "moq": np.frombuffer(self.moq, dtype=np.int64),
+            "query_index": np.frombuffer(self.query_index, dtype=np.uint32),
+        }
+        for name, values in (("query", self.queries),) + tuple((name, getattr(self, name)) for name in TEXT_FIELDS):
+            encoded = [value.encode("utf-8") for value in values]
+            offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+            np.cumsum([len(value) for value in encoded], out=offsets[1:])
+            arrays[f"{name}_data"] = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+            arrays[f"{name}_offsets"] = offsets
+        np.savez_compressed(path, **arrays)
+
+    def save(self, path: str):
+        """확장자로 형식 선택 (.npz / 그 외 CSV)"""
+        if path.endswith(".npz"):
+            self.to_npz(path)
+        else:
+            self.to_csv(path)
+
+
+def read_npz_text(npz, name: str):
+    """to_npz 로 저장한 문자열 열 읽기"""
+    data = npz[f"{name}_data"].tobytes()
+    offsets = npz[f"{name}_offsets"]
+    return [data[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+프록시 사전 검사 - 목록 전체를 asyncio 로 동시에 접속해 본다
+
+프록시마다 TCP 연결 시간(connect)과, CONNECT target 요청 후 첫 응답 byte 까지 시간(ttfb)을 잰다.
+결과는 빠른 순으로 정렬해 data/proxy_check.json 에 저장하고, 실행 시 ProxyPool 이 읽어
+죽은 프록시를 처음부터 후보에서 뺀다 (request_post 의 10초 timeout 을 맞기 전에).
+asyncio 는 검사할 때만 import 한다 (load_results 는 매 실행 시작 때 호출됨).
+"""
+
+import json
+import os
+import time
+
+DEFAULT_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "proxy_check.json"
+)
+DEFAULT_TARGET = "h5api.m.taobao.com:443"
+DEFAULT_TIMEOUT = 3.0
+DEFAULT_CONCURRENCY = 500
+# 이보다 오래된 검사 결과는 무시
+MAX_AGE = 6 * 60 * 60
+
+
+async def probe(proxy: str, target: str = DEFAULT_TARGET, timeout: float = DEFAULT_TIMEOUT) -> dict:
+    """프록시 하나 검사 -> {"proxy", "ok", "connect_ms", "ttfb_ms", "error"}"""
+    import asyncio
+
+    result = {"proxy": proxy, "ok": False, "connect_ms": None, "ttfb_ms": None, "error": None}
+    host, _, port = proxy.rpartition(":")
+    writer = None
+    try:
+        start = time.perf_counter()
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, int(port)), timeout)
+        result["connect_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+        start = time.perf_counter()
+        writer.write(f"CONNECT {target} HTTP/1.1\r\nHost: {target}\r\n\r\n".encode("ascii"))
+        await writer.drain()
+        status_line = await asyncio.wait_for(reader.readline(), timeout)
+        result["ttfb_ms"] = round((time.perf_counter() - start) * 1000, 1)
+
+        parts = status_line.decode("latin-1").split()
+        if len(parts) >= 2 and parts[1] == "200":
+            result["ok"] = True
+        else:
+            result["error"] = status_line.decode("latin-1").strip() or "empty response"
+    except asyncio.TimeoutError:
+        result["error"] = "timeout"
+    except (OSError, ValueError) as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    finally:
+        if writer is not None:
+            writer.close()
+    return result
+
+
+def rank(results):
+    """정상 프록시를 connect + ttfb 빠른 순으로, 실패한 프록시는 뒤로"""
+    return sorted(
+        results,
+        key=lambda r: (not r["ok"], (r["connect_ms"] or 0) + (r["ttfb_ms"] or 0)),
+    )
+
+
+async def check_all(proxies, target: str = DEFAULT_TARGET, timeout: float = DEFAULT_TIMEOUT, concurrency: int = DEFAULT_CONCURRENCY):
+    import asyncio
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited(proxy):
+        async with semaphore:
+            return await probe(proxy, target=target, timeout=timeout)
+
+    return rank(await asyncio.gather(*(limited(proxy) for proxy in dict.fromkeys(proxies))))
+
+
+def check(proxies, target: str = DEFAULT_TARGET, timeout: float = DEFAULT_TIMEOUT, concurrency: int = DEFAULT_CONCURRENCY, path=DEFAULT_PATH) -> dict:
+    """전체 검사 후 결과 파일 저장"""
+    import asyncio
+
+    started = time.time()
+    results = asyncio.run(check_all(proxies, target=target, timeout=timeout, concurrency=concurrency))
+    report = {
+        "checked_at": started,
+        "elapsed": round(time.time() - started, 2),
+        "target": target,
+        "timeout": timeout,
+        "results": results,
+    }
+    if path:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, path)
+    return report
+
+
+def load_results(path=DEFAULT_PATH, max_age: float = MAX_AGE):
+    """최근 검사 결과 (없거나 오래됐으면 None)"""
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            report = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if time.time() - report.get("checked_at", 0) > max_age:
+        return None
+    return report
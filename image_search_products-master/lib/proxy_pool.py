@@ -0,0 +1,254 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+프록시 풀 - 프록시별 상태 점수로 가중치 선택
+
+프록시마다 응답 시간(EWMA), 성공/실패 수, CAPTCHA 횟수, cooldown 종료 시각을 기록한다.
+선택 확률은 점수에 비례하고, 가중치 합은 Fenwick tree 로 관리해 선택/갱신 모두 O(log n).
+cooldown 중인 프록시는 가중치 0 이고, 시간이 지나면 다시 후보가 된다.
+점수는 JSON 파일에 저장해 다음 실행(C# 이 매번 새로 띄우는 프로세스)에서도 이어서 쓴다.
+"""
+
+import heapq
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+DEFAULT_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "proxy_scores.json"
+)
+
+log = logging.getLogger(__name__)
+
+EWMA_ALPHA = 0.3
+# 응답 시간을 모르는 프록시는 이 값으로 보고 점수 계산 (새 프록시도 선택될 기회를 줌)
+DEFAULT_LATENCY_MS = 1000
+FAILURE_COOLDOWN = 30  # 연속 실패 1회당 cooldown (초), 실패가 이어지면 2배씩
+MAX_COOLDOWN = 30 * 60
+CAPTCHA_COOLDOWN = 10 * 60
+SAVE_INTERVAL = 5
+
+
+class ProxyStats(object):
+    __slots__ = ("latency_ms", "successes", "failures", "captchas", "consecutive_failures", "cooldown_until")
+
+    def __init__(self, latency_ms=None, successes=0, failures=0, captchas=0.0, consecutive_failures=0, cooldown_until=0.0):
+        self.latency_ms = latency_ms
+        self.successes = successes
+        self.failures = failures
+        self.captchas = captchas
+        self.consecutive_failures = consecutive_failures
+        self.cooldown_until = cooldown_until
+
+    def weight(self, now: float) -> float:
+        if self.cooldown_until > now:
+            return 0.0
+        success_rate = (self.successes + 1) / (self.successes + self.failures + 2)
+        latency = DEFAULT_LATENCY_MS if self.latency_ms is None else self.latency_ms
+        speed = 1000 / (1000 + latency)
+        return success_rate * speed / (1 + self.captchas)
+
+    def to_dict(self) -> dict:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class FenwickTree(object):
+    """가중치 누적합 - 갱신 / 누적합 위치 찾기 O(log n)"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.tree = [0.0] * (size + 1)
+        self.values = [0.0] * size
+
+    def set(self, index: int, value: float):
+        delta = value - self.values[index]
+        self.values[index] = value
+        i = index + 1
+        while i <= self.size:
+            self.tree[i] += delta
+            i += i & -i
+
+    def total(self) -> float:
+        return self.prefix(self.size)
+
+    def prefix(self, index: int) -> float:
+        """values[:index] 합"""
+        total, i = 0.0, index
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+    def find(self, target: float) -> int:
+        """누적합이 target 을 넘는 첫 index"""
+        pos, step = 0, 1 << self.size.bit_length()
+        while step:
+            nxt = pos + step
+            if nxt <= self.size and self.tree[nxt] <= target:
+                pos = nxt
+                target -= self.tree[nxt]
+            step >>= 1
+        return min(pos, self.size - 1)
+
+
+class ProxyPool(object):
+    def __init__(self, proxies, path=DEFAULT_PATH, rnd=None):
+        """
+        :param proxies: "host:port" 목록
+        :param path: 점수 저장 파일 (None 이면 저장 안 함)
+        """
+        self.proxies = list(dict.fromkeys(proxies))
+        self.index = {proxy: i for i, proxy in enumerate(self.proxies)}
+        self.path = path
+        self.stats = [ProxyStats() for _ in self.proxies]
+        self.tree = FenwickTree(len(self.proxies))
+        self.random = rnd or random.Random()
+        self._cooldowns = []  # (cooldown_until, index) heap
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._saved_at = time.time()
+        self.load()
+
+    def __len__(self):
+        return len(self.proxies)
+
+    def _refresh(self, i: int, now: float):
+        stats = self.stats[i]
+        self.tree.set(i, stats.weight(now))
+        if stats.cooldown_until > now:
+            heapq.heappush(self._cooldowns, (stats.cooldown_until, i))
+
+    def _release_cooldowns(self, now: float):
+        # cooldown 이 끝난 프록시 가중치 복구
+        while self._cooldowns and self._cooldowns[0][0] <= now:
+            _, i = heapq.heappop(self._cooldowns)
+            if self.stats[i].cooldown_until <= now:
+                self.tree.set(i, self.stats[i].weight(now))
+
+    def choose(self, exclude=None):
+        """점수 비례로 프록시 하나 선택 (후보가 없으면 None)
+        :param exclude: 이 프록시는 빼고 선택 (hedge 요청용)
+        """
+        with self._lock:
+            if not self.proxies:
+                return None
+            now = time.time()
+            self._release_cooldowns(now)
+            total = self.tree.total()
+            skip = self.index.get(exclude)
+            if skip is None:
+                if total <= 0:
+                    return None
+                return self.proxies[self.tree.find(self.random.random() * total)]
+            # exclude 구간을 건너뛰고 나머지 가중치 안에서 선택
+            weight = self.tree.values[skip]
+            if total - weight <= 0:
+                return None
+            target = self.random.random() * (total - weight)
+            if target >= self.tree.prefix(skip):
+                target += weight
+            i = self.tree.find(target)
+            return None if i == skip else self.proxies[i]
+
+    def report(self, proxy, ok: bool, latency_ms: float = None, captcha: bool = False):
+        """
+        요청 결과 기록
+        :param ok: 정상 응답 여부 (timeout / 연결 오류 / 차단이면 False)
+        :param captcha: FAIL_SYS_USER_VALIDATE / RGV587_ERROR / 被挤爆 응답
+        """
+        i = self.index.get(proxy)
+        if i is None:
+            return
+        with self._lock:
+            now = time.time()
+            stats = self.stats[i]
+            if latency_ms is not None:
+                if stats.latency_ms is None:
+                    stats.latency_ms = latency_ms
+                else:
+                    stats.latency_ms += EWMA_ALPHA * (latency_ms - stats.latency_ms)
+            if ok:
+                stats.successes += 1
+                stats.consecutive_failures = 0
+                stats.captchas /= 2
+            else:
+                stats.failures += 1
+                stats.consecutive_failures += 1
+                if captcha:
+                    stats.captchas += 1
+                    cooldown = CAPTCHA_COOLDOWN
+                else:
+                    cooldown = min(FAILURE_COOLDOWN * 2 ** (stats.consecutive_failures - 1), MAX_COOLDOWN)
+                stats.cooldown_until = now + cooldown
+            self._refresh(i, now)
+            self._dirty = True
+            save = now - self._saved_at >= SAVE_INTERVAL
+        if save:
+            self.save()
+
+    def apply_check(self, report: dict, max_age: float):
+        """
+        proxy_check 결과 반영: 실패한 프록시는 결과가 유효한 동안 제외,
+        아직 응답 시간을 모르는 프록시는 connect + ttfb 로 초기값 설정
+        """
+        with self._lock:
+            now = time.time()
+            valid_until = report.get("checked_at", 0) + max_age
+            for result in report.get("results", []):
+                i = self.index.get(result.get("proxy"))
+                if i is None:
+                    continue
+                stats = self.stats[i]
+                if not result.get("ok"):
+                    stats.cooldown_until = max(stats.cooldown_until, valid_until)
+                elif stats.latency_ms is None:
+                    stats.latency_ms = (result.get("connect_ms") or 0) + (result.get("ttfb_ms") or 0)
+                self._refresh(i, now)
+
+    def load(self):
+        now = time.time()
+        if self.path and os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    saved = json.load(f)
+                for proxy, values in saved.get("proxies", {}).items():
+                    i = self.index.get(proxy)
+                    if i is not None:
+                        self.stats[i] = ProxyStats(**{k: v for k, v in values.items() if k in ProxyStats.__slots__})
+            except (OSError, ValueError, TypeError) as e:
+                log.warning(f"⚠️ 프록시 점수 파일 로드 실패: {e}")
+        for i in range(len(self.proxies)):
+            self._refresh(i, now)
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {
+                "saved_at": time.time(),
+                "proxies": {proxy: self.stats[i].to_dict() for i, proxy in enumerate(self.proxies)},
+            }
+            self._dirty = False
+            self._saved_at = time.time()
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        # 다른 프로세스가 반쯤 쓴 파일을 읽지 않도록 임시 파일에 쓰고 교체
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
+
+
+def as_requests_proxies(proxy):
+    """"host:port" -> requests proxies dict"""
+    if not proxy:
+        return None
+    return {
+        'http': f'http://{proxy}',
+        'https': f'http://{proxy}'
+    }
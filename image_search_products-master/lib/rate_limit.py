@@ -0,0 +1,232 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+host 별 요청 속도 제한 - token bucket + AIMD
+
+host 마다 (h5api.m.taobao.com, s.1688.com, OSS, yiwugo ...)
+
+  - token bucket: 초당 rate 개, 최대 burst 개까지 몰아서 보냄
+  - 동시 요청 수 제한: limit 개
+
+를 두고, 응답을 보고 둘 다 조절한다 (AIMD).
+
+  - 정상 응답: rate += RATE_STEP / rate, limit += 1 / limit (왕복 한 번에 약 +1 씩 천천히 증가)
+  - 차단 신호 (HTTP 429 / 5xx, ret 의 FAIL_SYS_USER_VALIDATE / RGV587_ERROR / 被挤爆):
+    rate, limit 를 절반으로 (DECREASE_INTERVAL 안에 여러 번 와도 한 번만 - 이미 보낸 요청의 응답이 몰려오므로)
+  - timeout / 연결 오류: 프록시 문제일 수 있어 그대로 둠
+  - 프록시를 거친 502/503/504: 프록시 게이트웨이 오류와 구분할 수 없어 그대로 둠
+    (나쁜 프록시 하나 때문에 host 전체 속도를 줄이지 않음 - 프록시는 proxy_pool 이 따로 평가)
+
+func_txy.request_get / request_post 와 aio 클라이언트가 모두 공용 rate_limiter 를 거친다.
+한도는 클라이언트별로 따로 둔다 - requests 스레드 클라이언트는 기본값(동시 INITIAL_LIMIT 개부터),
+aio 클라이언트는 CLIENT_DEFAULTS["aio"] (수백 개까지 동시에 보낼 수 있도록).
+"""
+
+import threading
+import time
+from urllib.parse import urlsplit
+
+INITIAL_RATE = 5.0
+MIN_RATE = 0.2
+MAX_RATE = 50.0
+RATE_STEP = 1.0
+BURST = 10
+INITIAL_LIMIT = 8
+MAX_LIMIT = 64
+# 클라이언트별 기본값 (HostLimiter 인수) - 없는 클라이언트는 RateLimiter 기본값
+CLIENT_DEFAULTS = {
+    "aio": {"rate": 20.0, "burst": 50, "limit": 64, "max_rate": 500.0, "max_limit": 512},
+}
+# 프록시를 거친 응답에서는 차단으로 보지 않는 상태 코드 (프록시 게이트웨이 오류일 수 있음)
+PROXY_STATUSES = (502, 503, 504)
+DECREASE_FACTOR = 0.5
+DECREASE_INTERVAL = 2.0
+# 응답 본문에 있으면 차단으로 봄 (run.is_captcha 와 같은 코드)
+BLOCK_MARKERS = tuple(m.encode("utf-8") for m in ("FAIL_SYS_USER_VALIDATE", "RGV587_ERROR", "被挤爆"))
+
+OK = "ok"
+BLOCKED = "blocked"
+NEUTRAL = "neutral"
+
+
+def classify(status_code: int, content: bytes = b"", proxied: bool = False) -> str:
+    """응답 -> OK / BLOCKED / NEUTRAL (proxied: 프록시를 거친 요청)"""
+    if proxied and status_code in PROXY_STATUSES:
+        return NEUTRAL
+    if status_code == 429 or status_code >= 500:
+        return BLOCKED
+    if content and any(marker in content for marker in BLOCK_MARKERS):
+        return BLOCKED
+    return OK
+
+
+class HostLimiter(object):
+    def __init__(self, rate=INITIAL_RATE, burst=BURST, limit=INITIAL_LIMIT, min_rate=MIN_RATE, max_rate=MAX_RATE,
+                 max_limit=MAX_LIMIT):
+        self.rate = rate
+        self.burst = burst
+        self.limit = float(limit)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.max_limit = max_limit
+        self.tokens = float(burst)
+        self.in_flight = 0
+        self.blocked = 0
+        self._updated = time.monotonic()
+        self._decreased = 0.0
+        self._cond = threading.Condition()
+
+    def _try_acquire(self) -> float:
+        """잠금 안에서: 자리와 token 이 있으면 가져가고 0, 없으면 기다릴 시간(초)"""
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self.in_flight >= int(self.limit):
+            # 다른 요청이 끝나면 release 가 깨움
+            return 1.0
+        if self.tokens < 1:
+            return (1 - self.tokens) / self.rate
+        self.tokens -= 1
+        self.in_flight += 1
+        return 0.0
+
+    def acquire(self, timeout: float = None) -> bool:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                wait = self._try_acquire()
+                if not wait:
+                    return True
+                if deadline is not None:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    wait = min(wait, remaining)
+                self._cond.wait(wait)
+
+    async def acquire_async(self):
+        import asyncio
+
+        while True:
+            with self._cond:
+                wait = self._try_acquire()
+            if not wait:
+                return True
+            await asyncio.sleep(min(wait, 0.05))
+
+    def release(self, signal: str = NEUTRAL):
+        with self._cond:
+            self.in_flight -= 1
+            if signal == OK:
+                self.rate = min(self.max_rate, self.rate + RATE_STEP / self.rate)
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            elif signal == BLOCKED:
+                self.blocked += 1
+                now = time.monotonic()
+                if now - self._decreased >= DECREASE_INTERVAL:
+                    self._decreased = now
+                    self.rate = max(self.min_rate, self.rate * DECREASE_FACTOR)
+                    self.limit = max(1.0, self.limit * DECREASE_FACTOR)
+                    self.tokens = min(self.tokens, 0.0)
+            self._cond.notify_all()
+
+    def snapshot(self) -> dict:
+        with self._cond:
+            return {
+                "rate": round(self.rate, 2),
+                "limit": int(self.limit),
+                "in_flight": self.in_flight,
+                "blocked": self.blocked,
+            }
+
+
+class Slot(object):
+    """with 블록 하나 = 요청 하나 (report 하지 않고 나가면 NEUTRAL 로 반납)"""
+
+    def __init__(self, limiter: HostLimiter):
+        self.limiter = limiter
+        self.signal = NEUTRAL
+
+    def report(self, status_code: int, content: bytes = b"", proxied: bool = False):
+        self.signal = classify(status_code, content, proxied)
+        return self.signal
+
+    def __enter__(self):
+        self.limiter.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.limiter.release(self.signal)
+
+    async def __aenter__(self):
+        await self.limiter.acquire_async()
+        return self
+
+    async def __aexit__(self, *exc):
+        self.limiter.release(self.signal)
+
+
+class RateLimiter(object):
+    """(client, host) -> HostLimiter"""
+
+    def __init__(self, enabled: bool = True, **defaults):
+        self.enabled = enabled
+        self.defaults = defaults
+        self.clients = {name: dict(options) for name, options in CLIENT_DEFAULTS.items()}
+        self._limiters = {}
+        self._lock = threading.Lock()
+
+    def get(self, url: str, client: str = None) -> HostLimiter:
+        """
+        :param client: 클라이언트 이름 ("aio" 등) - 클라이언트마다 host 별 한도를 따로 둠 (None 이면 기본 클라이언트)
+        """
+        host = urlsplit(url).netloc
+        key = host if client is None else f"{client}/{host}"
+        limiter = self._limiters.get(key)
+        if limiter is None:
+            with self._lock:
+                limiter = self._limiters.get(key)
+                if limiter is None:
+                    limiter = self._limiters[key] = HostLimiter(**{**self.defaults, **self.clients.get(client, {})})
+        return limiter
+
+    def slot(self, url: str, client: str = None):
+        if not self.enabled:
+            return _NoSlot()
+        return Slot(self.get(url, client))
+
+    def configure(self, enabled: bool = None, **defaults):
+        """기본값 변경 (이미 만든 host 는 그대로, 새 host 부터 적용)"""
+        with self._lock:
+            if enabled is not None:
+                self.enabled = enabled
+            self.defaults.update(defaults)
+
+    def configure_client(self, client: str, **options):
+        """클라이언트 하나의 한도 변경 (예: configure_client("aio", limit=128)) - 새 host 부터 적용"""
+        with self._lock:
+            self.clients.setdefault(client, {}).update(options)
+
+    def snapshot(self) -> dict:
+        return {host: limiter.snapshot() for host, limiter in list(self._limiters.items())}
+
+
+class _NoSlot(object):
+    def report(self, status_code: int, content: bytes = b"", proxied: bool = False):
+        return NEUTRAL
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        pass
+
+
+rate_limiter = RateLimiter()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+결과 전용 출력 채널 - 로그(stdout)와 섞이지 않게 결과만 프레임 단위로 보낸다
+
+  --result-fd 3            상속받은 fd 에 쓴다 (POSIX)
+  --result-pipe <path>     named pipe 에 쓴다 (Windows: \\\\.\\pipe\\predvia, POSIX: mkfifo 경로)
+  --result-format ndjson   한 줄에 JSON 하나 (기본, ensure_ascii=False 라도 JSON 문자열 안의 줄바꿈은 \\n 으로 escape 됨)
+  --result-format lp       4 byte big-endian 길이 + UTF-8 JSON
+
+메시지는 전부 {"type": ..., "seq": n, ...} 형태:
+  {"type": "result", "source": "taobao", "data": {...}}      타오바오 응답 (예전 "Full response:" 줄)
+  {"type": "result", "source": "fanout:alibaba", "data": {...}}  fanout 마켓별 결과 (끝나는 대로)
+  {"type": "job", "data": {"id": 1, "ok": true, ...}}         --serve 작업 결과
+  {"type": "batch", "data": {"path": ..., "ok": ..., ...}}      batch 이미지 한 장 결과 (JSONL 파일과 같은 내용)
+  {"type": "end", "pid": 1234}                                   프로세스 종료 (마지막 메시지)
+호스트는 문자열 치환이나 escape 정리 없이 프레임마다 바로 JSON 파싱하면 된다.
+"""
+
+import json
+import os
+import struct
+import threading
+
+FORMATS = ("ndjson", "lp")
+
+
+class ResultChannel(object):
+    def __init__(self, stream, fmt: str = "ndjson"):
+        """
+        :param stream: 바이너리 쓰기 스트림
+        :param fmt: "ndjson" / "lp"
+        """
+        if fmt not in FORMATS:
+            raise ValueError(f"unknown result format {fmt}")
+        self.stream = stream
+        self.format = fmt
+        self.seq = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+    @classmethod
+    def from_argv(cls, argv):
+        """--result-fd / --result-pipe / --result-format 플래그 -> ResultChannel (지정 안 했으면 None)"""
+        fmt = "ndjson"
+        if '--result-format' in argv:
+            fmt = argv[argv.index('--result-format') + 1]
+        if '--result-fd' in argv:
+            fd = int(argv[argv.index('--result-fd') + 1])
+            return cls(os.fdopen(fd, "wb", closefd=False), fmt)
+        if '--result-pipe' in argv:
+            path = argv[argv.index('--result-pipe') + 1]
+            return cls(open(path, "wb"), fmt)
+        return None
+
+    def encode(self, message: dict) -> bytes:
+        body = json.dumps(message, ensure_ascii=False, separators=(',', ':')).encode("utf-8")
+        if self.format == "lp":
+            return struct.pack(">I", len(body)) + body
+        return body + b"\n"
+
+    def send(self, kind: str, **fields):
+        """메시지 하나를 프레임으로 써서 바로 flush (스레드 안전)"""
+        with self._lock:
+            if self._closed:
+                return
+            self.seq += 1
+            self.stream.write(self.encode({"type": kind, "seq": self.seq, **fields}))
+            self.stream.flush()
+
+    def result(self, source: str, data):
+        self.send("result", source=source, data=data)
+
+    def close(self):
+        """"end" 메시지를 보내고 닫음 (호스트는 이 메시지로 결과가 끝났음을 안다)"""
+        if self._closed:
+            return
+        try:
+            self.send("end", pid=os.getpid())
+        finally:
+            with self._lock:
+                self._closed = True
+                try:
+                    self.stream.close()
+                except OSError:
+                    pass
+
+
+def read_frames(stream, fmt: str = "ndjson"):
+    """바이너리 스트림에서 메시지를 하나씩 읽음 (테스트 / 다른 Python 호스트용)"""
+    if fmt == "lp":
+        while True:
+            header = stream.read(4)
+            if len(header) < 4:
+                return
+            (size,) = struct.unpack(">I", header)
+            yield json.loads(stream.read(size).decode("utf-8"))
+    else:
+        for line in stream:
+            if line.strip():
+                yield json.loads(line.decode("utf-8"))
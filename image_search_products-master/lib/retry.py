@@ -0,0 +1,138 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+재시도 정책 - 오류 분류 + exponential backoff (full jitter)
+
+오류(예외 또는 mtop 응답)를 네 가지로 나눈다.
+
+  RETRY    같은 프록시/토큰으로 다시 (연결 끊김, 502/503/504, 응답은 왔지만 data 가 빔,
+           그 밖의 알 수 없는 오류 - 토큰 발급 실패 / 일시적인 파싱 오류 등은 예전처럼 다시 시도)
+  ROTATE   프록시만 바꿔서 다시 (CAPTCHA/차단, 프록시 연결 실패, timeout - 느린 출구 프록시)
+  REFRESH  토큰/쿠키를 새로 받아서 다시 (FAIL_SYS_TOKEN_EXOIRED 등)
+  FATAL    다시 해도 소용없음 (파일 없음, 잘못된 URL 같은 요청 자체의 오류)
+
+재시도 사이에는 random(0, min(max_delay, base_delay * 2^attempt)) 초를 쉰다
+(바로 다시 보내면 같은 차단/과부하에 또 걸림). 재시도할 때 무엇을 다시 만들지는 호출자가
+on_retry(kind) 로 정한다 - 프록시만 바꾸거나 토큰만 새로 받고 나머지 상태는 그대로 쓴다.
+"""
+
+import json
+import logging
+import random
+import time
+
+from lib.ali1688.token_manager import EXPIRED_CODES
+
+log = logging.getLogger(__name__)
+
+RETRY = "retry"
+ROTATE = "rotate"
+REFRESH = "refresh"
+FATAL = "fatal"
+
+BLOCK_CODES = ("FAIL_SYS_USER_VALIDATE", "RGV587_ERROR", "被挤爆")
+RETRY_STATUS = (502, 503, 504)
+
+
+def classify_exception(e: Exception) -> str:
+    import requests
+
+    if isinstance(e, RetryableError):
+        return e.kind
+    # ProxyError / ConnectTimeout 은 ConnectionError 의 하위 클래스라 먼저 확인
+    if isinstance(e, (requests.exceptions.ProxyError, requests.exceptions.SSLError, requests.exceptions.Timeout)):
+        return ROTATE
+    if isinstance(e, (requests.exceptions.ConnectionError, requests.exceptions.ChunkedEncodingError)):
+        return RETRY
+    if isinstance(e, json.JSONDecodeError):
+        # JSON 이 아닌 응답 (프록시 오류 페이지 등) - requests 의 JSONDecodeError 도 여기
+        return ROTATE
+    if isinstance(e, (requests.exceptions.RequestException, FileNotFoundError)):
+        # InvalidURL / MissingSchema / InvalidHeader 등 (ValueError 이기도 함) - 다시 보내도 같음
+        return FATAL
+    return RETRY
+
+
+def classify_ret(response_json) -> str:
+    """mtop 응답 -> None (성공) / RETRY / ROTATE / REFRESH / FATAL"""
+    if not isinstance(response_json, dict):
+        return ROTATE
+    ret = " ".join(str(x) for x in response_json.get("ret") or ())
+    if any(code in ret for code in EXPIRED_CODES):
+        return REFRESH
+    if any(code in ret for code in BLOCK_CODES):
+        return ROTATE
+    data = response_json.get("data")
+    if isinstance(data, dict) and data:
+        return None
+    # SUCCESS 인데 data 가 비었거나 알 수 없는 실패 - 같은 조건으로 한 번 더
+    return RETRY
+
+
+def classify_status(status_code: int):
+    return RETRY if status_code in RETRY_STATUS else None
+
+
+class RetryableError(Exception):
+    """호출자가 분류까지 정해서 던지는 오류"""
+
+    def __init__(self, kind: str, message: str = ""):
+        super(RetryableError, self).__init__(message or kind)
+        self.kind = kind
+
+
+class RetryPolicy(object):
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.3, max_delay: float = 5.0, retry_on=(RETRY, ROTATE, REFRESH), rnd=None, sleep=time.sleep):
+        """
+        :param retry_on: 재시도할 분류 (나머지는 바로 실패)
+        :param sleep: 테스트용 (기본 time.sleep)
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_on = tuple(retry_on)
+        self.random = rnd or random.Random()
+        self.sleep = sleep
+
+    def delay(self, attempt: int) -> float:
+        """attempt 번째 (0부터) 실패 뒤 쉴 시간 - full jitter"""
+        return self.random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def call(self, fn, classify=None, on_retry=None):
+        """
+        fn(attempt) 를 성공할 때까지 실행
+        :param classify: classify(result) -> None (성공) / 분류 - 없으면 예외가 안 나면 성공
+        :param on_retry: on_retry(kind, attempt, error) - 다음 시도 전에 호출 (프록시 교체, 토큰 갱신 등)
+            on_retry 가 던진 오류도 분류해서 재시도할 수 있으면 다음 시도로
+        :return: 성공한 결과, 재시도를 다 써도 실패면 마지막 결과 (classify 가 실패로 본 결과)
+        """
+        result = None
+        for attempt in range(self.max_attempts):
+            error = None
+            try:
+                result = fn(attempt)
+                kind = classify(result) if classify else None
+            except Exception as e:
+                error = e
+                kind = classify_exception(e)
+            if kind is None:
+                return result
+            if kind not in self.retry_on or attempt == self.max_attempts - 1:
+                if error is not None:
+                    raise error
+                return result
+            if on_retry is not None:
+                try:
+                    on_retry(kind, attempt, error)
+                except Exception as e:
+                    # 재시도 준비 (토큰 발급, 프록시 교체) 실패 - 이번 시도의 실패로 보고 같은 규칙으로 계속
+                    log.warning(f"⚠️ 재시도 준비 실패: {e}")
+                    if classify_exception(e) not in self.retry_on:
+                        raise
+            self.sleep(self.delay(attempt))
+        return result
+
+
+# func_txy 의 GET 기본값 - 연결 끊김 / 502~504 만 짧게 한 번 더 (timeout 은 재시도 안 함: 10초를 또 기다림)
+GET_POLICY = RetryPolicy(max_attempts=2, base_delay=0.2, max_delay=1.0, retry_on=(RETRY,))
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+타오바오 이미지 검색 결과 여러 페이지 가져오기
+
+s.taobao.com/search?imageId=... 는 페이지당 PAGE_SIZE 개 (다음 페이지는 &s=<offset>).
+상위 200 개를 얻으려고 페이지를 하나씩 받으면 페이지 수만큼 왕복 시간이 쌓이므로
+
+  - 페이지 1..N 을 window 개씩 동시에 요청하고 (하나 끝나면 다음 페이지 요청),
+  - 결과는 페이지 순서대로 도착하는 대로 내보내며 (앞 페이지가 늦으면 뒤 페이지는 잠시 보관),
+  - 빈 페이지나 유사도 cutoff 아래 상품이 나오면 그 뒤 페이지는 요청하지 않는다 (이미 보낸 요청은 버림).
+
+페이지 본문은 g_page_config = {...}; 스크립트 또는 같은 내용의 JSON 응답에서 상품 배열을 꺼낸다.
+"""
+
+import json
+import logging
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from lib.ali1688.offers import find_payload
+
+log = logging.getLogger(__name__)
+
+PAGE_SIZE = 44
+MAX_ITEMS = 200
+PAGE_WINDOW = 4
+PAGE_MARKER = "g_page_config"
+SIMILARITY_KEYS = ("similarity", "simScore", "score")
+
+
+def page_offset(page: int) -> int:
+    return (page - 1) * PAGE_SIZE
+
+
+def page_count(max_items: int = MAX_ITEMS, max_pages: int = None) -> int:
+    """max_items 개를 채우는 데 필요한 페이지 수 (max_pages 로 상한)"""
+    pages = -(-max_items // PAGE_SIZE)
+    return min(pages, max_pages) if max_pages else pages
+
+
+def _items_in(config) -> list:
+    if not isinstance(config, dict):
+        return []
+    for path in (("mods", "itemlist", "data", "auctions"), ("data", "itemsArray"), ("data", "items"), ("itemsArray",), ("auctions",)):
+        value = config
+        for key in path:
+            value = value.get(key) if isinstance(value, dict) else None
+        if isinstance(value, list):
+            return [item for item in value if isinstance(item, dict)]
+    return []
+
+
+def parse_items(text: str) -> list:
+    """검색 결과 페이지 (HTML 또는 JSON) -> 상품 dict 목록"""
+    stripped = text.lstrip()
+    if stripped.startswith("{"):
+        try:
+            return _items_in(json.loads(stripped))
+        except ValueError:
+            pass
+    span = find_payload(text, PAGE_MARKER)
+    if span is None:
+        return []
+    try:
+        return _items_in(json.loads(text[span[0]:span[1]]))
+    except ValueError:
+        return []
+
+
+def similarity(item: dict):
+    for key in SIMILARITY_KEYS:
+        value = item.get(key)
+        if value is not None:
+            try:
+                return float(value)
+            except (TypeError, ValueError):
+                return None
+    return None
+
+
+def cut_items(items: list, min_similarity: float = None):
+    """-> (cutoff 이상인 상품, 다음 페이지를 계속 볼지)"""
+    if not items:
+        return [], False
+    if min_similarity is None:
+        return items, True
+    kept = []
+    for item in items:
+        score = similarity(item)
+        if score is not None and score < min_similarity:
+            # 결과는 유사도 순 - 이 뒤로는 전부 cutoff 아래
+            return kept, False
+        kept.append(item)
+    return kept, True
+
+
+def prefetch_pages(fetch_page, pages: int, window: int = PAGE_WINDOW, min_similarity: float = None):
+    """
+    fetch_page(page) -> 상품 목록 을 window 개씩 동시에 실행하고 (page, items) 를 페이지 순서대로 yield
+    빈 페이지 / cutoff 아래 상품이 나온 페이지에서 멈춘다.
+    """
+    if pages <= 0:
+        return
+    executor = ThreadPoolExecutor(max_workers=max(1, min(window, pages)))
+    running = {}
+    done_pages = {}
+    next_page = 1
+    emit_page = 1
+    try:
+        while emit_page <= pages:
+            # 아직 내보내지 못한 페이지까지 window 개 - 앞 페이지가 늦어도 너무 멀리 앞서 요청하지 않음
+            while next_page <= pages and len(running) + len(done_pages) < window:
+                running[executor.submit(fetch_page, next_page)] = next_page
+                next_page += 1
+
+            finished, _ = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in finished:
+                done_pages[running.pop(future)] = future
+
+            # 앞 페이지부터 차례로 내보냄
+            while emit_page in done_pages:
+                try:
+                    page_items = done_pages.pop(emit_page).result()
+                except Exception as e:
+                    if emit_page == 1:
+                        raise
+                    # 이미 내보낸 앞 페이지는 유효 - 여기서 멈춤
+                    log.warning(f"⚠️ 타오바오 검색 {emit_page} 페이지 실패 - 앞 {emit_page - 1} 페이지만 사용: {e}")
+                    return
+                items, more = cut_items(page_items, min_similarity)
+                if items:
+                    yield emit_page, items
+                if not more:
+                    return
+                emit_page += 1
+    finally:
+        # 멈춘 뒤 아직 시작 안 한 요청은 취소, 진행 중인 요청은 기다리지 않음
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -2,13 +2,16 @@
 # -*- coding: utf-8 -*-
 
 
-import base64
 import re
 import time
-from urllib.parse import urlencode
 
+from lib import aio, payload
+from lib.breaker import breakers
 from lib.func_txy import request_get, request_post
 
+# 홈페이지 token 추출이 계속 실패하면 작업마다 timeout 을 기다리지 않고 바로 실패
+TOKEN_BREAKER = "yiwugo:token"
+
 
 class YiWuGo(object):
     def __init__(self):
@@ -28,23 +31,63 @@ class YiWuGo(object):
         }
 
     def get_token(self):
+        breakers.call(TOKEN_BREAKER, self._fetch_token)
+
+    def _fetch_token(self):
         res = request_get(url=self.origin_url, headers=self.headers)
-        token = re.findall('hm.baidu.com/hm.js\?(.*?)";', res.text)
+        self._set_token(res.text)
+
+    async def get_token_async(self, client=None):
+        async def fetch():
+            res = await aio.request_get(url=self.origin_url, headers=self.headers, client=client)
+            self._set_token(res.text)
+
+        await breakers.get(TOKEN_BREAKER).call_async(fetch)
+
+    def _set_token(self, html):
+        token = re.findall('hm.baidu.com/hm.js\?(.*?)";', html)
         self.token = token[0] if len(token) == 1 else ""
+        if not self.token:
+            # 페이지는 왔지만 token 이 없음 - breaker 에 실패로 기록
+            raise Exception("yiwug get token error")
 
-    def upload(self, path):
-        with open(path, "rb") as f:
-            b64_string = base64.b64encode(f.read()).decode("utf-8")
-        data = urlencode({"code": b64_string})
+    def get_data(self, path, b64=None, image=None):
+        # "code=<base64>" form body (파일은 mmap 으로 읽어 조각 단위로 인코딩)
+        return payload.form_payload(
+            "code", image=image, filename=None if image is not None or b64 is not None else path, b64=b64
+        ).body
+
+    def get_cookies(self):
         now = str(int(time.time()))
-        if not self.token:
-            self.get_token()
-        assert self.token, "yiwug get token error"
-        cookies = {
+        return {
             f"Hm_lvt_{self.token}": now,
             f"Hm_lpvt_{self.token}": now,
         }
+
+    def upload(self, path, b64=None, image=None):
+        data = self.get_data(path, b64=b64, image=image)
+        if not self.token:
+            self.get_token()
+        assert self.token, "yiwug get token error"
         res = request_post(
-            url=self.upload_url, data=data, headers=self.headers, cookies=cookies
+            url=self.upload_url, data=data, headers=self.headers, cookies=self.get_cookies()
+        )
+        return res
+
+    async def upload_async(self, path, b64=None, image=None, client=None):
+        import asyncio
+        data = await asyncio.to_thread(self.get_data, path, b64, image)
+        if not self.token:
+            await self.get_token_async(client=client)
+        assert self.token, "yiwug get token error"
+        res = await aio.request_post(
+            url=self.upload_url,
+            data=data,
+            headers=self.headers,
+            cookies=self.get_cookies(),
+            client=client,
         )
         return res
+
+
+breakers.register_probe(TOKEN_BREAKER, lambda: YiWuGo()._fetch_token())
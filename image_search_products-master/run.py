@@ -2,17 +2,53 @@
 # -*- coding: utf-8 -*-
 
 import sys
-import io
 
-# ⭐ UTF-8 출력 강제 설정 (Windows cp949 오류 방지)
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
-sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
+# ⭐ --startup-profile: 모듈별 import 시간 측정 (다른 import 보다 먼저 설치)
+_import_profiler = None
+if '--startup-profile' in sys.argv:
+    from lib.import_profile import ImportProfiler
+    _import_profiler = ImportProfiler().install()
 
-import sqlite3
+import io
+import base64
 import os
-import random
-from lib import alibaba, yiwugo
-from lib.ali1688 import ali1688
+import json
+import logging
+import queue
+import atexit
+import threading
+import time
+
+from lib.log import flush_logs, setup_logging, verbosity
+
+log = logging.getLogger(__name__)
+
+# ⭐ requests / 마켓 모듈 / sqlite3 / 프록시 목록은 실제로 쓰는 작업에서만 로드 (빠른 시작)
+_result_out = sys.stdout
+# ⭐ --result-fd / --result-pipe 로 지정한 결과 전용 채널 (없으면 예전처럼 stdout 에 "Full response:")
+_result_channel = None
+
+
+def setup_stdio():
+    """UTF-8 출력 강제 설정 (Windows cp949 오류 방지), --serve 모드는 stdout 을 결과 전용으로"""
+    global _result_out
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', errors='replace')
+    sys.stderr = io.TextIOWrapper(sys.stderr.buffer, encoding='utf-8', errors='replace')
+    _result_out = sys.stdout
+    if '--serve' in sys.argv:
+        # 디버그 출력은 전부 stderr 로 보냄
+        sys.stdout = sys.stderr
+
+
+def open_result_channel(argv):
+    """결과 전용 채널 열기 - 종료할 때 "end" 메시지를 보내고 닫음"""
+    global _result_channel
+    from lib.result_channel import ResultChannel
+
+    _result_channel = ResultChannel.from_argv(argv)
+    if _result_channel is not None:
+        atexit.register(_result_channel.close)
+    return _result_channel
 
 # ⭐ 프록시 관련 함수
 def load_proxy_list():
@@ -20,75 +56,97 @@ def load_proxy_list():
     proxy_file = "프록시유동_모모아이피.txt"
 
     if not os.path.exists(proxy_file):
-        print(f"⚠️ 프록시 파일 없음: {proxy_file}")
-        sys.stdout.flush()
+        log.warning(f"⚠️ 프록시 파일 없음: {proxy_file}")
         return []
 
     try:
         with open(proxy_file, 'r', encoding='utf-8') as f:
             proxies = [line.strip() for line in f if line.strip()]
-        print(f"✅ 프록시 {len(proxies)}개 로드 완료 (파일: {proxy_file})")
-        sys.stdout.flush()
+        log.info(f"✅ 프록시 {len(proxies)}개 로드 완료 (파일: {proxy_file})")
         return proxies
     except Exception as e:
-        print(f"❌ 프록시 로드 실패: {e}")
-        sys.stdout.flush()
+        log.error(f"❌ 프록시 로드 실패: {e}")
         return []
 
-def get_random_proxy(proxy_list):
-    """랜덤으로 프록시 선택"""
-    if not proxy_list:
-        print("⚠️ 프록시 없음 - 직접 연결")
-        sys.stdout.flush()
+_proxy_list = None
+_proxy_pool = None
+_proxy_lock = threading.Lock()
+
+
+def get_proxy_list():
+    """전역 프록시 목록 (처음 쓸 때 파일에서 로드)"""
+    global _proxy_list
+    with _proxy_lock:
+        if _proxy_list is None:
+            log.info("🔍 프록시 목록 로드 시작...")
+            _proxy_list = load_proxy_list()
+            log.info(f"📊 전역 프록시 목록: {len(_proxy_list)}개")
+        return _proxy_list
+
+
+def get_proxy_pool():
+    """전역 프록시 풀 (처음 쓸 때 생성)"""
+    global _proxy_pool
+    proxy_list = get_proxy_list()
+    with _proxy_lock:
+        if _proxy_pool is None:
+            from lib import proxy_check
+            from lib.proxy_pool import ProxyPool
+
+            # ⭐ 프록시 점수는 data/proxy_scores.json 에 저장해 다음 실행에서도 사용
+            _proxy_pool = ProxyPool(proxy_list)
+            atexit.register(_proxy_pool.save)
+            # ⭐ `run.py proxies check` 결과가 있으면 죽은 프록시는 처음부터 제외
+            report = proxy_check.load_results()
+            if report:
+                _proxy_pool.apply_check(report, proxy_check.MAX_AGE)
+                dead = sum(1 for r in report["results"] if not r["ok"])
+                log.info(f"🩺 프록시 검사 결과 적용: {len(report['results']) - dead}개 정상, {dead}개 제외")
+        return _proxy_pool
+
+
+def choose_proxy():
+    """점수(응답 시간, 성공률, CAPTCHA, cooldown) 비례로 프록시 선택"""
+    if not get_proxy_list():
+        log.warning("⚠️ 프록시 없음 - 직접 연결")
         return None
 
-    proxy = random.choice(proxy_list)
-    print(f"🔄 프록시 사용: {proxy}")
-    sys.stdout.flush()
-    return {
-        'http': f'http://{proxy}',
-        'https': f'http://{proxy}'
-    }
+    proxy = get_proxy_pool().choose()
+    if proxy is None:
+        log.warning("⚠️ 사용 가능한 프록시 없음 (전부 cooldown) - 직접 연결")
+        return None
+    log.info(f"🔄 프록시 사용: {proxy}")
+    return proxy
+
+def report_proxy(upload, start, response_json=None, proxy=None):
+    """업로드에 쓴 프록시 결과를 점수에 기록 (response_json 이 없으면 timeout/연결 오류)
+    :param proxy: 실제로 응답한 프록시 (hedge 요청이 이겼을 때) - 없으면 upload.proxy
+    """
+    proxy = proxy or getattr(upload, "proxy", None)
+    if proxy is None:
+        return
+    if response_json is None:
+        get_proxy_pool().report(proxy, ok=False)
+        return
+    captcha = is_captcha(response_json)
+    get_proxy_pool().report(proxy, ok=not captcha, latency_ms=(time.time() - start) * 1000, captcha=captcha)
 
-# 전역 프록시 목록
-print("🔍 프록시 목록 로드 시작...")
-sys.stdout.flush()
-_proxy_list = load_proxy_list()
-print(f"📊 전역 프록시 목록: {len(_proxy_list)}개")
-sys.stdout.flush()
 
 def get_chrome_cookies_all():
-    """크롬에서 모든 타오바오 쿠키 가져오기"""
-    cookie_path = os.path.expanduser(r"~\AppData\Local\Google\Chrome\User Data\Default\Network\Cookies")
-    
-    if not os.path.exists(cookie_path):
-        print(f"❌ 쿠키 파일을 찾을 수 없습니다: {cookie_path}")
+    """크롬에서 모든 타오바오 쿠키 가져오기 (DB 복사 없이 읽고, 파일이 그대로면 캐시 사용)"""
+    from lib.cookie_store import get_cookie_store
+
+    store = get_cookie_store()
+    if not os.path.exists(store.chrome_path):
+        log.error(f"❌ 쿠키 파일을 찾을 수 없습니다: {store.chrome_path}")
         return {}
-    
+
     try:
-        # Chrome이 실행 중이면 쿠키 DB에 접근할 수 없으므로 복사본 사용
-        import shutil
-        temp_cookie_path = cookie_path + "_temp"
-        shutil.copy2(cookie_path, temp_cookie_path)
-        
-        conn = sqlite3.connect(temp_cookie_path)
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT name, value FROM cookies 
-            WHERE host_key LIKE '%taobao%' AND value != ''
-        """)
-        cookies = {}
-        for name, value in cursor.fetchall():
-            cookies[name] = value
-            print(f"🍪 쿠키 발견: {name}")
-        conn.close()
-        
-        # 임시 파일 삭제
-        os.remove(temp_cookie_path)
-        
-        return cookies
+        cookies = store.chrome_cookies()
+        log.debug(f"🍪 Chrome 쿠키 {len(cookies)}개 발견: {', '.join(cookies)}")
+        return dict(cookies)
     except Exception as e:
-        print(f"❌ 쿠키 로드 오류: {e}")
+        log.error(f"❌ 쿠키 로드 오류: {e}")
         return {}
 
 def get_chrome_cookie():
@@ -96,247 +154,1169 @@ def get_chrome_cookie():
     cookies = get_chrome_cookies_all()
     token = cookies.get('_m_h5_tk')
     if token:
-        print(f"🔑 _m_h5_tk 토큰 발견: {token[:20]}...")
+        log.info(f"🔑 _m_h5_tk 토큰 발견: {token[:20]}...")
     else:
-        print("❌ _m_h5_tk 토큰이 없습니다")
+        log.error("❌ _m_h5_tk 토큰이 없습니다")
     return token
 
 def load_taobao_upload():
     """타오바오 업로드 객체 생성 (쿠키 로드)"""
+    from lib.ali1688 import ali1688
+    from lib.proxy_pool import as_requests_proxies
+
     taobao_upload = None
 
     # ⭐ 프록시 선택 (나중에 세션에 적용)
-    proxy_dict = get_random_proxy(_proxy_list)
+    proxy = choose_proxy()
+    proxy_dict = as_requests_proxies(proxy)
 
     # 1순위: 환경변수에서 토큰 확인
     env_token = os.environ.get('TAOBAO_TOKEN')
-    print(f"🔍 환경변수 TAOBAO_TOKEN: {env_token[:20] + '...' if env_token else 'None'}")
+    log.info(f"🔍 환경변수 TAOBAO_TOKEN: {env_token[:20] + '...' if env_token else 'None'}")
 
     if env_token:
-        print(f"🔑 환경변수에서 _m_h5_tk 토큰 발견: {env_token[:20]}...")
+        log.info(f"🔑 환경변수에서 _m_h5_tk 토큰 발견: {env_token[:20]}...")
         try:
             taobao_upload = ali1688.WorldTaobao(manual_cookie=env_token)
             # ⭐ 프록시를 세션에 적용
             if proxy_dict and hasattr(taobao_upload, 'session'):
                 taobao_upload.session.proxies.update(proxy_dict)
-                print(f"✅ 세션에 프록시 적용 완료")
-            print("✅ 환경변수 토큰으로 타오바오 연결 성공")
+                log.info(f"✅ 세션에 프록시 적용 완료")
+            log.info("✅ 환경변수 토큰으로 타오바오 연결 성공")
         except Exception as e:
-            print(f"❌ 환경변수 토큰 연결 실패: {e}")
+            log.error(f"❌ 환경변수 토큰 연결 실패: {e}")
             taobao_upload = None
 
     # 환경변수 토큰이 없거나 실패한 경우 다른 방법 시도
     if taobao_upload is None:
         try:
-            print("🔍 저장된 쿠키 파일 확인 중...")
+            log.info("🔍 저장된 쿠키 파일 확인 중...")
 
-            # C# 서버에서 저장한 쿠키 파일 경로
-            import json
-            cookie_file_path = os.path.expanduser(r"~\AppData\Roaming\Predvia\taobao_cookies.json")
-            print(f"📁 쿠키 파일 경로: {cookie_file_path}")
-            print(f"📁 파일 존재 여부: {os.path.exists(cookie_file_path)}")
+            # C# 서버에서 저장한 쿠키 파일 (WorldTaobao 와 같은 파싱 결과 공유)
+            from lib.cookie_store import get_cookie_store
+            store = get_cookie_store()
+            log.info(f"📁 쿠키 파일 경로: {store.saved_path}")
+            log.info(f"📁 파일 존재 여부: {store.has_saved_cookies()}")
 
-            if os.path.exists(cookie_file_path):
-                print("✅ 저장된 쿠키 파일 발견")
-                with open(cookie_file_path, 'r', encoding='utf-8') as f:
-                    saved_cookies = json.load(f)
+            if store.has_saved_cookies():
+                log.info("✅ 저장된 쿠키 파일 발견")
+                saved_cookies = store.saved_cookies()
 
-                print(f"📊 쿠키 파일 내용: {len(saved_cookies)}개 쿠키")
-                print(f"🔍 쿠키 키 목록: {list(saved_cookies.keys())}")
+                log.info(f"📊 쿠키 파일 내용: {len(saved_cookies)}개 쿠키")
+                log.debug(f"🔍 쿠키 키 목록: {list(saved_cookies.keys())}")
 
                 # _m_h5_tk 토큰 확인
                 if '_m_h5_tk' in saved_cookies:
                     token = saved_cookies['_m_h5_tk']
-                    print(f"🔑 _m_h5_tk 토큰 발견: {token[:20]}...")
+                    log.info(f"🔑 _m_h5_tk 토큰 발견: {token[:20]}...")
                     taobao_upload = ali1688.WorldTaobao(manual_cookie=token)
                     # ⭐ 프록시를 세션에 적용
                     if proxy_dict and hasattr(taobao_upload, 'session'):
                         taobao_upload.session.proxies.update(proxy_dict)
-                        print(f"✅ 세션에 프록시 적용 완료")
-                    print("✅ 저장된 쿠키로 타오바오 연결 성공")
+                        log.info(f"✅ 세션에 프록시 적용 완료")
+                    log.info("✅ 저장된 쿠키로 타오바오 연결 성공")
                 else:
-                    print("❌ _m_h5_tk 토큰이 저장된 쿠키에 없습니다")
-                    print(f"🔍 실제 쿠키 내용 (처음 5개): {dict(list(saved_cookies.items())[:5])}")
+                    log.error("❌ _m_h5_tk 토큰이 저장된 쿠키에 없습니다")
+                    log.debug(f"🔍 실제 쿠키 내용 (처음 5개): {dict(list(saved_cookies.items())[:5])}")
                     raise Exception("No _m_h5_tk token in saved cookies")
             else:
-                print("❌ 저장된 쿠키 파일이 없습니다")
-                print("세션 모드로 타오바오 연결 시도...")
+                log.warning("❌ 저장된 쿠키 파일이 없습니다")
+                log.info("세션 모드로 타오바오 연결 시도...")
                 taobao_upload = ali1688.WorldTaobao(use_session=True)
                 # ⭐ 프록시를 세션에 적용
                 if proxy_dict and hasattr(taobao_upload, 'session'):
                     taobao_upload.session.proxies.update(proxy_dict)
-                    print(f"✅ 세션에 프록시 적용 완료")
-                print("✅ 세션 모드 성공")
+                    log.info(f"✅ 세션에 프록시 적용 완료")
+                log.info("✅ 세션 모드 성공")
         except Exception as e:
-            print(f"저장된 쿠키/세션 모드 실패: {e}")
-            print("Chrome 쿠키 직접 읽기 모드로 전환...")
+            log.warning(f"저장된 쿠키/세션 모드 실패: {e}")
+            log.info("Chrome 쿠키 직접 읽기 모드로 전환...")
             manual_cookie = get_chrome_cookie()
             if manual_cookie:
                 taobao_upload = ali1688.WorldTaobao(manual_cookie=manual_cookie)
                 # ⭐ 프록시를 세션에 적용
                 if proxy_dict and hasattr(taobao_upload, 'session'):
                     taobao_upload.session.proxies.update(proxy_dict)
-                    print(f"✅ 세션에 프록시 적용 완료")
-                print("✅ Chrome 쿠키 직접 읽기 성공")
+                    log.info(f"✅ 세션에 프록시 적용 완료")
+                log.info("✅ Chrome 쿠키 직접 읽기 성공")
             else:
-                print("❌ 모든 쿠키 획득 방법 실패")
+                log.error("❌ 모든 쿠키 획득 방법 실패")
                 raise Exception("All cookie methods failed")
 
+    # ⭐ 업로드/검색 요청에 프록시 적용
+    taobao_upload.proxy = proxy
+    taobao_upload.proxies = proxy_dict
     return taobao_upload
 
-if __name__ == "__main__":
-    import sys
-    
-    print("=== PYTHON 디버깅 시작 ===")
+FANOUT_MARKETPLACES = ("1688", "taobao", "alibaba")
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".bmp", ".gif")
+
+
+def normalize_taobao(response):
+    """타오바오 업로드 응답 -> {"image_id", "ret", "response"}"""
+    data = response.get("data") or {}
+    return {
+        "image_id": data.get("imageId", "") if isinstance(data, dict) else "",
+        "ret": response.get("ret", []),
+        "response": response,
+    }
+
+
+def error_result(e):
+    """실패한 마켓 결과 - circuit breaker 가 열려 있어 건너뛴 경우 상태 포함"""
+    from lib.breaker import CircuitOpenError
+
+    if isinstance(e, CircuitOpenError):
+        return {
+            "status": "circuit_open",
+            "ok": False,
+            "error": str(e),
+            "circuit": {"key": e.key, "state": "open", "retry_in": round(e.retry_in, 1)},
+        }
+    return {"status": "error", "ok": False, "error": str(e)}
+
+
+def write_result_lines(*lines):
+    """
+    결과 줄을 write 한 번으로 출력 - print 는 본문과 줄바꿈을 따로 써서
+    그 사이에 로그 쓰기 스레드의 줄이 끼어들면 C# 이 읽는 줄이 깨짐
+    """
+    # 앞서 남긴 로그가 먼저 나오도록
+    flush_logs()
+    sys.stdout.write("".join(line + "\n" for line in lines))
     sys.stdout.flush()
 
-    # 명령행 인수에서 이미지 경로 받기
-    if len(sys.argv) > 1:
-        path = sys.argv[1]
-        print(f"📷 [디버그] 명령행에서 받은 이미지 경로: {path}")
-        sys.stdout.flush()
-    else:
-        path = "다운로드.jpg"
-        print("📷 [디버그] 기본 이미지 사용: 다운로드.jpg")
-        sys.stdout.flush()
 
-    # 🔍 실제 파일 존재 여부 및 크기 확인
-    import os
-    if os.path.exists(path):
-        file_size = os.path.getsize(path)
-        print(f"✅ [디버그] 이미지 파일 존재 확인 - 크기: {file_size} bytes")
-        print(f"📁 [디버그] 절대 경로: {os.path.abspath(path)}")
-        sys.stdout.flush()
-    else:
-        print(f"❌ [디버그] 이미지 파일이 존재하지 않음: {path}")
-        print("🔄 [디버그] 기본 이미지로 대체...")
-        sys.stdout.flush()
-        path = "다운로드.jpg"
-        if os.path.exists(path):
-            file_size = os.path.getsize(path)
-            print(f"✅ [디버그] 기본 이미지 사용 - 크기: {file_size} bytes")
-            sys.stdout.flush()
+def print_full_response(response_json):
+    if _result_channel is not None:
+        # ⭐ 결과 채널이 있으면 거기로만 보냄 (stdout 에 수 MB 짜리 줄을 쓰지 않음)
+        _result_channel.result("taobao", response_json)
+        log.info("📨 Full response -> result channel")
+        return
+    # ⭐ 결과 채널이 없으면 "Full response:" 형식으로 출력 (C# 파싱용)
+    json_str = json.dumps(response_json, ensure_ascii=False, separators=(',', ':'))
+    write_result_lines(f"Full response: {json_str}")
+
+
+def print_search_url(image_id, url):
+    """업로드 후 imageId 검색 페이지 - 결과 채널이 있으면 거기로, 없으면 예전처럼 stdout 에 두 줄"""
+    if _result_channel is not None:
+        _result_channel.result("taobao:search", {"image_id": image_id, "search_url": url})
+        return
+    write_result_lines(f"🆔 Image ID: {image_id}", f"🔗 Search URL: {url}")
+
+
+def print_fanout_result(marketplace, res):
+    """fanout 마켓 결과 한 줄 - 결과 채널이 있으면 거기로, 없으면 stdout 에 "Fanout result [마켓]: <JSON>" """
+    if _result_channel is not None:
+        # 끝난 마켓부터 바로 전달
+        _result_channel.result(f"fanout:{marketplace}", res)
+        return
+    # 타오바오 응답 원문은 "Full response:" 줄로 이미 출력함
+    res = {k: v for k, v in res.items() if k != "response"}
+    json_str = json.dumps(res, ensure_ascii=False, separators=(',', ':'))
+    write_result_lines(f"Fanout result [{marketplace}]: {json_str}")
+
+
+def is_captcha(response):
+    """CAPTCHA 또는 차단 응답인지 확인"""
+    ret_value = response.get("ret")
+    if isinstance(ret_value, list):
+        ret_str = ' '.join(str(x) for x in ret_value)
+        return 'FAIL_SYS_USER_VALIDATE' in ret_str or 'RGV587_ERROR' in ret_str or '被挤爆' in ret_str
+    return False
+
+
+class SearchWorker(object):
+    """이미지 검색 작업자 - 세션/토큰/쿠키를 작업 사이에 재사용"""
+
+    def __init__(self, max_retries=3, cache=True, phash="memory", phash_distance=None, preprocess=False, quality=None,
+                 taobao_items=0, taobao_pages=None, hedge=False, print_results=True):
+        """
+        :param cache: True 이면 공용 imageId 캐시 사용, False 이면 캐시 안 씀 (ImageIdCache 직접 지정 가능)
+        :param phash: 비슷한 이미지 결과 재사용 - "memory" (메모리 색인), "sql" (한 번 실행용), False
+        :param phash_distance: 같은 이미지로 볼 최대 해밍 거리 (None 이면 색인 기본값)
+        :param preprocess: 업로드 전 축소/JPEG 재인코딩 (timeout 이면 더 작은 이미지로 재시도)
+        :param quality: 전처리 JPEG 품질
+        :param taobao_items: 타오바오 검색 결과 상품을 이만큼 가져옴 (여러 페이지 동시 요청, 0 이면 안 가져옴)
+        :param taobao_pages: 이미지당 최대 페이지 수
+        :param hedge: 타오바오 업로드/검색이 최근 지연 시간 p95 안에 안 끝나면 다른 프록시로 한 번 더 (lib.hedge)
+        :param print_results: False 이면 결과를 stdout 에 쓰지 않음 (HTTP 서버처럼 결과를 응답으로 돌려주는 경우)
+        """
+        self.max_retries = max_retries
+        self.preprocess = preprocess
+        self.quality = quality
+        self.taobao_items = taobao_items
+        self.taobao_pages = taobao_pages
+        self.hedge = hedge
+        self.print_results = print_results
+        if cache is True:
+            from lib.cache import get_cache
+            cache = get_cache()
+        elif cache is False:
+            cache = None
+        self.cache = cache
+        self.taobao_upload = None
+        self.ali1688_upload = None
+        self.yiwugo = None
+        self._digest = (None, None)
+
+        self.phash_index = None
+        self.phash_distance = phash_distance
+        if phash:
+            try:
+                from lib.phash import get_index
+                self.phash_index = get_index(memory=phash == "memory")
+            except ImportError as e:
+                log.warning(f"⚠️ perceptual hash 사용 불가 (numpy/Pillow 필요): {e}")
+
+    def print_full_response(self, response_json):
+        if self.print_results:
+            print_full_response(response_json)
         else:
-            print("❌ [디버그] 기본 이미지도 없음!")
-            sys.stdout.flush()
-            sys.exit(1)
+            log.debug("📨 Full response 출력 생략 (print_results=False)")
 
-    print(f"🎯 [디버그] 최종 사용할 이미지: {path}")
-    print("=== 이미지 디버깅 완료, 타오바오 연결 시작 ===")
-    sys.stdout.flush()
+    def print_search_url(self, image_id, url):
+        if self.print_results:
+            print_search_url(image_id, url)
+        else:
+            log.debug(f"🔗 Search URL 출력 생략: {url}")
 
-    # --retry 플래그 확인
-    is_retry = '--retry' in sys.argv
-    if is_retry:
-        print("🔄 [재시도 모드] 쿠키 파일을 다시 로드합니다...")
+    def print_fanout_result(self, marketplace, res):
+        if self.print_results:
+            print_fanout_result(marketplace, res)
+        else:
+            log.debug(f"📦 [{marketplace}] Fanout result 출력 생략")
+
+    def digest(self, path):
+        """이미지 파일 sha256 (같은 작업에서 마켓마다 다시 읽지 않도록 마지막 값 보관)"""
+        key = (path, os.path.getmtime(path), os.path.getsize(path))
+        if self._digest[0] != key:
+            from lib.cache import file_digest
+            self._digest = (key, file_digest(path))
+        return self._digest[1]
+
+    def cached_upload(self, marketplace, path):
+        """캐시된 업로드 결과 (imageId / image_key), 없으면 None"""
+        if self.cache is None:
+            return None
+        value = self.cache.get(marketplace, self.digest(path))
+        if value:
+            log.info(f"💾 [{marketplace}] 캐시된 업로드 결과 사용: {value}")
+        return value
+
+    def remember_upload(self, marketplace, path, value):
+        if self.cache is not None and value:
+            self.cache.put(marketplace, self.digest(path), value)
 
-    # ⭐ 최대 3번 재시도 (프록시 변경)
-    max_retries = 3
-    for attempt in range(max_retries):
+    def near_duplicate(self, data, kind):
+        """perceptual hash 로 비슷한 이미지의 이전 검색 결과 찾기 -> (hash, match)"""
+        if self.phash_index is None:
+            return None, None
         try:
-            if attempt > 0:
-                print(f"🔄 재시도 {attempt}/{max_retries} - 새로운 프록시로 연결...")
-                sys.stdout.flush()
-
-            # ⭐ 타오바오 연결 설정 (매번 새 프록시)
-            taobao_upload = load_taobao_upload()
-
-            # 1688 example
-            # get cookie and token
-            # upload image and get image id
-            upload = ali1688.Ali1688Upload()
-            res = upload.upload(filename=path)
+            value = self.phash_index.hash(data)
+        except Exception as e:
+            log.warning(f"⚠️ perceptual hash 계산 실패: {e}")
+            return None, None
+        match = self.phash_index.lookup(value, kind, max_distance=self.phash_distance)
+        if match:
+            log.info(f"🧬 비슷한 이미지의 검색 결과 재사용 (거리 {match['distance']}, {match['path']})")
+        return value, match
+
+    def remember_result(self, value, kind, result, path):
+        if self.phash_index is not None and value is not None:
+            self.phash_index.add(value, kind, result, path=os.path.abspath(path))
+
+    def upload_variants(self, marketplace, data, upload_func, ext=".jpg", b64=None):
+        """
+        upload_func(variant) 로 업로드 -> (결과, 절약한 bytes)
+        전처리를 켜면 마켓별 크기로 줄인 이미지를 올리고, timeout 이면 더 작은 이미지로 다시 시도
+        """
+        import requests
+        from lib.preprocess import DEFAULT_QUALITY, Variant, variants
+
+        if not self.preprocess:
+            return upload_func(Variant(data, ext, len(data), b64=b64)), 0
+
+        error = None
+        for variant in variants(data, marketplace, ext, quality=self.quality or DEFAULT_QUALITY, b64=b64):
+            log.info(f"🗜️ [{marketplace}] 업로드 이미지 {variant.original_size} -> {variant.size} bytes ({variant.saved} bytes 절약)")
+            try:
+                return upload_func(variant), variant.saved
+            except requests.exceptions.Timeout as e:
+                error = e
+                log.warning(f"⏰ [{marketplace}] 업로드 timeout - 더 작은 이미지로 재시도")
+        raise error
+
+    def upload_file(self, marketplace, path, upload_func):
+        with open(path, "rb") as f:
+            data = f.read()
+        return self.upload_variants(marketplace, data, upload_func, ext=os.path.splitext(path)[1])
+
+    def get_taobao_upload(self, reload=False):
+        """타오바오 업로드 객체 (reload=True 이면 새 프록시/쿠키로 다시 생성)"""
+        if reload or self.taobao_upload is None:
+            self.taobao_upload = load_taobao_upload()
+        return self.taobao_upload
+
+    def get_ali1688_upload(self, reload=False):
+        """1688 업로드 객체 (_m_h5_tk 토큰 재사용)"""
+        if reload or self.ali1688_upload is None:
+            from lib.ali1688 import ali1688
+            self.ali1688_upload = ali1688.Ali1688Upload()
+        return self.ali1688_upload
+
+    def search_1688(self, path):
+        # 1688 example
+        # get cookie and token
+        # upload image and get image id
+        image_id = self.cached_upload("1688", path)
+        cached = bool(image_id)
+        bytes_saved = 0
+        if not cached:
+            upload = self.get_ali1688_upload()
+            res, bytes_saved = self.upload_file("1688", path, lambda v: upload.upload(**v.source()))
             image_id = res.json().get("data", {}).get("imageId", "")
             if not image_id:
-                raise Exception("not image id")
-            print(image_id)
+                # ⭐ 토큰 만료 가능성 - 캐시된 토큰을 버리고 새로 발급받은 뒤 다음 시도
+                from lib.retry import REFRESH, RetryableError
+                upload.renew_token(res.cookies)
+                raise RetryableError(REFRESH, "not image id")
+            self.remember_upload("1688", path, image_id)
+        log.info(image_id)
 
-            # search goods by image id
-            image_search = ali1688.Ali1688ImageSearch()
-            req = image_search.request(image_id=image_id)
-            print(req.url)
-                
-            res = taobao_upload.upload(filename=path)
-            response_json = res.json()
+        # search goods by image id
+        from lib.ali1688 import ali1688
+        image_search = ali1688.Ali1688ImageSearch()
+        req = image_search.request(image_id=image_id)
+        log.info(req.url)
+        offers = image_search.check_goods(req.text)
+        log.info(f"📦 [1688] 상품 {len(offers)}개")
+        return {
+            "image_id": image_id,
+            "search_url": req.url,
+            "offers": offers,
+            "cached": cached,
+            "bytes_saved": bytes_saved,
+        }
 
-            # ⭐ 응답 분석
-            print(f"📊 타오바오 API 응답 코드: {res.status_code}")
-            sys.stdout.flush()
+    def send_hedged(self, key, upload, send):
+        """
+        send(proxy) -> 결과 (proxy 는 "host:port" / None)
+        hedge 가 켜져 있고 다른 프록시가 있으면 느릴 때 다른 프록시로 같은 요청을 한 번 더 보내고 먼저 온 결과 사용
+        두 번 보내도 되는 요청만 (검색 GET, 타오바오 업로드)
+        """
+        current = getattr(upload, "proxy", None)
+        other = get_proxy_pool().choose(exclude=current) if self.hedge and get_proxy_list() else None
+        if other is None:
+            return send(current)
+        from lib.hedge import hedgers
+
+        def lost(seconds):
+            # ⭐ 이긴 쪽만 기록하면 느린 프록시 점수가 내려가지 않음 - 진 primary 는 실패로 (지금까지 걸린 시간과 함께) 기록
+            if current is not None:
+                get_proxy_pool().report(current, ok=False, latency_ms=seconds * 1000)
+
+        return hedgers.get(key).call(lambda: send(current), lambda: send(other), on_lose=lost)
+
+    def taobao_upload_func(self, upload):
+        """upload_variants 용 업로드 함수 - 응답에 실제로 쓴 프록시를 .proxy 로 붙임"""
+        from lib.proxy_pool import as_requests_proxies
+
+        def send(variant, proxy):
+            res = upload.upload(**variant.source(), proxies=as_requests_proxies(proxy))
+            res.proxy = proxy
+            return res
+
+        return lambda v: self.send_hedged("taobao:upload", upload, lambda proxy: send(v, proxy))
+
+    def taobao_search(self, upload, image_id):
+        """imageId 검색 페이지 요청 (hedge 가능)"""
+        from lib.proxy_pool import as_requests_proxies
+
+        return self.send_hedged(
+            "taobao:search", upload, lambda proxy: upload.search(image_id, proxies=as_requests_proxies(proxy))
+        )
+
+    def rotate_taobao_proxy(self):
+        """쿠키/토큰은 그대로 두고 프록시만 교체"""
+        from lib.proxy_pool import as_requests_proxies
+
+        upload = self.get_taobao_upload()
+        proxy = choose_proxy()
+        upload.proxy = proxy
+        upload.proxies = as_requests_proxies(proxy)
+        if hasattr(upload, "session"):
+            upload.session.proxies.clear()
+            upload.session.proxies.update(upload.proxies or {})
+        return upload
+
+    def renew_taobao_token(self, response_cookies=None):
+        """
+        토큰 만료 - 쿠키/프록시는 그대로 두고 _m_h5_tk 만 새로 발급
+        (load_taobao_upload 는 같은 TAOBAO_TOKEN / 쿠키 파일을 다시 읽을 뿐이라 쓰지 않음)
+        """
+        from lib.ali1688.token_manager import get_token_manager
+
+        upload = self.get_taobao_upload()
+        if upload.token_manager is None:
+            # 다음 업로드부터 TokenManager 의 (새) 토큰 사용 - 1688 업로드와 같은 host 라 공유
+            upload.token_manager = get_token_manager(upload.hostname, upload.fetch_token_cookies)
+        if not upload.renew_token(response_cookies or {}):
+            raise Exception("taobao token renew failed")
+        return upload
+
+    def search_taobao(self, path, reload=False, with_1688=True):
+        """
+        1688 + 타오바오 업로드 (최대 max_retries 번)
+        실패 종류에 따라 프록시만 바꾸거나(CAPTCHA/timeout) 토큰만 새로 발급받고(토큰 만료)
+        나머지(1688 결과, 세션, 쿠키)는 재시도에서 그대로 쓴다. 재시도 사이 backoff + jitter.
+        프록시 교체 / 토큰 갱신은 실제로 실패한 쪽(1688 또는 타오바오)에만 한다.
+        """
+        from lib import retry
+
+        result = {"ali1688": None, "taobao": None}
+        max_retries = self.max_retries
+        policy = retry.RetryPolicy(max_attempts=max_retries)
+        # host: 마지막으로 실패할 수 있었던 요청 ("1688" / "taobao"), cookies: 타오바오 응답 쿠키 (새 _m_h5_tk)
+        last = {"kind": None, "host": None, "cookies": None}
+        self.get_taobao_upload(reload=reload)
 
-            # ret 필드 확인 (오류 체크)
+        def attempt(n):
+            if with_1688 and result["ali1688"] is None:
+                last["host"] = "1688"
+                result["ali1688"] = self.search_1688(path)
+
+            last["host"] = "taobao"
+            taobao_upload = self.taobao_upload
+            start = time.time()
+            try:
+                res, result["bytes_saved"] = self.upload_file(
+                    "taobao", path, self.taobao_upload_func(taobao_upload)
+                )
+                response_json = res.json()
+            except Exception:
+                report_proxy(taobao_upload, start)
+                raise
+            report_proxy(taobao_upload, start, response_json, proxy=getattr(res, "proxy", None))
+            result["taobao"] = response_json
+            last["cookies"] = res.cookies
+
+            # ⭐ 응답 분석
+            log.info(f"📊 타오바오 API 응답 코드: {res.status_code}")
             if "ret" in response_json:
                 ret_value = response_json["ret"]
-                print(f"📋 API ret 값: {ret_value}")
-                sys.stdout.flush()
-
-                # CAPTCHA 또는 차단 감지
-                if isinstance(ret_value, list):
-                    ret_str = ' '.join(str(x) for x in ret_value)
-                    if 'FAIL_SYS_USER_VALIDATE' in ret_str or 'RGV587_ERROR' in ret_str or '被挤爆' in ret_str:
-                        if attempt < max_retries - 1:
-                            print(f"🚫 CAPTCHA/차단 감지 - 프록시 변경 후 재시도 ({attempt + 1}/{max_retries})")
-                            sys.stdout.flush()
-                            continue  # 다음 프록시로 재시도
-                        else:
-                            print(f"❌ {max_retries}번 재시도 후에도 CAPTCHA 문제 지속됨")
-                            sys.stdout.flush()
-                            break
-
-            # ⭐ 항상 "Full response:" 형식으로 출력 (C# 파싱용)
-            import json
-            json_str = json.dumps(response_json, ensure_ascii=False, separators=(',', ':'))
-            print(f"Full response: {json_str}")
-            sys.stdout.flush()
-
-            # data 필드 확인
-            data = response_json.get("data")
-            if data and isinstance(data, dict) and len(data) > 0:
-                print("✅ taobao_upload success")
-                sys.stdout.flush()
-                break  # 성공하면 루프 종료
+                # 실패 ret (토큰 만료 등) 은 기본 레벨에서도 출력 - C# 이 stdout 에서 찾음
+                ret_ok = isinstance(ret_value, list) and any(str(x).startswith("SUCCESS") for x in ret_value)
+                log.log(logging.INFO if ret_ok else logging.WARNING, f"📋 API ret 값: {ret_value}")
+            return response_json
+
+        def classify(response_json):
+            kind = last["kind"] = retry.classify_ret(response_json)
+            # CAPTCHA/차단 응답은 출력하지 않음 (예전과 같음)
+            if not is_captcha(response_json):
+                self.print_full_response(response_json)
+            if kind is None:
+                log.info("✅ taobao_upload success")
+                self.remember_upload("taobao", path, response_json["data"].get("imageId", ""))
+            return kind
+
+        def on_retry(kind, n, error):
+            reason = f"오류 발생: {error}" if error is not None else {
+                retry.ROTATE: "CAPTCHA/차단 감지",
+                retry.REFRESH: "토큰 만료",
+            }.get(kind, "데이터 없음")
+            if last["host"] != "taobao":
+                # 1688 요청 실패 - 타오바오 프록시/토큰은 그대로 (1688 토큰은 search_1688 에서 갱신)
+                log.warning(f"⚠️ [1688] {reason} - 재시도 ({n + 1}/{max_retries})")
+            elif kind == retry.ROTATE:
+                log.warning(f"🚫 {reason} - 프록시 변경 후 재시도 ({n + 1}/{max_retries})")
+                self.rotate_taobao_proxy()
+            elif kind == retry.REFRESH and error is None:
+                log.warning(f"🔑 {reason} - 토큰 새로 발급 후 재시도 ({n + 1}/{max_retries})")
+                self.renew_taobao_token(last["cookies"])
             else:
-                if attempt < max_retries - 1:
-                    print(f"⚠️ 데이터 없음 - 재시도 ({attempt + 1}/{max_retries})")
-                    sys.stdout.flush()
-                    continue
-                else:
-                    print("❌ 최종 실패: 데이터 없음")
-                    sys.stdout.flush()
+                log.warning(f"⚠️ {reason} - 재시도 ({n + 1}/{max_retries})")
 
+        try:
+            response_json = policy.call(attempt, classify=classify, on_retry=on_retry)
         except Exception as e:
-            if attempt < max_retries - 1:
-                print(f"❌ 오류 발생: {e} - 재시도 ({attempt + 1}/{max_retries})")
-                sys.stdout.flush()
+            log.error(f"❌ 최종 실패: {e}")
+            raise
+
+        if last["kind"] is None:
+            return result
+        if is_captcha(response_json):
+            log.error(f"❌ {max_retries}번 재시도 후에도 CAPTCHA 문제 지속됨")
+            return result
+        log.error("❌ 최종 실패: 데이터 없음")
+        log.error(f"❌ 타오바오 업로드 실패!")
+        raise Exception("taobao upload fail")
+
+    def search_alibaba(self, path):
+        # alibaba example
+        from lib import alibaba
+
+        image_key = self.cached_upload("alibaba", path)
+        cached = bool(image_key)
+        bytes_saved = 0
+        if not cached:
+            upload = alibaba.Upload()
+            image_key, bytes_saved = self.upload_file(
+                "alibaba", path, lambda v: upload.upload(filename=f"image{v.ext}", bytestream=v.data)
+            )
+            self.remember_upload("alibaba", path, image_key)
+        log.info(f"{image_key}")
+
+        image_searh = alibaba.ImageSearch()
+        req = image_searh.search(image_key=image_key)
+        log.info(req.url)
+        return {"image_key": image_key, "search_url": req.url, "cached": cached, "bytes_saved": bytes_saved}
+
+    def search_yiwugo(self, path):
+        # yiwugo (token 재사용)
+        if self.yiwugo is None:
+            from lib import yiwugo
+            self.yiwugo = yiwugo.YiWuGo()
+        res, bytes_saved = self.upload_file("yiwugo", path, lambda v: self.yiwugo.upload(path, **v.source()))
+        log.info(res.status_code)
+        if "起购" not in res.text:
+            self.yiwugo.token = ""
+            raise Exception("yiwugo search error")
+        return {"status_code": res.status_code, "search_url": res.url, "bytes_saved": bytes_saved}
+
+    def search(self, path, reload=False):
+        """이미지 한 장 검색 (1688 -> 타오바오 -> 알리바바 순서)"""
+        with open(path, "rb") as f:
+            value, match = self.near_duplicate(f.read(), "search")
+        if match:
+            result = match["result"]
+            if result.get("taobao"):
+                self.print_full_response(result["taobao"])
+            if result.get("taobao_search_url"):
+                self.print_search_url(result["taobao"]["data"].get("imageId", ""), result["taobao_search_url"])
+            result["near_duplicate"] = {"distance": match["distance"], "path": match["path"]}
+            return result
+
+        from lib.breaker import CircuitOpenError
+
+        result = self.search_taobao(path, reload=reload)
+        taobao = result.get("taobao") or {}
+        data = taobao.get("data")
+        image_id = data.get("imageId", "") if isinstance(data, dict) else ""
+        if image_id:
+            # 검색 결과 확인 (imageId 검색 페이지)
+            req = self.taobao_search(self.get_taobao_upload(), image_id)
+            result["taobao_search_url"] = req.url
+            self.print_search_url(image_id, req.url)
+        elif taobao:
+            log.warning("⚠️ No image ID found in response")
+        try:
+            result["alibaba"] = self.search_alibaba(path)
+        except CircuitOpenError as e:
+            # 알리바바 서명 API 장애 중 - 타오바오 결과는 그대로 돌려줌
+            log.warning(f"🔌 알리바바 건너뜀: {e}")
+            result["alibaba"] = error_result(e)
+        # 타오바오 데이터가 있는 결과만 저장
+        if (result.get("taobao") or {}).get("data"):
+            self.remember_result(value, "search", result, path)
+        return result
+
+    def search_taobao_items(self, image_id, reload=False):
+        """imageId 검색 결과 상위 taobao_items 개 - 페이지를 동시에 받고 도착하는 페이지부터 결과 채널로 전달"""
+        from lib.proxy_pool import as_requests_proxies
+
+        items = []
+        upload = self.get_taobao_upload(reload=reload)
+
+        def fetch_page(page):
+            return self.send_hedged(
+                "taobao:search", upload,
+                lambda proxy: upload.search_page_items(image_id, page, proxies=as_requests_proxies(proxy)),
+            )
+
+        for page, page_items in upload.search_pages(
+            image_id, max_items=self.taobao_items, max_pages=self.taobao_pages, fetch_page=fetch_page
+        ):
+            items.extend(page_items)
+            if _result_channel is not None:
+                _result_channel.result(f"taobao:page{page}", page_items)
+            log.info(f"📄 [taobao] {page} 페이지 상품 {len(page_items)}개")
+        return items
+
+    def search_marketplace(self, marketplace, path, reload=False):
+        """마켓 하나만 검색해서 정규화된 결과 반환"""
+        if marketplace == "1688":
+            return self.search_1688(path)
+        if marketplace == "taobao":
+            image_id = self.cached_upload("taobao", path)
+            if image_id:
+                # 캐시 hit - 업로드 없이 imageId 로 바로 검색
+                req = self.taobao_search(self.get_taobao_upload(reload=reload), image_id)
+                # C# 이 imageId 를 받을 수 있도록 업로드 응답과 같은 형식으로 출력
+                response = {"ret": ["SUCCESS::调用成功"], "data": {"imageId": image_id}, "cached": True}
+                self.print_full_response(response)
+                result = {**normalize_taobao(response), "search_url": req.url, "cached": True}
+            else:
+                result = self.search_taobao(path, reload=reload, with_1688=False)
+                result = {**normalize_taobao(result.get("taobao") or {}), "bytes_saved": result.get("bytes_saved", 0)}
+            if self.taobao_items and result.get("image_id"):
+                result["items"] = self.search_taobao_items(result["image_id"])
+            return result
+        if marketplace == "alibaba":
+            return self.search_alibaba(path)
+        if marketplace == "yiwugo":
+            return self.search_yiwugo(path)
+        raise Exception(f"unknown marketplace {marketplace}")
+
+    def search_fanout(self, path, marketplaces=FANOUT_MARKETPLACES, deadline=30, reload=False):
+        """
+        여러 마켓을 동시에 검색 - 전체 deadline 안에 끝난 마켓 결과만 모으고
+        늦은 마켓은 "timeout" 으로 보고한다 (느린 알리바바가 타오바오 결과를 막지 않음)
+        """
+        kind = "fanout:" + ",".join(sorted(marketplaces))
+        with open(path, "rb") as f:
+            value, match = self.near_duplicate(f.read(), kind)
+        if match:
+            results = match["result"]
+            if (results.get("taobao") or {}).get("response"):
+                self.print_full_response(results["taobao"]["response"])
+            for marketplace, res in results.items():
+                res["near_duplicate"] = {"distance": match["distance"], "path": match["path"]}
+                self.print_fanout_result(marketplace, res)
+            return results
+
+        results_queue = queue.Queue()
+
+        def run(marketplace):
+            start = time.time()
+            try:
+                res = {"status": "ok", "ok": True, **self.search_marketplace(marketplace, path, reload=reload)}
+            except Exception as e:
+                res = error_result(e)
+            res["elapsed_ms"] = int((time.time() - start) * 1000)
+            results_queue.put((marketplace, res))
+
+        # ⭐ daemon 스레드 - deadline 을 넘긴 마켓이 프로세스 종료를 막지 않도록
+        for marketplace in marketplaces:
+            threading.Thread(target=run, args=(marketplace,), daemon=True).start()
+
+        results = {}
+        end = time.time() + deadline
+        while len(results) < len(marketplaces):
+            remaining = end - time.time()
+            if remaining <= 0:
+                break
+            try:
+                marketplace, res = results_queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            results[marketplace] = res
+            log.info(f"📦 [{marketplace}] {res['status']} ({res['elapsed_ms']}ms)")
+            self.print_fanout_result(marketplace, res)
+
+        for marketplace in marketplaces:
+            if marketplace not in results:
+                results[marketplace] = {"status": "timeout", "ok": False, "error": f"deadline {deadline}s exceeded"}
+                log.warning(f"⏰ [{marketplace}] timeout ({deadline}s)")
+                self.print_fanout_result(marketplace, results[marketplace])
+
+        if all(res["ok"] for res in results.values()):
+            self.remember_result(value, kind, results, path)
+        return results
+
+
+def iter_batch_jobs(source):
+    """
+    디렉터리(이미지 파일) 또는 manifest(한 줄에 경로 하나 또는 {"path": ...} JSON) 에서 작업 생성
+    잘못된 manifest 줄은 "error" 가 있는 작업으로 (단계는 건너뛰고 그 작업만 실패로 기록)
+    """
+    if os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                yield {"path": os.path.join(source, name)}
+        return
+
+    with open(source, 'r', encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
                 continue
+            if line.startswith("{"):
+                yield manifest_job(line, number)
             else:
-                print(f"❌ 최종 실패: {e}")
-                sys.stdout.flush()
+                yield {"path": line}
+
+
+def manifest_job(line, number):
+    """manifest JSON 줄 -> 작업 ({"path": 문자열} 이 아니면 error 작업)"""
+    try:
+        job = json.loads(line)
+    except ValueError as e:
+        return {"path": "", "error": f"manifest line {number}: invalid JSON ({e})"}
+    if not isinstance(job, dict) or not isinstance(job.get("path"), str) or not job["path"]:
+        return {"path": "", "error": f"manifest line {number}: \"path\" 가 없음"}
+    return job
+
+
+class BatchStages(object):
+    """batch 모드 단계 함수 - upload/search 작업자 스레드마다 SearchWorker 하나씩 사용"""
+
+    def __init__(self, marketplaces=FANOUT_MARKETPLACES, **options):
+        """
+        :param options: SearchWorker 옵션 (cache, phash, phash_distance, preprocess, quality)
+        """
+        self.marketplaces = marketplaces
+        self.kind = "batch:" + ",".join(sorted(marketplaces))
+        self.options = options
+        self._local = threading.local()
+
+    def worker(self):
+        if not hasattr(self._local, "worker"):
+            self._local.worker = SearchWorker(**self.options)
+        return self._local.worker
+
+    def read(self, job):
+        with open(job["path"], "rb") as f:
+            job["raw"] = f.read()
+        from lib.cache import image_digest
+        job["digest"] = image_digest(job["raw"])
+
+        # 비슷한 이미지를 이미 검색했으면 나머지 단계는 건너뜀
+        job["phash"], match = self.worker().near_duplicate(job["raw"], self.kind)
+        if match:
+            job["results"] = match["result"]
+            for res in job["results"].values():
+                res["near_duplicate"] = {"distance": match["distance"], "path": match["path"]}
+            job["skip"] = True
+            del job["raw"]
+        return job
+
+    def encode(self, job):
+        # 전처리를 켜면 마켓마다 다른 크기로 줄인 뒤 upload 단계에서 인코딩
+        if not self.options.get("preprocess"):
+            job["b64"] = base64.b64encode(job["raw"]).decode("ascii")
+        return job
+
+    def upload(self, job):
+        worker = self.worker()
+        job["uploads"] = {}
+        job["results"] = {}
+        job["bytes_saved"] = {}
+        for marketplace in self.marketplaces:
+            try:
+                cached = worker.cache.get(marketplace, job["digest"]) if worker.cache is not None else None
+                if cached:
+                    job["uploads"][marketplace] = (cached, True)
+                    continue
+                uploaded = self._upload(worker, marketplace, job)
+                if worker.cache is not None:
+                    value = normalize_taobao(uploaded)["image_id"] if marketplace == "taobao" else uploaded
+                    if value:
+                        worker.cache.put(marketplace, job["digest"], value)
+                job["uploads"][marketplace] = (uploaded, False)
+            except Exception as e:
+                job["results"][marketplace] = error_result(e)
+        # ⭐ 이미지 데이터는 여기서 해제 (메모리 제한)
+        job.pop("raw")
+        job.pop("b64", None)
+        return job
+
+    def _upload_variants(self, worker, marketplace, job, upload_func):
+        res, job["bytes_saved"][marketplace] = worker.upload_variants(
+            marketplace, job["raw"], upload_func, ext=os.path.splitext(job["path"])[1], b64=job.get("b64")
+        )
+        return res
+
+    def _upload(self, worker, marketplace, job):
+        if marketplace == "1688":
+            upload = worker.get_ali1688_upload()
+            res = self._upload_variants(worker, marketplace, job, lambda v: upload.upload(**v.source()))
+            image_id = res.json().get("data", {}).get("imageId", "")
+            if not image_id:
+                worker.ali1688_upload = None
+                raise Exception("not image id")
+            return image_id
+        if marketplace == "taobao":
+            taobao_upload = worker.get_taobao_upload()
+            start = time.time()
+            try:
+                res = self._upload_variants(worker, marketplace, job, worker.taobao_upload_func(taobao_upload))
+                response_json = res.json()
+            except Exception:
+                report_proxy(taobao_upload, start)
+                # 다음 작업은 새 프록시로
+                worker.taobao_upload = None
                 raise
+            report_proxy(taobao_upload, start, response_json, proxy=getattr(res, "proxy", None))
+            if is_captcha(response_json):
+                # 다음 작업은 새 프록시/쿠키로
+                worker.taobao_upload = None
+                raise Exception(f"captcha {response_json.get('ret')}")
+            return response_json
+        if marketplace == "alibaba":
+            from lib import alibaba
+            upload = alibaba.Upload()
+            return self._upload_variants(
+                worker, marketplace, job, lambda v: upload.upload(filename=f"image{v.ext}", bytestream=v.data)
+            )
+        raise Exception(f"unknown marketplace {marketplace}")
+
+    def search(self, job):
+        bytes_saved = job.pop("bytes_saved")
+        for marketplace, (uploaded, cached) in job.pop("uploads").items():
+            try:
+                job["results"][marketplace] = {
+                    "ok": True,
+                    **self._search(marketplace, uploaded, cached),
+                    "cached": cached,
+                    "bytes_saved": bytes_saved.get(marketplace, 0),
+                }
+            except Exception as e:
+                job["results"][marketplace] = error_result(e)
+        if all(res["ok"] for res in job["results"].values()):
+            self.worker().remember_result(job["phash"], self.kind, job["results"], job["path"])
+        return job
+
+    def _search(self, marketplace, uploaded, cached=False):
+        from lib import alibaba
+        from lib.ali1688 import ali1688
+
+        if marketplace == "1688":
+            image_search = ali1688.Ali1688ImageSearch()
+            req = image_search.request(image_id=uploaded)
+            return {"image_id": uploaded, "search_url": req.url, "offers": image_search.check_goods(req.text)}
+        if marketplace == "taobao":
+            if cached:
+                req = self.worker().taobao_search(self.worker().get_taobao_upload(), uploaded)
+                result = {"image_id": uploaded, "search_url": req.url}
+            else:
+                result = normalize_taobao(uploaded)
+            if self.worker().taobao_items and result.get("image_id"):
+                result["items"] = self.worker().search_taobao_items(result["image_id"])
+            return result
+        if marketplace == "alibaba":
+            req = alibaba.ImageSearch().search(image_key=uploaded)
+            return {"image_key": uploaded, "search_url": req.url}
+        raise Exception(f"unknown marketplace {marketplace}")
+
+
+def run_batch(argv):
+    """
+    batch 모드: run.py batch <dir|manifest> [--out results.jsonl] [--workers upload=8,search=8]
+
+    read -> encode -> upload -> search 단계를 bounded queue 로 연결하고 결과를 JSONL 로 바로바로 기록
+    """
+    import argparse
+    from lib.pipeline import Pipeline, Stage
+
+    parser = argparse.ArgumentParser(prog="run.py batch")
+    parser.add_argument("source", help="이미지 디렉터리 또는 manifest 파일")
+    parser.add_argument("--out", default="batch_results.jsonl")
+    parser.add_argument("--products", default=None, help="상품 목록 열 단위 저장 (.csv / .npz)")
+    parser.add_argument("--marketplaces", default=",".join(FANOUT_MARKETPLACES))
+    parser.add_argument("--workers", default="", help="단계별 작업자 수 (예: read=2,encode=2,upload=8,search=8)")
+    parser.add_argument("--queue-size", type=int, default=16, help="단계 사이 queue 크기")
+    parser.add_argument("--no-cache", action="store_true", help="imageId 캐시 사용 안 함")
+    parser.add_argument("--no-phash", action="store_true", help="비슷한 이미지 결과 재사용 안 함")
+    parser.add_argument("--phash-distance", type=int, default=None, help="같은 이미지로 볼 최대 해밍 거리")
+    parser.add_argument("--preprocess", action="store_true", help="업로드 전 축소 + JPEG 재인코딩")
+    parser.add_argument("--quality", type=int, default=None, help="전처리 JPEG 품질")
+    parser.add_argument("--taobao-items", type=int, default=0, help="타오바오 검색 결과 상품을 이만큼 가져옴 (예: 200)")
+    parser.add_argument("--taobao-pages", type=int, default=None, help="이미지당 최대 타오바오 결과 페이지 수")
+    parser.add_argument("--hedge", action="store_true", help="타오바오 업로드/검색이 느리면 다른 프록시로 한 번 더 (먼저 온 응답 사용)")
+    parser.add_argument("--hedge-percentile", type=float, default=None, help="hedge 기준 지연 시간 percentile (기본 95)")
+    parser.add_argument("--hedge-budget", type=float, default=None, help="요청 수 대비 hedge 비율 상한 (기본 0.1)")
+    # 결과 채널 플래그는 open_result_channel 이 처리 (여기서는 인수 오류가 나지 않게만 받음)
+    parser.add_argument("--result-fd", type=int, default=None, help="결과를 이 fd 로도 전송")
+    parser.add_argument("--result-pipe", default=None, help="결과를 이 named pipe 로도 전송")
+    parser.add_argument("--result-format", choices=("ndjson", "lp"), default="ndjson")
+    parser.add_argument("-v", "--verbose", action="count", default=0, help="진단 로그 (-v: INFO, -vv: DEBUG)")
+    args = parser.parse_args(argv)
+
+    workers = {"read": 2, "encode": 2, "upload": 4, "search": 4}
+    for item in filter(None, args.workers.split(",")):
+        name, count = item.split("=")
+        if name not in workers:
+            raise SystemExit(f"unknown stage {name}")
+        workers[name] = int(count)
+
+    if args.hedge:
+        configure_hedging(args.hedge_percentile, args.hedge_budget)
+
+    stages = BatchStages(
+        marketplaces=tuple(filter(None, args.marketplaces.split(","))),
+        cache=not args.no_cache,
+        phash=False if args.no_phash else "memory",
+        phash_distance=args.phash_distance,
+        preprocess=args.preprocess,
+        quality=args.quality,
+        taobao_items=args.taobao_items,
+        taobao_pages=args.taobao_pages,
+        hedge=args.hedge,
+    )
+    pipeline = Pipeline(
+        [
+            Stage("read", stages.read, workers["read"]),
+            Stage("encode", stages.encode, workers["encode"]),
+            Stage("upload", stages.upload, workers["upload"]),
+            Stage("search", stages.search, workers["search"]),
+        ],
+        queue_size=args.queue_size,
+    )
+
+    products = None
+    if args.products:
+        from lib.products import ProductBatch
+        products = ProductBatch()
+
+    count = failed = 0
+    feed_error = None
+    start = time.time()
+    with open(args.out, 'w', encoding='utf-8') as out:
+        try:
+            for job in pipeline.run(iter_batch_jobs(args.source)):
+                path = job.get("path", "")
+                results = job.get("results", {})
+                record = {
+                    "path": path,
+                    "ok": "error" not in job and any(r["ok"] for r in results.values()),
+                    "results": results,
+                }
+                if "error" in job:
+                    record["error"] = job["error"]
+                out.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + "\n")
+                out.flush()
+                if _result_channel is not None:
+                    _result_channel.send("batch", data=record)
+                if products is not None and path:
+                    products.add_results(path, results)
+
+                count += 1
+                failed += 0 if record["ok"] else 1
+                saved = sum(r.get("bytes_saved", 0) for r in results.values())
+                log.log(
+                    logging.INFO if record["ok"] else logging.WARNING,
+                    f"📦 [{count}] {'✅' if record['ok'] else '❌'} {path or record.get('error')}" + (f" (🗜️ {saved} bytes 절약)" if saved else ""),
+                )
+        except Exception as e:
+            # ⭐ 작업 목록을 끝까지 못 읽음 - 이미 처리한 결과는 남기고 실패로 종료
+            feed_error = e
+            log.error(f"❌ batch 작업 목록 읽기 실패 ({count}개 처리 후 중단): {e!r}")
+
+    if products is not None:
+        products.save(args.products)
+    flush_logs()
+    print(f"{'❌ batch 중단' if feed_error else '✅ batch 완료'}: {count}개 (실패 {failed}개, {time.time() - start:.1f}s) -> {args.out}")
+    if products is not None:
+        print(f"🛒 상품 {len(products)}개 -> {args.products}")
+    sys.stdout.flush()
+    return 1 if feed_error else 0
 
-        image_id = data.get("imageId", "")
-        print(f"🆔 Image ID: {image_id}")
+
+def run_proxies(argv):
+    """proxies check: 프록시 목록 전체 동시 접속 검사 -> data/proxy_check.json"""
+    import argparse
+    from lib import proxy_check
+
+    parser = argparse.ArgumentParser(prog="run.py proxies", description="proxy list tools")
+    parser.add_argument("command", choices=["check"])
+    parser.add_argument("--target", default=proxy_check.DEFAULT_TARGET, help="CONNECT 대상 host:port")
+    parser.add_argument("--timeout", type=float, default=proxy_check.DEFAULT_TIMEOUT, help="connect / 첫 응답 제한 시간(초)")
+    parser.add_argument("--concurrency", type=int, default=proxy_check.DEFAULT_CONCURRENCY)
+    parser.add_argument("--out", default=proxy_check.DEFAULT_PATH)
+    parser.add_argument("-v", "--verbose", action="count", default=0, help="진단 로그 (-v: INFO, -vv: DEBUG)")
+    args = parser.parse_args(argv)
+
+    proxy_list = get_proxy_list()
+    if not proxy_list:
+        print("⚠️ 검사할 프록시 없음")
         sys.stdout.flush()
+        return None
 
-        if image_id:
-            # 검색 결과 확인
-            search_result = taobao_upload.search(image_id)
-            print(f"🔗 Search URL: {search_result.url}")
-            sys.stdout.flush()
+    print(f"🩺 프록시 {len(proxy_list)}개 검사 시작 (대상 {args.target}, timeout {args.timeout}s)")
+    sys.stdout.flush()
+    report = proxy_check.check(
+        proxy_list, target=args.target, timeout=args.timeout, concurrency=args.concurrency, path=args.out
+    )
+    results = report["results"]
+    alive = [r for r in results if r["ok"]]
+    print(f"✅ 정상 {len(alive)}개 / ❌ 실패 {len(results) - len(alive)}개 ({report['elapsed']}초)")
+    for r in alive[:10]:
+        print(f"   {r['proxy']:<24} connect {r['connect_ms']:>7} ms  ttfb {r['ttfb_ms']:>7} ms")
+    print(f"📁 결과 저장: {args.out}")
+    sys.stdout.flush()
+    return report
+
+
+def preprocess_options(argv) -> dict:
+    """--preprocess / --quality N 플래그 -> SearchWorker 옵션"""
+    options = {"preprocess": '--preprocess' in argv}
+    if '--quality' in argv:
+        options["quality"] = int(argv[argv.index('--quality') + 1])
+    return options
+
+
+def hedge_options(argv) -> dict:
+    """--hedge [--hedge-percentile 95] [--hedge-budget 0.1] 플래그 -> SearchWorker 옵션 (기준값은 공용 hedgers 에 설정)"""
+    if '--hedge' not in argv:
+        return {}
+    configure_hedging(
+        float(argv[argv.index('--hedge-percentile') + 1]) if '--hedge-percentile' in argv else None,
+        float(argv[argv.index('--hedge-budget') + 1]) if '--hedge-budget' in argv else None,
+    )
+    return {"hedge": True}
+
+
+def configure_hedging(percentile=None, budget=None):
+    from lib.hedge import hedgers
+
+    options = {}
+    if percentile is not None:
+        options["percentile"] = percentile / 100
+    if budget is not None:
+        options["budget"] = budget
+    hedgers.configure(**options)
+
+
+def serve(worker=None, out=None):
+    """--serve 모드: stdin 한 줄당 JSON 작업 1개, stdout 한 줄당 JSON 결과 1개
+
+    작업: {"id": 1, "path": "image.jpg", "retry": false}
+          {"id": 2, "path": "image.jpg", "fanout": true, "deadline": 20}
+    결과: {"id": 1, "ok": true, "result": {...}} / {"id": 1, "ok": false, "error": "..."}
+    """
+    options = {**preprocess_options(sys.argv), **hedge_options(sys.argv)}
+    worker = worker or SearchWorker(**options)
+    result_out = out or _result_out
+    sys.stdout = sys.stderr
+
+    log.info("=== PYTHON 작업자 모드 시작 ===")
+    # ⭐ 열린 circuit breaker 는 작업이 없어도 주기적으로 probe 해서 다시 닫음
+    from lib.breaker import breakers
+    breakers.start_prober()
+
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+
+        job_id = None
+        try:
+            job = json.loads(line)
+            job_id = job.get("id")
+            path = job["path"]
+            if not os.path.exists(path):
+                raise Exception(f"not found {path}")
+            if job.get("fanout"):
+                result = None
+                try:
+                    result = worker.search_fanout(
+                        path,
+                        marketplaces=job.get("marketplaces") or FANOUT_MARKETPLACES,
+                        deadline=job.get("deadline", 30),
+                        reload=bool(job.get("retry")),
+                    )
+                finally:
+                    # deadline 을 넘긴 마켓 스레드가 아직 이 작업자를 쓰고 있으면 다음 작업은 새 작업자로
+                    if result is None or any(r["status"] == "timeout" for r in result.values()):
+                        worker = SearchWorker(**options)
+            else:
+                result = worker.search(path, reload=bool(job.get("retry")))
+            response = {"id": job_id, "ok": True, "result": result}
+        except Exception as e:
+            log.error(f"❌ 작업 실패: {e}")
+            response = {"id": job_id, "ok": False, "error": str(e)}
+
+        if _result_channel is not None and out is None:
+            _result_channel.send("job", data=response)
+        else:
+            result_out.write(json.dumps(response, ensure_ascii=False, separators=(',', ':')) + "\n")
+            result_out.flush()
+
+
+if __name__ == "__main__":
+    setup_stdio()
+    setup_logging(verbosity(sys.argv))
+    open_result_channel(sys.argv)
+    if _import_profiler is not None:
+        _import_profiler.mark("argv 처리 시작")
+        atexit.register(_import_profiler.report)
+
+    # ⭐ 작업자 모드: 프로세스 하나로 여러 이미지 처리
+    if '--serve' in sys.argv:
+        serve()
+        sys.exit(0)
+
+    # ⭐ batch 모드: 디렉터리/manifest 의 이미지를 파이프라인으로 처리
+    if len(sys.argv) > 1 and sys.argv[1] == 'batch':
+        sys.exit(run_batch(sys.argv[2:]))
+
+    # ⭐ 프록시 사전 검사: run.py proxies check
+    if len(sys.argv) > 1 and sys.argv[1] == 'proxies':
+        run_proxies(sys.argv[2:])
+        sys.exit(0)
+
+    log.info("=== PYTHON 디버깅 시작 ===")
+
+    # 명령행 인수에서 이미지 경로 받기
+    if len(sys.argv) > 1:
+        path = sys.argv[1]
+        log.info(f"📷 [디버그] 명령행에서 받은 이미지 경로: {path}")
+    else:
+        path = "다운로드.jpg"
+        log.info("📷 [디버그] 기본 이미지 사용: 다운로드.jpg")
+
+    # 🔍 실제 파일 존재 여부 및 크기 확인
+    import os
+    if os.path.exists(path):
+        file_size = os.path.getsize(path)
+        log.info(f"✅ [디버그] 이미지 파일 존재 확인 - 크기: {file_size} bytes")
+        log.info(f"📁 [디버그] 절대 경로: {os.path.abspath(path)}")
+    else:
+        log.warning(f"❌ [디버그] 이미지 파일이 존재하지 않음: {path}")
+        log.info("🔄 [디버그] 기본 이미지로 대체...")
+        path = "다운로드.jpg"
+        if os.path.exists(path):
+            file_size = os.path.getsize(path)
+            log.info(f"✅ [디버그] 기본 이미지 사용 - 크기: {file_size} bytes")
         else:
-            print("⚠️ No image ID found in response")
-            sys.stdout.flush()
+            log.error("❌ [디버그] 기본 이미지도 없음!")
+            sys.exit(1)
+
+    log.info(f"🎯 [디버그] 최종 사용할 이미지: {path}")
+    log.info("=== 이미지 디버깅 완료, 타오바오 연결 시작 ===")
+
+    # --retry 플래그 확인
+    is_retry = '--retry' in sys.argv
+    if is_retry:
+        log.info("🔄 [재시도 모드] 쿠키 파일을 다시 로드합니다...")
+
+    # ⭐ 비슷한 이미지 결과 재사용은 --phash 로 켤 때만 (데스크톱 검색은 항상 새 결과)
+    #    한 번 실행하고 끝나므로 SQLite 색인으로 조회 (전체 로드 안 함)
+    phash_distance = None
+    if '--phash-distance' in sys.argv:
+        phash_distance = int(sys.argv[sys.argv.index('--phash-distance') + 1])
+    # --fanout 에서 타오바오 결과 상품을 여러 페이지로 가져옴 (예: --taobao-items 200)
+    taobao_items = 0
+    if '--taobao-items' in sys.argv:
+        taobao_items = int(sys.argv[sys.argv.index('--taobao-items') + 1])
+    worker = SearchWorker(
+        cache='--no-cache' not in sys.argv,
+        taobao_items=taobao_items,
+        phash="sql" if '--phash' in sys.argv else False,
+        phash_distance=phash_distance,
+        **preprocess_options(sys.argv),
+        **hedge_options(sys.argv),
+    )
+    if '--fanout' in sys.argv:
+        # ⭐ 1688/타오바오/알리바바 동시 검색 (--deadline 초 안에 끝난 결과만)
+        deadline = 30
+        if '--deadline' in sys.argv:
+            deadline = float(sys.argv[sys.argv.index('--deadline') + 1])
+        worker.search_fanout(path, deadline=deadline, reload=is_retry)
     else:
-        print(f"❌ 타오바오 업로드 실패!")
-        sys.stdout.flush()
-        raise Exception("taobao upload fail")
-    # alibaba example
-    upload = alibaba.Upload()
-    image_key = upload.upload(filename=path)
-    print(f"{image_key}")
-
-    image_searh = alibaba.ImageSearch()
-    req = image_searh.search(image_key=image_key)
-    print(req.url)
+        worker.search(path, reload=is_retry)
 
     # yiwugo
     # yiwugo = yiwugo.YiWuGo()
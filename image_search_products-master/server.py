@@ -0,0 +1,209 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+로컬 이미지 검색 HTTP 서버
+
+    python server.py --port 8765 --workers 4
+
+    POST /search        {"path": "a.jpg", "marketplaces": ["1688", "taobao"]}
+                        {"image": "<base64>", "filename": "a.jpg"}
+    POST /search/batch  {"jobs": [{...}, {...}]}
+    GET  /health
+
+여러 데스크톱 클라이언트/백그라운드 작업이 하나의 엔진(세션, 토큰, 쿠키, 프록시)을 공유한다.
+"""
+
+import argparse
+import base64
+import binascii
+import json
+import os
+import queue
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from lib.breaker import breakers
+from lib.func_txy import session_manager
+from lib.hedge import hedgers
+from lib.log import setup_logging
+from lib.rate_limit import rate_limiter
+from run import SearchWorker, configure_hedging, setup_stdio
+
+MARKETPLACES = ("1688", "taobao", "alibaba", "yiwugo")
+DEFAULT_MARKETPLACES = ("1688", "taobao", "alibaba")
+
+
+def check_job(job) -> dict:
+    """
+    요청 작업 검사 - 잘못되면 ValueError (400 응답)
+    :return: image 를 디코딩해 data 로 넣은 작업 사본
+    """
+    if not isinstance(job, dict):
+        raise ValueError("job must be an object")
+    marketplaces = job.get("marketplaces") or DEFAULT_MARKETPLACES
+    if not isinstance(marketplaces, (list, tuple)):
+        raise ValueError("marketplaces must be a list")
+    unknown = [m for m in marketplaces if m not in MARKETPLACES]
+    if unknown:
+        raise ValueError(f"unknown marketplace {unknown}")
+    job = dict(job, marketplaces=tuple(marketplaces))
+    if job.get("image"):
+        try:
+            job["data"] = base64.b64decode(job.pop("image"), validate=True)
+        except (binascii.Error, TypeError, ValueError) as e:
+            raise ValueError(f"invalid base64 image: {e}")
+    elif not isinstance(job.get("path", ""), str):
+        raise ValueError("path must be a string")
+    return job
+
+
+class SearchService(object):
+    """SearchWorker 풀 - 작업자 하나는 한 번에 한 스레드만 사용"""
+
+    def __init__(self, workers: int = 4, deadline: float = 30, **options):
+        """
+        :param options: SearchWorker 옵션 (preprocess, quality 등)
+        """
+        self.size = workers
+        self.deadline = deadline
+        # ⭐ 결과는 HTTP 응답으로만 - 서버 stdout 에 수 MB 짜리 Full response 줄을 쓰지 않음
+        self.options = dict(options, print_results=False)
+        self.workers = queue.Queue()
+        for _ in range(workers):
+            self.workers.put(SearchWorker(**self.options))
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+
+    def search(self, job: dict) -> dict:
+        """check_job 을 통과한 작업 하나 검색"""
+        marketplaces = job["marketplaces"]
+        temp_path = None
+        try:
+            if "data" in job:
+                suffix = os.path.splitext(str(job.get("filename") or "image.jpg"))[1] or ".jpg"
+                fd, temp_path = tempfile.mkstemp(suffix=suffix)
+                with os.fdopen(fd, "wb") as f:
+                    f.write(job["data"])
+                path = temp_path
+            else:
+                path = job.get("path", "")
+            if not path or not os.path.exists(path):
+                return {"id": job.get("id"), "ok": False, "error": f"not found {path}"}
+
+            results = None
+            worker = self.workers.get()
+            try:
+                results = worker.search_fanout(
+                    path,
+                    marketplaces=marketplaces,
+                    deadline=job.get("deadline", self.deadline),
+                    reload=bool(job.get("retry")),
+                )
+            except Exception as e:
+                return {"id": job.get("id"), "ok": False, "error": str(e)}
+            finally:
+                # deadline 을 넘긴 마켓이 아직 이 작업자를 쓰고 있으면 새 작업자로 교체
+                if results is None or any(r["status"] == "timeout" for r in results.values()):
+                    worker = SearchWorker(**self.options)
+                self.workers.put(worker)
+        finally:
+            if temp_path:
+                os.remove(temp_path)
+
+        ok = any(r["ok"] for r in results.values())
+        return {"id": job.get("id"), "ok": ok, "results": results}
+
+    def search_batch(self, jobs: list) -> list:
+        return list(self.executor.map(self.search, jobs))
+
+
+class SearchHandler(BaseHTTPRequestHandler):
+    service: SearchService = None
+
+    def _send_json(self, status: int, body):
+        payload = json.dumps(body, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {"ok": True, "workers": self.service.size, "rate_limits": rate_limiter.snapshot(),
+                                  "hedges": hedgers.snapshot(), "breakers": breakers.snapshot()})
+        else:
+            self._send_json(404, {"ok": False, "error": "not found"})
+
+    def do_POST(self):
+        try:
+            body = self._read_json()
+        except ValueError as e:
+            self._send_json(400, {"ok": False, "error": f"invalid json: {e}"})
+            return
+
+        if self.path not in ("/search", "/search/batch"):
+            self._send_json(404, {"ok": False, "error": "not found"})
+            return
+        try:
+            if self.path == "/search":
+                job = check_job(body)
+            else:
+                jobs = body.get("jobs") if isinstance(body, dict) else None
+                if not isinstance(jobs, list):
+                    raise ValueError("jobs must be a list")
+                jobs = [check_job(job) for job in jobs]
+        except ValueError as e:
+            self._send_json(400, {"ok": False, "error": str(e)})
+            return
+
+        if self.path == "/search":
+            self._send_json(200, self.service.search(job))
+        else:
+            self._send_json(200, {"ok": True, "results": self.service.search_batch(jobs)})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="local image search server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--deadline", type=float, default=30, help="작업당 전체 제한 시간(초)")
+    parser.add_argument("--pool-size", type=int, default=32, help="host 별 keep-alive 연결 수")
+    parser.add_argument("--preprocess", action="store_true", help="업로드 전 축소 + JPEG 재인코딩")
+    parser.add_argument("--quality", type=int, default=None, help="전처리 JPEG 품질")
+    parser.add_argument("--hedge", action="store_true", help="타오바오 업로드/검색이 느리면 다른 프록시로 한 번 더 (먼저 온 응답 사용)")
+    parser.add_argument("--hedge-percentile", type=float, default=None, help="hedge 기준 지연 시간 percentile (기본 95)")
+    parser.add_argument("--hedge-budget", type=float, default=None, help="요청 수 대비 hedge 비율 상한 (기본 0.1)")
+    parser.add_argument("-v", "--verbose", action="count", default=0, help="진단 로그 (-v: INFO, -vv: DEBUG)")
+    args = parser.parse_args()
+
+    setup_stdio()
+    setup_logging(args.verbose)
+    session_manager.configure(pool_maxsize=max(args.pool_size, args.workers))
+    if args.hedge:
+        configure_hedging(args.hedge_percentile, args.hedge_budget)
+
+    SearchHandler.service = SearchService(
+        workers=args.workers, deadline=args.deadline, preprocess=args.preprocess, quality=args.quality, hedge=args.hedge
+    )
+    breakers.start_prober()
+    httpd = ThreadingHTTPServer((args.host, args.port), SearchHandler)
+    print(f"🚀 이미지 검색 서버 시작: http://{args.host}:{args.port}")
+    sys.stdout.flush()
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+async 클라이언트 검사 (로컬 aiohttp 서버)
+
+    python -m pytest test_aio.py
+"""
+
+import asyncio
+import json
+
+from aiohttp import web
+
+from lib import aio
+from lib.ali1688.ali1688 import Ali1688ImageSearch, Ali1688Upload, Token
+from lib.alibaba import ImageSearch, Upload
+from lib.yiwugo import YiWuGo
+
+
+async def echo(request):
+    form = await request.post()
+    body = {
+        "method": request.method,
+        "query": dict(request.query),
+        "cookies": dict(request.cookies),
+        "form": {k: v if isinstance(v, str) else v.filename for k, v in form.items()},
+    }
+    return web.json_response(body)
+
+
+async def start_server(routes):
+    app = web.Application()
+    app.router.add_route("*", "/echo", echo)
+    for path, handler in routes.items():
+        app.router.add_route("*", path, handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+def run(main, routes=None):
+    """로컬 서버를 띄우고 main(base_url, client) 실행 (asyncio.run 마다 새 루프)"""
+
+    async def wrapper():
+        runner, base = await start_server(routes or {})
+        client = aio.AsyncClient()
+        try:
+            return await main(base, client)
+        finally:
+            await client.close()
+            await runner.cleanup()
+
+    return asyncio.run(wrapper())
+
+
+def test_client_across_event_loops():
+    client = aio.AsyncClient()
+
+    async def main():
+        runner, base = await start_server({})
+        try:
+            get = await aio.request_get(f"{base}/echo", params={"page": 2}, cookies={"t": "1"}, client=client)
+            post = await aio.request_post(
+                f"{base}/echo", files={"name": (None, "a.jpg"), "file": ("a.jpg", b"jpg")}, client=client
+            )
+            return get.json(), post.json()
+        finally:
+            await runner.cleanup()
+
+    # 두 번째 asyncio.run 에서도 닫힌 루프의 세션을 쓰지 않음
+    for _ in range(2):
+        get, post = asyncio.run(main())
+        assert get == {"method": "GET", "query": {"page": "2"}, "cookies": {"t": "1"}, "form": {}}
+        assert post["form"] == {"name": "a.jpg", "file": "a.jpg"}
+    assert len(client._sessions) == 1
+
+
+def test_yiwugo_async():
+    async def home(request):
+        return web.Response(text='<script src="https://hm.baidu.com/hm.js?abc123";"></script>')
+
+    async def main(base, client):
+        yiwugo = YiWuGo()
+        yiwugo.origin_url = f"{base}/home"
+        yiwugo.upload_url = f"{base}/echo"
+        res = await yiwugo.upload_async(None, b64="aGVsbG8=", client=client)
+        return yiwugo.token, res.json()
+
+    token, body = run(main, {"/home": home})
+    assert token == "abc123"
+    assert body["form"] == {"code": "aGVsbG8="}
+    assert set(body["cookies"]) == {"Hm_lvt_abc123", "Hm_lpvt_abc123"}
+
+
+def test_alibaba_async():
+    async def sign(request):
+        return web.json_response({"data": {
+            "host": f"http://{request.host}/oss", "signature": "s", "policy": "p", "accessid": "a", "imagePath": "img",
+        }})
+
+    async def oss(request):
+        form = await request.post()
+        assert form["key"].startswith("img/") and form["file"].file.read() == b"jpg"
+        return web.Response(text="")
+
+    async def main(base, client):
+        upload = Upload()
+        upload.sign_url = f"{base}/sign"
+        image_key = await upload.upload_async("a.jpg", bytestream=b"jpg", client=client)
+
+        search = ImageSearch()
+        search.search_url = f"{base}/echo"
+        res = await search.search_async(image_key, client=client)
+        return image_key, res.json()
+
+    image_key, body = run(main, {"/sign": sign, "/oss": oss})
+    assert image_key.startswith("img/")
+    assert body["query"]["imageAddress"] == f"/{image_key}"
+
+
+def test_ali1688_async():
+    async def token(request):
+        res = web.Response(text="mtopjsonp1({})")
+        res.set_cookie("_m_h5_tk", "tok_123")
+        return res
+
+    async def main(base, client):
+        tok = Token(api="mtop.test", hostname="localhost")
+        tok.token_url = f"{base}/token"
+        await tok.request_async(client=client)
+        tok._get_token()
+
+        upload = Ali1688Upload(manual_cookie="tok_123")
+        upload.upload_url = f"{base}/echo"
+        uploaded = (await upload.upload_async(image=b"jpg", client=client)).json()
+
+        search = Ali1688ImageSearch()
+        search.url = f"{base}/echo"
+        searched = (await search.request_async("img1", client=client)).json()
+        return tok.token, uploaded, searched
+
+    token_value, uploaded, searched = run(main, {"/token": token})
+    assert token_value == "tok"
+    assert uploaded["method"] == "POST" and uploaded["query"]["sign"]
+    assert json.loads(uploaded["form"]["data"])["imageBase64"] == "anBn"
+    assert searched["query"]["imageId"] == "img1"
+
+
+if __name__ == "__main__":
+    test_client_across_event_loops()
+    test_yiwugo_async()
+    test_alibaba_async()
+    test_ali1688_async()
+    print("✅ aio")
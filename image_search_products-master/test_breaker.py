@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+circuit breaker (closed / open / half-open) 검사
+
+    python -m pytest test_breaker.py
+"""
+
+import os
+import tempfile
+
+from lib.breaker import CLOSED, HALF_OPEN, OPEN, Breakers, CircuitBreaker, CircuitOpenError
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def fail():
+    raise TimeoutError("read timeout")
+
+
+def calls(breaker, fn, count):
+    for _ in range(count):
+        try:
+            breaker.call(fn)
+        except (TimeoutError, CircuitOpenError):
+            pass
+
+
+def test_opens_on_failure_rate():
+    clock = Clock()
+    breaker = CircuitBreaker("alibaba:sign", window=60, min_calls=4, failure_rate=0.5, open_for=30, clock=clock)
+    calls(breaker, lambda: "ok", 3)
+    calls(breaker, fail, 2)
+    # 5 번 중 2 번 실패 - 40%
+    assert breaker.state == CLOSED
+    calls(breaker, fail, 1)
+    assert breaker.state == OPEN
+
+    ran = []
+    try:
+        breaker.call(lambda: ran.append(1))
+    except CircuitOpenError as e:
+        assert e.key == "alibaba:sign" and e.retry_in == 30
+    assert ran == []
+    assert breaker.snapshot()["state"] == OPEN
+
+
+def test_old_failures_leave_window():
+    clock = Clock()
+    breaker = CircuitBreaker("yiwugo:token", window=60, min_calls=3, failure_rate=0.5, clock=clock)
+    calls(breaker, fail, 2)
+    clock.now += 61
+    calls(breaker, lambda: "ok", 2)
+    calls(breaker, fail, 1)
+    assert breaker.state == CLOSED
+
+
+def test_half_open_probe():
+    clock = Clock()
+    breaker = CircuitBreaker("yiwugo:token", min_calls=1, open_for=30, max_open_for=100, clock=clock)
+    calls(breaker, fail, 1)
+    assert breaker.state == OPEN
+
+    # probe 실패 - open_for 2배
+    clock.now += 30
+    assert breaker.allow() and breaker.state == HALF_OPEN
+    # probe 하나만 통과
+    assert not breaker.allow()
+    breaker.record(False)
+    assert breaker.state == OPEN and breaker.retry_in() == 60
+
+    clock.now += 60
+    assert breaker.call(lambda: "ok") == "ok"
+    assert breaker.state == CLOSED and breaker.open_for == 30
+
+
+def test_registry_probe_and_persist():
+    clock = Clock()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "breakers.json")
+        registry = Breakers(path=path, min_calls=1, open_for=10, clock=clock)
+        calls(registry.get("alibaba:sign"), fail, 1)
+        assert registry.snapshot()["alibaba:sign"]["state"] == OPEN
+
+        probes = []
+        registry.register_probe("alibaba:sign", lambda: probes.append(1))
+        registry.probe_due()
+        # 아직 open_for 안 지남
+        assert probes == []
+        registry.save()
+
+        # 다음 프로세스에서도 열린 상태
+        restored = Breakers(path=path, clock=clock)
+        assert restored.get("alibaba:sign").state == OPEN
+        assert not restored.get("alibaba:sign").allow()
+
+        clock.now += 10
+        registry.probe_due()
+        assert probes == [1]
+        assert registry.get("alibaba:sign").state == CLOSED
+
+
+def test_parallel_processes_merge():
+    clock = Clock()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "breakers.json")
+        # 두 프로세스가 같은 (빈) 파일에서 시작
+        first = Breakers(path=path, min_calls=2, open_for=10, clock=clock)
+        second = Breakers(path=path, min_calls=2, open_for=10, clock=clock)
+        calls(first.get("alibaba:sign"), fail, 2)
+        calls(second.get("alibaba:sign"), lambda: "ok", 1)
+        calls(second.get("yiwugo:token"), lambda: "ok", 1)
+        first.save()
+        clock.now += 1
+        # 나중에 저장해도 first 가 연 상태를 덮어쓰지 않음
+        second.save()
+
+        restored = Breakers(path=path, clock=clock)
+        sign = restored.get("alibaba:sign")
+        assert sign.state == OPEN
+        assert restored.get("yiwugo:token").calls
+
+
+def test_sign_breaker_ignores_local_file_errors():
+    from lib import alibaba
+    from lib.breaker import breakers
+
+    upload = alibaba.Upload()
+    upload.sign = lambda: type("Res", (), {"json": lambda self: {"data": {"host": "h", "signature": "s", "policy": "p"}}})()
+    before = breakers.get(alibaba.SIGN_BREAKER).snapshot()["failures"]
+    for _ in range(5):
+        try:
+            upload.get_requst_params("missing/image.jpg")
+        except Exception:
+            pass
+    sign = breakers.get(alibaba.SIGN_BREAKER)
+    assert sign.state == CLOSED and sign.snapshot()["failures"] == before
+
+
+if __name__ == "__main__":
+    test_opens_on_failure_rate()
+    test_old_failures_leave_window()
+    test_half_open_probe()
+    test_registry_probe_and_persist()
+    test_parallel_processes_merge()
+    test_sign_breaker_ignores_local_file_errors()
+    print("✅ breaker")
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+imageId 캐시 검사 (TTL 만료, 최대 개수 정리, WAL 모드 동시 접근)
+
+    python -m pytest test_cache.py
+"""
+
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+
+from lib import cache
+from lib.cache import ImageIdCache
+
+
+def test_ttl_expiry():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ImageIdCache(os.path.join(tmp, "cache.sqlite3"), ttl=0.2)
+        store.put("taobao", "d1", "img1")
+        assert store.get("taobao", "d1") == "img1"
+        assert store.get("1688", "d1") is None
+
+        time.sleep(0.3)
+        # 만료된 항목은 읽을 때 지움
+        assert store.get("taobao", "d1") is None
+        assert len(store) == 0
+
+
+def test_put_evicts_expired_and_least_recently_used():
+    with tempfile.TemporaryDirectory() as tmp:
+        evict_every, cache.EVICT_EVERY = cache.EVICT_EVERY, 1
+        try:
+            store = ImageIdCache(os.path.join(tmp, "cache.sqlite3"), max_entries=3)
+            for n in range(3):
+                store.put("taobao", f"d{n}", f"img{n}")
+                time.sleep(0.01)
+            # d0 을 다시 쓰면 가장 오래 안 쓴 항목은 d1
+            assert store.get("taobao", "d0") == "img0"
+            store.put("taobao", "d3", "img3")
+            assert len(store) == 3
+            assert store.get("taobao", "d1") is None
+            assert [store.get("taobao", d) for d in ("d0", "d2", "d3")] == ["img0", "img2", "img3"]
+
+            # 정리할 때 만료된 항목도 같이 지움
+            store.ttl = 0.05
+            time.sleep(0.1)
+            store.put("taobao", "d4", "img4")
+            assert len(store) == 1
+        finally:
+            cache.EVICT_EVERY = evict_every
+
+
+def test_eviction_runs_every_evict_every_puts():
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ImageIdCache(os.path.join(tmp, "cache.sqlite3"), max_entries=2)
+        for n in range(cache.EVICT_EVERY):
+            store.put("taobao", f"d{n}", "img")
+        # 첫 put 에서만 정리 - 그 뒤로는 EVICT_EVERY 번째 put 까지 쌓임
+        assert len(store) == cache.EVICT_EVERY
+        store.put("taobao", "last", "img")
+        assert len(store) == 2
+
+
+def _write_many(path, worker, count):
+    store = ImageIdCache(path)
+    for n in range(count):
+        store.put("taobao", f"w{worker}-{n}", f"img{n}")
+        assert store.get("taobao", f"w{worker}-{n}") == f"img{n}"
+
+
+def test_concurrent_processes_and_threads():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cache.sqlite3")
+        store = ImageIdCache(path)
+        assert store._conn().execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+        # 여러 프로세스가 같은 파일에 동시에 쓰기 (C# 이 run.py 를 여러 개 띄우는 경우)
+        context = multiprocessing.get_context("spawn")
+        processes = [context.Process(target=_write_many, args=(path, worker, 50)) for worker in range(4)]
+        for process in processes:
+            process.start()
+
+        # 같은 프로세스 안의 스레드는 스레드마다 연결 하나
+        errors = []
+
+        def work(worker):
+            try:
+                for n in range(50):
+                    store.put("1688", f"t{worker}-{n}", "img")
+                    store.get("1688", f"t{worker}-{n}")
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=work, args=(worker,)) for worker in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(30)
+        for process in processes:
+            process.join(60)
+
+        assert errors == []
+        assert [process.exitcode for process in processes] == [0] * 4
+        assert len(store) == 400
+
+
+if __name__ == "__main__":
+    test_ttl_expiry()
+    test_put_evicts_expired_and_least_recently_used()
+    test_eviction_runs_every_evict_every_puts()
+    test_concurrent_processes_and_threads()
+    print("✅ cache")
@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+쿠키 저장소 검사 (taobao.com host 목록, host_key 인덱스, WAL 에만 있는 쿠키)
+
+    python -m pytest test_cookie_store.py
+"""
+
+import os
+import sqlite3
+import tempfile
+
+from lib.cookie_store import CookieStore
+
+
+def test_chrome_cookies_hosts_and_wal():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "Cookies")
+        conn = sqlite3.connect(path)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE cookies (host_key TEXT, name TEXT, value TEXT)")
+            conn.executemany("INSERT INTO cookies VALUES (?, ?, ?)", [
+                (".taobao.com", "cna", "1"),
+                ("world.taobao.com", "xlly_s", "2"),
+                ("taobao.com", "t", "3"),
+                ("nottaobao.com", "other", "4"),
+                (".taobao.com", "empty", ""),
+            ])
+            conn.commit()
+
+            store = CookieStore(chrome_path=path, saved_path=os.path.join(tmp, "taobao_cookies.json"))
+            assert store.chrome_cookies() == {"cna": "1", "xlly_s": "2", "t": "3"}
+
+            # 체크포인트 전이라 -wal 에만 있는 새 토큰도 보여야 함
+            conn.execute("INSERT INTO cookies VALUES ('.taobao.com', '_m_h5_tk', 'fresh_1')")
+            conn.commit()
+            assert os.path.exists(path + "-wal")
+            assert store.chrome_cookies()["_m_h5_tk"] == "fresh_1"
+            assert store.saved_cookies() == {}
+        finally:
+            conn.close()
+
+
+def test_chrome_query_uses_host_key_index():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "Cookies")
+        conn = sqlite3.connect(path)
+        try:
+            # Chrome 의 cookies 표처럼 host_key 가 맨 앞인 unique 인덱스
+            conn.execute("CREATE TABLE cookies (host_key TEXT, name TEXT, value TEXT, path TEXT, UNIQUE (host_key, name, path))")
+            conn.executemany("INSERT INTO cookies VALUES (?, ?, ?, '/')", [
+                (f"site{i}.example.com", "id", str(i)) for i in range(200)
+            ] + [("h5api.m.taobao.com", "_m_h5_tk", "tok_1"), (".m.taobao.com", "x5sec", "5")])
+            conn.commit()
+
+            store = CookieStore(chrome_path=path, saved_path=os.path.join(tmp, "taobao_cookies.json"))
+            assert store.chrome_cookies() == {"_m_h5_tk": "tok_1", "x5sec": "5"}
+
+            hosts = store.host_keys()
+            plan = conn.execute(
+                f"EXPLAIN QUERY PLAN SELECT name, value FROM cookies WHERE host_key IN ({','.join('?' * len(hosts))}) AND value != ''",
+                hosts,
+            ).fetchall()
+            detail = " ".join(row[-1] for row in plan)
+            assert "USING INDEX" in detail and "SCAN cookies" not in detail, detail
+        finally:
+            conn.close()
+
+
+if __name__ == "__main__":
+    test_chrome_cookies_hosts_and_wal()
+    test_chrome_query_uses_host_key_index()
+    print("✅ cookie_store")
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+fanout 결과 출력 검사 (결과 채널이 없으면 마켓마다 stdout 한 줄)
+
+    python -m pytest test_fanout.py
+"""
+
+import contextlib
+import io
+import json
+import sys
+import time
+
+import run
+
+
+class FakeCache(object):
+    def get(self, marketplace, digest):
+        return "img1" if marketplace == "taobao" else None
+
+
+class FakeWorker(run.SearchWorker):
+    """네트워크 없이 마켓 검색만 흉내 - 타오바오는 캐시 hit"""
+
+    def __init__(self, **options):
+        super(FakeWorker, self).__init__(cache=FakeCache(), phash=False, **options)
+
+    def get_taobao_upload(self, reload=False):
+        return None
+
+    def taobao_search(self, upload, image_id):
+        return type("Res", (), {"url": f"https://s.taobao.com/search?imageId={image_id}"})()
+
+    def search_1688(self, path):
+        return {"image_id": "a1", "offers": []}
+
+    def search_alibaba(self, path):
+        raise Exception("upload image failed")
+
+
+def test_fanout_prints_each_marketplace():
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        results = FakeWorker().search_fanout(__file__, marketplaces=("1688", "taobao", "alibaba"), deadline=5)
+    out = out.getvalue()
+
+    # 타오바오 캐시 hit 도 C# 이 읽는 "Full response:" 줄로
+    full = [line for line in out.splitlines() if line.startswith("Full response: ")]
+    assert [json.loads(line[len("Full response: "):])["data"]["imageId"] for line in full] == ["img1"]
+    assert results["taobao"]["image_id"] == "img1" and results["taobao"]["cached"]
+
+    printed = {}
+    for line in out.splitlines():
+        if line.startswith("Fanout result ["):
+            marketplace, body = line[len("Fanout result ["):].split("]: ", 1)
+            printed[marketplace] = json.loads(body)
+    assert set(printed) == {"1688", "taobao", "alibaba"}
+    assert printed["1688"]["ok"] and printed["1688"]["image_id"] == "a1"
+    assert printed["alibaba"] == results["alibaba"] and printed["alibaba"]["status"] == "error"
+    # 응답 원문은 Full response 줄에만
+    assert "response" not in printed["taobao"]
+
+
+def test_server_workers_keep_results_off_stdout():
+    import server
+
+    service = server.SearchService(workers=1, cache=False, phash=False)
+    assert service.workers.get().print_results is False
+
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        results = FakeWorker(print_results=False).search_fanout(
+            __file__, marketplaces=("1688", "taobao", "alibaba"), deadline=5
+        )
+    # 결과는 반환값(HTTP 응답)으로만
+    assert out.getvalue() == ""
+    assert results["taobao"]["image_id"] == "img1" and results["1688"]["ok"]
+
+
+def test_serve_replaces_worker_after_timeout():
+    class SlowWorker(FakeWorker):
+        created = []
+
+        def __init__(self, **options):
+            super(SlowWorker, self).__init__()
+            SlowWorker.created.append(self)
+
+        def search_alibaba(self, path):
+            time.sleep(0.3)
+            return {}
+
+    jobs = [
+        {"id": 1, "path": __file__, "fanout": True, "marketplaces": ["1688"]},
+        {"id": 2, "path": __file__, "fanout": True, "marketplaces": ["1688", "alibaba"], "deadline": 0.1},
+        {"id": 3, "path": __file__, "fanout": True, "marketplaces": ["1688"]},
+    ]
+    out = io.StringIO()
+    stdin, stdout, worker_class = sys.stdin, sys.stdout, run.SearchWorker
+    run.SearchWorker = SlowWorker
+    sys.stdin = io.StringIO("".join(json.dumps(job) + "\n" for job in jobs))
+    try:
+        first = SlowWorker()
+        run.serve(worker=first, out=out)
+    finally:
+        sys.stdin, sys.stdout, run.SearchWorker = stdin, stdout, worker_class
+
+    responses = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [r["id"] for r in responses] == [1, 2, 3]
+    assert responses[1]["result"]["alibaba"]["status"] == "timeout"
+    # timeout 이 난 작업 뒤에만 새 작업자
+    assert len(SlowWorker.created) == 2
+
+
+if __name__ == "__main__":
+    test_fanout_prints_each_marketplace()
+    test_server_workers_keep_results_off_stdout()
+    test_serve_replaces_worker_after_timeout()
+    print("✅ fanout")
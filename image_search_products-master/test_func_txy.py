@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+host 별 세션 검사 (작업 사이 keep-alive 재사용, 프록시 변경, configure 후 새 세션) - 로컬 HTTP 서버
+
+    python -m pytest test_func_txy.py
+"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from lib.func_txy import SessionManager, request_get, request_post
+
+
+class Recorder(BaseHTTPRequestHandler):
+    """HTTP/1.1 keep-alive 서버 - 요청마다 (클라이언트 포트, 요청 줄, Cookie) 기록"""
+
+    protocol_version = "HTTP/1.1"
+
+    def _reply(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        if length:
+            self.rfile.read(length)
+        self.server.seen.append((self.client_address[1], self.requestline, self.headers.get("Cookie")))
+        body = b"ok"
+        self.send_response(200)
+        self.send_header("Set-Cookie", "sid=from_server; Path=/")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = do_POST = _reply
+
+    def log_message(self, *args):
+        pass
+
+
+def start():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Recorder)
+    server.daemon_threads = True
+    server.seen = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def connections(server):
+    return len({port for port, _, _ in server.seen})
+
+
+def test_one_session_per_host():
+    manager = SessionManager()
+    assert manager.get("https://h5api.m.taobao.com/h5/a") is manager.get("https://h5api.m.taobao.com/h5/b?x=1")
+    assert manager.get("https://s.1688.com/") is not manager.get("https://h5api.m.taobao.com/")
+
+    sessions = []
+    threads = [threading.Thread(target=lambda: sessions.append(manager.get("https://oss.example.com/"))) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert len(set(map(id, sessions))) == 1
+
+
+def test_keep_alive_reused_across_jobs():
+    server = start()
+    manager = SessionManager()
+    url = f"http://127.0.0.1:{server.server_address[1]}/upload"
+    try:
+        # 작업 세 개 (GET + POST) 가 연결 하나를 같이 씀
+        for job in range(3):
+            session = manager.get(url)
+            assert request_get(url, params={"job": job}, session=session, retry=None).status_code == 200
+            assert request_post(url, data={"job": job}, cookies={"t": str(job)}, session=session).status_code == 200
+        assert len(server.seen) == 6 and connections(server) == 1
+
+        # 응답 쿠키는 응답에만 - 세션에 남아 다음 요청에 섞이지 않음
+        res = request_get(url, session=manager.get(url), retry=None)
+        assert res.cookies.get("sid") == "from_server"
+        assert len(manager.get(url).cookies) == 0
+        assert [cookie for _, _, cookie in server.seen] == [None, "t=0", None, "t=1", None, "t=2", None]
+    finally:
+        manager.close()
+        server.shutdown()
+
+
+def test_proxy_change_uses_new_proxy():
+    origin, first, second = start(), start(), start()
+    manager = SessionManager()
+    url = f"http://127.0.0.1:{origin.server_address[1]}/search"
+    session = manager.get(url)
+    try:
+        for proxy in (first, second, first):
+            proxies = {"http": f"http://127.0.0.1:{proxy.server_address[1]}"}
+            request_get(url, proxies=proxies, session=session, retry=None)
+        request_get(url, session=session, retry=None)
+
+        # 같은 세션이어도 요청마다 넘긴 프록시로 감 (프록시가 바뀌면 그 프록시의 연결 풀 사용)
+        assert [line for _, line, _ in first.seen] == [f"GET {url} HTTP/1.1"] * 2
+        assert [line for _, line, _ in second.seen] == [f"GET {url} HTTP/1.1"]
+        assert [line for _, line, _ in origin.seen] == ["GET /search HTTP/1.1"]
+        # 원래 프록시로 돌아가면 그 연결을 다시 씀
+        assert connections(first) == 1
+    finally:
+        manager.close()
+        for server in (origin, first, second):
+            server.shutdown()
+
+
+def test_configure_rebuilds_sessions():
+    server = start()
+    manager = SessionManager(pool_maxsize=4)
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+    try:
+        old = manager.get(url)
+        request_get(url, session=old, retry=None)
+
+        # 다시 설정(reload)하면 기존 세션은 닫고 새 크기의 풀로 새 세션
+        manager.configure(pool_maxsize=16)
+        new = manager.get(url)
+        assert new is not old
+        assert new.get_adapter(url)._pool_maxsize == 16
+        request_get(url, session=new, retry=None)
+        assert connections(server) == 2
+
+        manager.close()
+        assert manager.get(url) is not new
+        assert manager.pool_maxsize == 16
+    finally:
+        manager.close()
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    test_one_session_per_host()
+    test_keep_alive_reused_across_jobs()
+    test_proxy_change_uses_new_proxy()
+    test_configure_rebuilds_sessions()
+    print("✅ func_txy")
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+hedged request (percentile 지연 + budget) 검사
+
+    python -m pytest test_hedge.py
+"""
+
+import collections
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from lib.hedge import HedgeBudget, Hedger, LatencyWindow
+from lib.proxy_pool import ProxyPool
+
+PROXIES = ["10.0.0.1:8080", "10.0.0.2:8080", "10.0.0.3:8080"]
+
+
+def warmed_hedger(latency=0.05, **options) -> Hedger:
+    hedger = Hedger(min_samples=10, min_delay=0.05, **options)
+    for _ in range(10):
+        hedger.latency.add(latency)
+    return hedger
+
+
+def test_latency_percentile():
+    window = LatencyWindow(size=100)
+    assert window.percentile(0.95) is None
+    for i in range(1, 201):
+        window.add(i / 100)
+    # 최근 100 개 (1.01 ~ 2.00) 만 남음
+    assert window.percentile(0.0) == 1.01
+    assert window.percentile(0.95) == 1.96
+
+
+def test_budget_caps_extra_load():
+    budget = HedgeBudget(ratio=0.1, burst=5)
+    spent = 0
+    for _ in range(1000):
+        budget.earn()
+        spent += budget.spend()
+    # 요청의 10% 이하 (부동소수 누적 오차로 1 개 적을 수 있음)
+    assert 99 <= spent <= 100
+
+
+def test_slow_primary_is_hedged():
+    hedger = warmed_hedger(budget=1.0)
+    calls = []
+
+    def slow():
+        calls.append("primary")
+        time.sleep(1.0)
+        return "primary"
+
+    def fast():
+        calls.append("hedge")
+        return "hedge"
+
+    start = time.monotonic()
+    assert hedger.call(slow, fast) == "hedge"
+    assert time.monotonic() - start < 0.5
+    assert calls == ["primary", "hedge"]
+    assert (hedger.hedged, hedger.wins) == (1, 1)
+
+
+def test_fast_primary_is_not_hedged():
+    hedger = warmed_hedger(latency=0.5, budget=1.0)
+    assert hedger.call(lambda: "primary", lambda: "hedge") == "primary"
+    assert hedger.hedged == 0
+
+
+def test_hedge_respects_budget_and_errors():
+    hedger = warmed_hedger(budget=0.0)
+    # budget 이 없으면 느려도 primary 만
+    assert hedger.call(lambda: time.sleep(0.2) or "primary", lambda: "hedge") == "primary"
+    assert hedger.hedged == 0
+
+    hedger = warmed_hedger(budget=1.0)
+
+    def fail():
+        time.sleep(0.2)
+        raise ValueError("proxy error")
+
+    # 한쪽이 실패하면 다른 쪽 결과
+    assert hedger.call(fail, lambda: "hedge") == "hedge"
+    try:
+        hedger.call(fail, lambda: 1 / 0)
+    except (ValueError, ZeroDivisionError):
+        pass
+    else:
+        assert False, "둘 다 실패하면 오류"
+
+
+def test_queue_time_and_hedge_pool():
+    # primary 풀이 느린 작업으로 꽉 차 있어도 hedge 는 따로 실행되고, 대기 시간은 지연 시간에 안 들어감
+    primaries = ThreadPoolExecutor(max_workers=1)
+    hedger = warmed_hedger(budget=1.0, executor=primaries, hedge_executor=ThreadPoolExecutor(max_workers=1))
+    busy = primaries.submit(time.sleep, 0.5)
+    lost = []
+    start = time.monotonic()
+    assert hedger.call(lambda: "primary", lambda: "hedge", on_lose=lost.append) == "hedge"
+    assert time.monotonic() - start < 0.4
+    # primary 는 시작도 못 하고 취소됨 - 진 프록시로 기록하지 않음
+    assert lost == []
+    busy.result()
+    primaries.shutdown(wait=True)
+    assert max(hedger.latency.samples) < 0.1
+
+    # 이미 보낸 느린 primary 는 진 것으로 기록
+    hedger = warmed_hedger(budget=1.0)
+    assert hedger.call(lambda: time.sleep(0.5) or "primary", lambda: "hedge", on_lose=lost.append) == "hedge"
+    assert len(lost) == 1 and lost[0] >= 0.05
+
+
+def test_choose_excludes_current_proxy():
+    pool = ProxyPool(PROXIES, path=None, rnd=random.Random(3))
+    counts = collections.Counter(pool.choose(exclude=PROXIES[1]) for _ in range(3000))
+    assert PROXIES[1] not in counts and set(counts) == {PROXIES[0], PROXIES[2]}
+    pool.report(PROXIES[0], ok=False)
+    pool.report(PROXIES[2], ok=False)
+    assert pool.choose(exclude=PROXIES[1]) is None
+
+
+if __name__ == "__main__":
+    test_latency_percentile()
+    test_budget_caps_extra_load()
+    test_slow_primary_is_hedged()
+    test_fast_primary_is_not_hedged()
+    test_hedge_respects_budget_and_errors()
+    test_queue_time_and_hedge_pool()
+    test_choose_excludes_current_proxy()
+    print("✅ hedge")
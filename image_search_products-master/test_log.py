@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+로그 쓰기 스레드 검사 (종료 시 남은 줄 출력, "Full response:" 줄과 섞이지 않음, --serve 는 로그를 stderr 로)
+
+    python -m pytest test_log.py
+"""
+
+import json
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import run
+from lib.log import level_for, setup_logging, verbosity
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def run_script(code, stdin=""):
+    res = subprocess.run(
+        [sys.executable, "-c", code], cwd=HERE, input=stdin.encode("utf-8"), capture_output=True, timeout=60
+    )
+    assert res.returncode == 0, res.stderr.decode("utf-8", "replace")
+    return res.stdout.decode("utf-8"), res.stderr.decode("utf-8")
+
+
+def test_verbosity():
+    assert verbosity(["run.py", "a.jpg"]) == 0
+    assert verbosity(["run.py", "-v"]) == 1
+    assert verbosity(["run.py", "-vv", "--verbose"]) == 3
+    assert verbosity(["run.py", "-", "-x"]) == 0
+    assert [level_for(v) for v in (0, 1, 2, 3)] == [logging.WARNING, logging.INFO, logging.DEBUG, logging.DEBUG]
+
+
+def test_pending_lines_are_written_on_exit():
+    # 쓰기 스레드는 daemon - 종료할 때 atexit 의 stop() 이 남은 줄을 씀
+    out, _ = run_script(
+        "import logging\n"
+        "from lib.log import setup_logging\n"
+        "setup_logging(1)\n"
+        "log = logging.getLogger('t')\n"
+        "for i in range(2000):\n"
+        "    log.info(f'line {i}')\n"
+        "logging.getLogger('t').debug('hidden')\n"
+    )
+    assert out.splitlines() == [f"line {i}" for i in range(2000)]
+
+
+class SlowStdout(object):
+    """write 마다 잠깐 쉬는 stdout (C# 이 느리게 읽는 pipe) - 다른 스레드의 write 가 끼어들 틈을 만듦"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, text):
+        self.chunks.append(text)
+        time.sleep(0.001)
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+def test_log_lines_never_split_result_lines():
+    root = logging.getLogger()
+    level = root.level
+    setup_logging(1)
+    stdout, sys.stdout = sys.stdout, SlowStdout()
+    stop = threading.Event()
+
+    def spam():
+        n = 0
+        while not stop.is_set():
+            logging.getLogger("spam").info(f"spam {n}")
+            n += 1
+            time.sleep(0.0005)
+
+    thread = threading.Thread(target=spam)
+    thread.start()
+    try:
+        for i in range(100):
+            run.print_full_response({"data": {"imageId": f"img{i}"}})
+            run.print_search_url(f"img{i}", f"https://s.taobao.com/search?imageId=img{i}")
+            run.print_fanout_result("1688", {"status": "ok", "ok": True, "image_id": f"a{i}"})
+    finally:
+        stop.set()
+        thread.join(5)
+        run.flush_logs()
+        out, sys.stdout = sys.stdout, stdout
+        root.setLevel(level)
+
+    lines = "".join(out.chunks).splitlines()
+    full = [json.loads(line[len("Full response: "):]) for line in lines if line.startswith("Full response: ")]
+    assert [r["data"]["imageId"] for r in full] == [f"img{i}" for i in range(100)]
+    fanout = [json.loads(line.split("]: ", 1)[1]) for line in lines if line.startswith("Fanout result [1688]: ")]
+    assert len(fanout) == 100
+    assert len([line for line in lines if line.startswith("🔗 Search URL: https://")]) == 100
+    # 로그 줄은 항상 줄 전체로
+    assert all(line.startswith(("Full response: ", "Fanout result [", "🆔 Image ID: ", "🔗 Search URL: ", "spam "))
+               for line in lines)
+    assert any(line.startswith("spam ") for line in lines)
+
+
+def test_serve_keeps_logs_off_stdout():
+    jobs = [{"id": 1, "path": "run.py"}, {"id": 2, "path": "missing.jpg"}]
+    out, err = run_script(
+        "import logging, sys\n"
+        "sys.argv = ['run.py', '--serve', '-v']\n"
+        "import run\n"
+        "run.setup_stdio()\n"
+        "run.setup_logging(run.verbosity(sys.argv))\n"
+        "class Worker(run.SearchWorker):\n"
+        "    def search(self, path, reload=False):\n"
+        "        logging.getLogger('worker').info(f'searching {path}')\n"
+        "        print('debug print')\n"
+        "        return {'path': path}\n"
+        "run.serve(worker=Worker(cache=False, phash=False))\n",
+        stdin="".join(json.dumps(job) + "\n" for job in jobs),
+    )
+    # stdout 에는 작업 결과 JSON 만
+    responses = [json.loads(line) for line in out.splitlines()]
+    assert [(r["id"], r["ok"]) for r in responses] == [(1, True), (2, False)]
+    assert "searching run.py" in err and "debug print" in err
+
+
+if __name__ == "__main__":
+    test_verbosity()
+    test_pending_lines_are_written_on_exit()
+    test_log_lines_never_split_result_lines()
+    test_serve_keeps_logs_off_stdout()
+    print("✅ log")
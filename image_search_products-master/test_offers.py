@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+1688 검색 결과 페이지 상품 추출 검사
+
+    python test_offers.py            # 검사 + 큰 페이지 추출 시간
+    python -m pytest test_offers.py
+
+data/fixtures/1688/*.html 에 저장한 검색 결과 페이지는 전부 추출되는지 확인한다
+(실제 페이지를 저장해 두면 같이 검사됨).
+"""
+
+import glob
+import json
+import os
+import time
+
+from lib.ali1688.offers import MARKER, extract_offers, find_payload
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "fixtures", "1688")
+
+
+def read_fixture(name: str) -> str:
+    with open(os.path.join(FIXTURES, name), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def build_page(offer_count: int, padding: int = 0) -> str:
+    """offer_count 개 상품 + 앞뒤로 padding 글자의 다른 스크립트가 있는 페이지"""
+    offers = [
+        {
+            "id": 600000000000 + i,
+            "information": {"subject": f"상품 {i} {{\"}}\\"},
+            "tradePrice": {"offerPrice": {"quantityPrices": [{"quantity": "≥2", "valueString": "9.90"}]}},
+            "company": {"name": f"seller {i}"},
+            "image": {"imgUrl": f"https://cbu01.alicdn.com/{i}.jpg"},
+        }
+        for i in range(offer_count)
+    ]
+    payload = json.dumps({"data": {"offerList": offers}}, ensure_ascii=False)
+    filler = "<div>{ x }</div>" * (padding // 16)
+    return f"<html>{filler}<script>{MARKER} = successDataCheck({payload});</script>{filler}</html>"
+
+
+def test_sample_fixture():
+    offers = extract_offers(read_fixture("offerresult_sample.html"))
+    assert [o["offer_id"] for o in offers] == ["642398710245", "703355120981", "598812347001"]
+
+    first = offers[0]
+    assert first["title"] == '夏季新款 {爆款} 纯棉T恤 "宽松" 男女同款'
+    assert first["price_tiers"] == [(2, 12.5), (100, 11.8), (1000, 10.9)]
+    assert first["moq"] == 2
+    assert first["seller"] == "义乌市某某服饰有限公司"
+    assert first["url"] == "https://detail.1688.com/offer/642398710245.html"
+
+    assert offers[1]["title"] == "收纳盒 \\ 桌面整理 } 塑料"
+    assert offers[1]["price_tiers"] == [(1, 3.2)]
+    assert offers[1]["moq"] == 10
+    assert offers[1]["image_url"].endswith("290x290.jpg")
+    assert offers[1]["url"] == "https://detail.1688.com/offer/703355120981.html"
+
+    assert offers[2]["price_tiers"] == [(1, 5.8)]
+    assert offers[2]["seller"] == "深圳某某电子"
+
+
+def test_all_fixtures_extract():
+    for path in glob.glob(os.path.join(FIXTURES, "*.html")):
+        with open(path, "r", encoding="utf-8") as f:
+            html = f.read()
+        offers = extract_offers(html)
+        assert offers, path
+        assert all(o["offer_id"] and o["price_tiers"] for o in offers), path
+
+
+def test_missing_or_truncated_payload():
+    assert extract_offers("<html></html>") == []
+    page = build_page(3)
+    assert find_payload(page[: page.index("]}});")]) is None
+    assert len(extract_offers(page)) == 3
+
+
+if __name__ == "__main__":
+    test_sample_fixture()
+    test_all_fixtures_extract()
+    test_missing_or_truncated_payload()
+
+    page = build_page(60, padding=3 * 1024 * 1024)
+    start = time.perf_counter()
+    for _ in range(20):
+        offers = extract_offers(page)
+    elapsed = (time.perf_counter() - start) / 20 * 1000
+    print(f"📄 {len(page) / 1024 / 1024:.1f} MB 페이지, 상품 {len(offers)}개: {elapsed:.1f} ms")
+    print("✅ offers")
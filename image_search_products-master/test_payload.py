@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+업로드 payload 검사
+
+    python test_payload.py            # 동등성 + 최대 메모리 (tracemalloc)
+    python -m pytest test_payload.py
+"""
+
+import base64
+import json
+import os
+import tempfile
+import tracemalloc
+from urllib.parse import urlencode
+
+from lib import payload
+from lib.ali1688.ali1688 import Ali1688Upload, WorldTaobao
+from lib.ali1688.sign import Sign
+from lib.yiwugo import YiWuGo
+
+IMAGE_SIZE = 4 * 1024 * 1024
+# 원본 대비 최대 메모리 (base64 4/3 배 + percent-encoding 1/16 + 조각 버퍼)
+MAX_PEAK_RATIO = 1.5
+
+
+def old_1688_data(b64: str) -> str:
+    return json.dumps(
+        {
+            "imageBase64": b64,
+            "appName": "searchImageUpload",
+            "appKey": "pvvljh1grxcmaay2vgpe9nb68gg9ueg2",
+        },
+        separators=(",", ":"),
+    )
+
+
+def old_taobao_data(b64: str) -> str:
+    params = json.dumps(
+        {"strimg": b64.rstrip("="), "pcGraphSearch": True, "sortOrder": 0, "tab": "all", "vm": "nv"},
+        separators=(",", ":"),
+    )
+    return json.dumps({"params": params, "appId": "34850"}, separators=(",", ":"), )
+
+
+def uploaders():
+    return [
+        (Ali1688Upload(manual_cookie="token_1700000000000"), old_1688_data),
+        (WorldTaobao(manual_cookie="token_1700000000000"), old_taobao_data),
+    ]
+
+
+def test_form_body_matches_urlencode():
+    for size in (0, 1, 2, 3, 1000, payload.CHUNK_SIZE + 1):
+        image = os.urandom(size)
+        b64 = base64.b64encode(image).decode("ascii")
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            f.write(image)
+        try:
+            for uploader, old_data in uploaders():
+                expected = urlencode({"data": old_data(b64)}).encode("ascii")
+                for source in ({"image": image}, {"b64": b64}, {"filename": f.name}):
+                    assert bytes(uploader.get_data(**source).body) == expected
+            assert bytes(YiWuGo().get_data(f.name)) == urlencode({"code": b64}).encode("ascii")
+        finally:
+            os.remove(f.name)
+
+
+def test_streamed_sign_matches_reference():
+    image = os.urandom(3000)
+    b64 = base64.b64encode(image).decode("ascii")
+    for uploader, old_data in uploaders():
+        t = 1700000000000
+        data = uploader.get_data(image=image, t=t)
+        expected = Sign(backend="reference").sign(f"{uploader.token}&{t}&{uploader.app_key}&{old_data(b64)}")
+        assert uploader.get_sign(data, t) == expected
+        assert data.value() == old_data(b64)
+
+
+def peak_ratio(build, size=IMAGE_SIZE) -> float:
+    image = os.urandom(size)
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        result = build(image)
+        peak = tracemalloc.get_traced_memory()[1] - base
+    finally:
+        tracemalloc.stop()
+    del result
+    return peak / size
+
+
+def test_payload_peak_memory():
+    for uploader, _ in uploaders():
+        ratio = peak_ratio(lambda image: uploader.get_data(image=image, t=1700000000000))
+        assert ratio < MAX_PEAK_RATIO, f"{type(uploader).__name__}: {ratio:.2f}x"
+    ratio = peak_ratio(lambda image: YiWuGo().get_data(None, image=image))
+    assert ratio < MAX_PEAK_RATIO, f"YiWuGo: {ratio:.2f}x"
+
+
+if __name__ == "__main__":
+    test_form_body_matches_urlencode()
+    test_streamed_sign_matches_reference()
+    for uploader, _ in uploaders():
+        ratio = peak_ratio(lambda image: uploader.get_data(image=image, t=1700000000000))
+        print(f"{type(uploader).__name__:>13}: 최대 메모리 {ratio:.2f}x 이미지 크기")
+    test_payload_peak_memory()
+    print("✅ payload == 기존 urlencode(json.dumps(...))")
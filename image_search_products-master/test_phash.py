@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+perceptual hash 색인 검사 (TTL / 크기 제한)
+
+    python -m pytest test_phash.py
+"""
+
+import os
+import tempfile
+
+from lib.phash import HammingIndex, PerceptualIndex
+
+
+def test_hamming_index():
+    index = HammingIndex(max_distance=4)
+    index.add("a", 0b1011)
+    index.add("b", (1 << 63) | 0b1011)
+    assert index.search(0b1001) == [(1, "a"), (2, "b")]
+    assert index.search(0b1001, max_distance=1) == [(1, "a")]
+    assert index.remove("a") and not index.remove("a")
+    assert index.search(0b1001) == [(2, "b")] and len(index) == 1
+
+
+def test_ttl_and_max_entries():
+    with tempfile.TemporaryDirectory() as tmp:
+        for memory in (True, False):
+            index = PerceptualIndex(path=os.path.join(tmp, f"phash_{memory}.sqlite3"), memory=memory,
+                                    ttl=60, max_entries=3)
+            index.add(12345, "search", {"imageId": "a"})
+            assert index.lookup(12345 ^ 1, "search")["result"] == {"imageId": "a"}
+            assert index.lookup(12345, "fanout") is None
+
+            # 만료된 결과는 돌려주지 않음
+            index.ttl = -1
+            assert index.lookup(12345, "search") is None
+            index.ttl = 60
+
+            # 첫 add 에서 초과분 정리
+            for i in range(5):
+                index._puts = 0
+                index.add(1 << (10 + i * 8), "search", {"i": i})
+            assert len(index) == 3
+            assert index.lookup(1 << 42, "search")["result"] == {"i": 4}
+            if memory:
+                # 지운 행은 메모리 색인에서도 빠짐
+                assert len(index.index) == 3
+
+
+def test_evicted_rows_leave_memory_index():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "phash.sqlite3")
+        index = PerceptualIndex(path=path, ttl=60)
+        assert index.max_entries is None
+        index.add(1, "search", {"i": 1})
+        index.ttl = -1
+        index._puts = 0
+        index.add(2, "search", {"i": 2})
+        # 만료된 두 행 모두 삭제 + 메모리 색인에서도 제거
+        assert len(index) == 0 and len(index.index) == 0
+
+        # 다른 프로세스가 지운 행은 lookup 에서 색인에서 뺌
+        index.ttl = 60
+        index.add(3, "search", {"i": 3})
+        other = PerceptualIndex(path=path, memory=False)
+        other._conn().execute("DELETE FROM phashes")
+        assert index.lookup(3, "search") is None and len(index.index) == 0
+
+
+if __name__ == "__main__":
+    test_hamming_index()
+    test_ttl_and_max_entries()
+    test_evicted_rows_leave_memory_index()
+    print("✅ phash")
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+batch 파이프라인 검사 (잘못된 manifest 줄, 작업 목록 예외, backpressure)
+
+    python -m pytest test_pipeline.py
+"""
+
+import contextlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+
+import run
+from lib.pipeline import Pipeline, Stage
+
+
+def test_stage_error_skips_later_stages():
+    seen = []
+
+    def fail(job):
+        if job["n"] == 2:
+            raise ValueError("boom")
+        return job
+
+    def record(job):
+        seen.append(job["n"])
+        return job
+
+    pipeline = Pipeline([Stage("fail", fail, 2), Stage("record", record, 2)], queue_size=2)
+    jobs = {job["n"]: job for job in pipeline.run({"n": n} for n in range(5))}
+    assert sorted(jobs) == [0, 1, 2, 3, 4]
+    assert jobs[2]["error"] == "fail: boom"
+    assert sorted(seen) == [0, 1, 3, 4]
+
+
+def test_queue_size_bounds_jobs_in_flight():
+    fed = []
+    release = threading.Event()
+
+    def items():
+        for n in range(50):
+            fed.append(n)
+            yield {"n": n}
+
+    def slow(job):
+        release.wait(5)
+        return job
+
+    pipeline = Pipeline([Stage("slow", slow, 1)], queue_size=2)
+    out = pipeline.run(items())
+    thread = threading.Thread(target=lambda: list(out), daemon=True)
+    thread.start()
+    time.sleep(0.2)
+    # 작업자 1 + 입력 queue 2 + feeder 가 들고 있는 1
+    assert len(fed) <= 4
+    release.set()
+    thread.join(5)
+    assert len(fed) == 50
+
+
+def test_feeder_error_is_raised_after_drain():
+    def items():
+        yield {"n": 0}
+        yield {"n": 1}
+        raise OSError("manifest 읽기 실패")
+
+    pipeline = Pipeline([Stage("noop", lambda job: job, 2)])
+    got = []
+    try:
+        for job in pipeline.run(items()):
+            got.append(job["n"])
+    except OSError as e:
+        assert "manifest" in str(e)
+    else:
+        raise AssertionError("feeder 예외가 사라짐")
+    assert sorted(got) == [0, 1]
+
+
+def test_bad_manifest_lines_become_error_records():
+    with tempfile.TemporaryDirectory() as tmp:
+        manifest = os.path.join(tmp, "manifest.txt")
+        missing = os.path.join(tmp, "missing.jpg")
+        with open(manifest, "w", encoding="utf-8") as f:
+            f.write("{not json\n")
+            f.write('{"image": "a.jpg"}\n')
+            f.write('{"path": 3}\n')
+            f.write("\n")
+            f.write(json.dumps({"path": missing}) + "\n")
+        out = os.path.join(tmp, "out.jsonl")
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            code = run.run_batch([manifest, "--out", out, "--no-cache", "--no-phash", "--workers", "read=2"])
+        with open(out, encoding="utf-8") as f:
+            records = [json.loads(line) for line in f]
+
+    assert code == 0
+    assert len(records) == 4 and not any(r["ok"] for r in records)
+    errors = sorted(r["error"] for r in records)
+    assert errors[0].startswith("manifest line 1: invalid JSON")
+    assert errors[1].startswith("manifest line 2:") and errors[2].startswith("manifest line 3:")
+    assert errors[3].startswith("read: ")
+    assert [r["path"] for r in records if r["error"].startswith("read: ")] == [missing]
+
+
+def test_run_batch_fails_when_manifest_breaks():
+    def broken(source):
+        yield {"path": "missing-1.jpg"}
+        raise UnicodeDecodeError("utf-8", b"\xff", 0, 1, "invalid start byte")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        out = os.path.join(tmp, "out.jsonl")
+        iter_batch_jobs, run.iter_batch_jobs = run.iter_batch_jobs, broken
+        stdout = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(stdout):
+                code = run.run_batch([tmp, "--out", out, "--no-cache", "--no-phash"])
+        finally:
+            run.iter_batch_jobs = iter_batch_jobs
+        with open(out, encoding="utf-8") as f:
+            records = [json.loads(line) for line in f]
+
+    # 이미 처리한 작업은 기록하고 실패 코드로 종료
+    assert code == 1
+    assert [r["path"] for r in records] == ["missing-1.jpg"]
+    assert "batch 중단" in stdout.getvalue()
+
+
+if __name__ == "__main__":
+    test_stage_error_skips_later_stages()
+    test_queue_size_bounds_jobs_in_flight()
+    test_feeder_error_is_raised_after_drain()
+    test_bad_manifest_lines_become_error_records()
+    test_run_batch_fails_when_manifest_breaks()
+    print("✅ pipeline")
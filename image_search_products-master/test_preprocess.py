@@ -0,0 +1,71 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+업로드 전처리 검사 (EXIF 방향, 긴 변 축소, 작은 JPEG 는 그대로)
+
+    python -m pytest test_preprocess.py
+"""
+
+import io
+import random
+
+from PIL import Image
+
+from lib.preprocess import ORIENTATION, preprocess, variants
+
+
+def jpeg(img, **options) -> bytes:
+    out = io.BytesIO()
+    img.save(out, format="JPEG", **options)
+    return out.getvalue()
+
+
+def noise(width, height) -> Image.Image:
+    rnd = random.Random(0)
+    return Image.frombytes("RGB", (width, height), bytes(rnd.getrandbits(8) for _ in range(width * height * 3)))
+
+
+def test_exif_orientation_applied():
+    # 가로로 저장된 사진 + "90도 돌려서 보여줄 것" (Orientation 6) - 왼쪽 빨강 / 오른쪽 파랑
+    img = Image.new("RGB", (80, 40), (255, 0, 0))
+    img.paste((0, 0, 255), (40, 0, 80, 40))
+    exif = Image.Exif()
+    exif[ORIENTATION] = 6
+    data = jpeg(img, exif=exif.tobytes())
+
+    with Image.open(io.BytesIO(preprocess(data))) as out:
+        assert out.size == (40, 80)
+        # 시계 방향 90도 - 빨강이 위, 파랑이 아래
+        top, bottom = out.getpixel((20, 10)), out.getpixel((20, 70))
+        assert top[0] > 200 and top[2] < 60 and bottom[2] > 200 and bottom[0] < 60
+        assert ORIENTATION not in out.getexif()
+
+    # 작아도 원본 그대로 올리지 않음 (마켓은 Orientation 을 보지 않음)
+    first = next(variants(data, "taobao", ".jpg"))
+    assert first.data != data and first.ext == ".jpg"
+
+
+def test_long_edge_resized():
+    data = jpeg(noise(300, 150).resize((3000, 1500)), quality=95)
+    sizes = []
+    for variant in variants(data, "taobao", ".jpg"):
+        with Image.open(io.BytesIO(variant.data)) as out:
+            sizes.append(out.size)
+        assert variant.saved > 0
+    # taobao 최대 1000px, timeout 재시도용은 0.7 / 0.5 배
+    assert sizes == [(1000, 500), (700, 350), (500, 250)]
+
+
+def test_small_jpeg_passthrough():
+    data = jpeg(noise(64, 64), quality=20)
+    first = next(variants(data, "1688", ".jpeg", b64="cached"))
+    assert first.data == data and first.ext == ".jpeg" and first.saved == 0
+    assert first.source() == {"b64": "cached"}
+
+
+if __name__ == "__main__":
+    test_exif_orientation_applied()
+    test_long_edge_resized()
+    test_small_jpeg_passthrough()
+    print("✅ preprocess")
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+상품 레코드 / 열 단위 묶음 검사
+
+    python test_products.py            # 검사 + 5만 건 메모리
+    python -m pytest test_products.py
+"""
+
+import csv
+import os
+import tempfile
+import tracemalloc
+
+from lib.ali1688.offers import extract_offers
+from lib.products import Product, ProductBatch, products_from_result, read_npz_text
+from test_offers import read_fixture
+
+TAOBAO_RESPONSE = {
+    "ret": ["SUCCESS::调用成功"],
+    "data": {
+        "imageId": "abc",
+        "itemsArray": [
+            {"itemId": 700001, "title": "保温杯", "price": "¥29.90", "shopName": "杯子店", "pic": "//img.alicdn.com/1.jpg"},
+            {"nid": "700002", "raw_title": "水杯", "view_price": "15"},
+        ],
+    },
+}
+# 5만 건이 이 크기 안에 들어가야 함
+MAX_BYTES_50K = 40 * 1024 * 1024
+
+
+def sample_batch() -> ProductBatch:
+    batch = ProductBatch()
+    batch.add_results("a.jpg", {
+        "1688": {"ok": True, "offers": extract_offers(read_fixture("offerresult_sample.html"))},
+        "taobao": {"ok": True, "response": TAOBAO_RESPONSE},
+        "alibaba": {"ok": True, "search_url": "https://www.alibaba.com/"},
+    })
+    return batch
+
+
+def test_products_from_results():
+    products = products_from_result("taobao", {"response": TAOBAO_RESPONSE})
+    assert [p.item_id for p in products] == ["700001", "700002"]
+    assert products[0].price_min == 29.9 and products[0].seller == "杯子店"
+    assert products[0].image_url == "https://img.alicdn.com/1.jpg"
+    assert products[1].url == "https://item.taobao.com/item.htm?id=700002"
+    assert products_from_result("alibaba", {"search_url": "x"}) == []
+
+    batch = sample_batch()
+    assert len(batch) == 5
+    query, first = next(iter(batch))
+    assert query == "a.jpg"
+    assert (first.marketplace, first.price_min, first.price_max, first.moq) == ("1688", 10.9, 12.5, 2)
+    assert batch.row(4).moq == 1 and batch.row(4).seller is None
+
+
+def test_csv_and_npz_round_trip():
+    batch = sample_batch()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "products.csv")
+        batch.save(path)
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            rows = list(csv.DictReader(f))
+        assert [r["item_id"] for r in rows] == [p.item_id for _, p in batch]
+        assert rows[0]["title"] == batch.row(0).title and rows[4]["seller"] == ""
+
+        try:
+            import numpy as np
+        except ImportError:
+            return
+        path = os.path.join(tmp, "products.npz")
+        batch.save(path)
+        with np.load(path) as npz:
+            assert read_npz_text(npz, "title") == batch.title
+            assert read_npz_text(npz, "query") == ["a.jpg"]
+            assert list(npz["price_min"]) == list(batch.price_min)
+
+
+def batch_memory(count: int = 50000) -> int:
+    """count 건 ProductBatch 가 차지하는 메모리 (bytes)"""
+    product = Product("1688", "642398710245", "夏季新款 纯棉T恤 男女同款", 10.9, 12.5, 2, "义乌市某某服饰有限公司",
+                      "https://cbu01.alicdn.com/img/ibank/O1CN01abc_!!2206.jpg",
+                      "https://detail.1688.com/offer/642398710245.html")
+    tracemalloc.start()
+    try:
+        batch = ProductBatch()
+        for i in range(count):
+            # 실제 결과처럼 행마다 다른 문자열
+            product.item_id = str(600000000000 + i)
+            product.title = f"夏季新款 纯棉T恤 {i}"
+            product.url = f"https://detail.1688.com/offer/{product.item_id}.html"
+            batch.append(f"images/{i // 20}.jpg", product)
+        size = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+    assert len(batch) == count
+    return size
+
+
+def test_50k_products_memory():
+    size = batch_memory()
+    assert size < MAX_BYTES_50K, f"{size / 1024 / 1024:.1f} MB"
+
+
+if __name__ == "__main__":
+    test_products_from_results()
+    test_csv_and_npz_round_trip()
+    size = batch_memory()
+    print(f"🛒 상품 5만 건: {size / 1024 / 1024:.1f} MB")
+    print("✅ products")
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+프록시 사전 검사 (정상 / 죽은 / 느린 프록시) - 로컬 가짜 프록시 서버
+
+    python -m pytest test_proxy_check.py
+"""
+
+import asyncio
+import os
+import socket
+import tempfile
+import threading
+
+from lib import proxy_check
+from lib.proxy_pool import ProxyPool
+
+
+class StubProxies(object):
+    """별도 스레드의 이벤트 루프에서 mode 별 가짜 프록시를 띄움 -> {mode: "127.0.0.1:port"}"""
+
+    def __init__(self, *modes, delay=0.3):
+        self.delay = delay
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        self.servers = []
+        self.proxies = {}
+        for mode in modes:
+            server = asyncio.run_coroutine_threadsafe(self._start(mode), self.loop).result(5)
+            self.servers.append(server)
+            self.proxies[mode] = f"127.0.0.1:{server.sockets[0].getsockname()[1]}"
+
+    async def _start(self, mode):
+        async def handle(reader, writer):
+            request = await reader.readuntil(b"\r\n\r\n")
+            assert request.startswith(b"CONNECT ")
+            if mode == "slow":
+                await asyncio.sleep(self.delay)
+            if mode == "hang":
+                # 응답 없이 검사 쪽이 timeout 으로 끊을 때까지 대기
+                await reader.read()
+            elif mode == "auth":
+                writer.write(b"HTTP/1.1 407 Proxy Authentication Required\r\n\r\n")
+            elif mode in ("healthy", "slow"):
+                writer.write(b"HTTP/1.1 200 Connection established\r\n\r\n")
+            # "close": 응답 없이 닫음
+            await writer.drain()
+            writer.close()
+
+        return await asyncio.start_server(handle, "127.0.0.1", 0)
+
+    def close(self):
+        for server in self.servers:
+            self.loop.call_soon_threadsafe(server.close)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(5)
+
+
+def dead_proxy():
+    """아무도 듣지 않는 포트"""
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    return f"127.0.0.1:{port}"
+
+
+def test_classifies_healthy_dead_and_slow():
+    stubs = StubProxies("healthy", "slow", "hang", "auth", "close")
+    dead = dead_proxy()
+    try:
+        proxies = [stubs.proxies["slow"], dead, stubs.proxies["healthy"], stubs.proxies["hang"],
+                   stubs.proxies["auth"], stubs.proxies["close"], stubs.proxies["healthy"]]
+        results = asyncio.run(proxy_check.check_all(proxies, target="example.com:443", timeout=1.0))
+    finally:
+        stubs.close()
+
+    by_proxy = {r["proxy"]: r for r in results}
+    # 같은 프록시는 한 번만 검사
+    assert len(results) == 6
+
+    healthy, slow = by_proxy[stubs.proxies["healthy"]], by_proxy[stubs.proxies["slow"]]
+    assert healthy["ok"] and healthy["error"] is None and healthy["connect_ms"] is not None
+    # 느려도 timeout 안이면 정상 - 대신 빠른 프록시 뒤로
+    assert slow["ok"] and slow["ttfb_ms"] >= 300 > healthy["ttfb_ms"]
+    assert [r["proxy"] for r in results[:2]] == [stubs.proxies["healthy"], stubs.proxies["slow"]]
+
+    assert not by_proxy[dead]["ok"] and by_proxy[dead]["error"].startswith("ConnectionRefusedError")
+    assert by_proxy[dead]["connect_ms"] is None
+    hang = by_proxy[stubs.proxies["hang"]]
+    assert not hang["ok"] and hang["error"] == "timeout" and hang["connect_ms"] is not None
+    assert by_proxy[stubs.proxies["auth"]]["error"] == "HTTP/1.1 407 Proxy Authentication Required"
+    assert by_proxy[stubs.proxies["close"]]["error"] == "empty response"
+    assert not any(r["ok"] for r in results[2:])
+
+
+def test_check_report_excludes_dead_from_pool():
+    stubs = StubProxies("healthy", "slow")
+    dead = dead_proxy()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "proxy_check.json")
+            report = proxy_check.check([dead, stubs.proxies["slow"], stubs.proxies["healthy"]],
+                                       target="example.com:443", timeout=1.0, path=path)
+            assert report["target"] == "example.com:443"
+            loaded = proxy_check.load_results(path)
+            assert loaded == report
+            # 오래된 결과는 무시
+            assert proxy_check.load_results(path, max_age=-1) is None
+    finally:
+        stubs.close()
+
+    pool = ProxyPool([dead, stubs.proxies["slow"], stubs.proxies["healthy"]], path=None)
+    pool.apply_check(loaded, max_age=proxy_check.MAX_AGE)
+    chosen = {pool.choose() for _ in range(200)}
+    assert dead not in chosen
+    assert chosen == {stubs.proxies["slow"], stubs.proxies["healthy"]}
+    assert pool.stats[pool.index[stubs.proxies["slow"]]].latency_ms >= 300
+
+
+if __name__ == "__main__":
+    test_classifies_healthy_dead_and_slow()
+    test_check_report_excludes_dead_from_pool()
+    print("✅ proxy_check")
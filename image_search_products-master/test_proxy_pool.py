@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+프록시 풀 검사
+
+    python -m pytest test_proxy_pool.py
+"""
+
+import collections
+import os
+import random
+import tempfile
+
+from lib.proxy_pool import ProxyPool
+
+PROXIES = [f"10.0.0.{i}:8000" for i in range(1, 51)]
+
+
+def test_choose_prefers_healthy_proxies():
+    pool = ProxyPool(PROXIES, path=None, rnd=random.Random(1))
+    fast, slow = PROXIES[0], PROXIES[1]
+    for _ in range(5):
+        pool.report(fast, ok=True, latency_ms=100)
+        pool.report(slow, ok=True, latency_ms=5000)
+    counts = collections.Counter(pool.choose() for _ in range(20000))
+    assert counts[fast] > counts[slow] * 3
+
+
+def test_failed_and_captcha_proxies_cool_down():
+    pool = ProxyPool(PROXIES[:3], path=None, rnd=random.Random(2))
+    pool.report(PROXIES[0], ok=False)
+    pool.report(PROXIES[1], ok=False, captcha=True)
+    assert {pool.choose() for _ in range(1000)} == {PROXIES[2]}
+    pool.report(PROXIES[2], ok=False)
+    assert pool.choose() is None
+
+
+def test_scores_persist():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "proxy_scores.json")
+        pool = ProxyPool(PROXIES, path=path)
+        pool.report(PROXIES[0], ok=True, latency_ms=250)
+        pool.report(PROXIES[1], ok=False, captcha=True)
+        pool.save()
+
+        loaded = ProxyPool(PROXIES, path=path)
+        assert loaded.stats[0].latency_ms == 250
+        assert loaded.stats[1].captchas == 1
+        assert all(loaded.choose() != PROXIES[1] for _ in range(1000))
+
+
+if __name__ == "__main__":
+    test_choose_prefers_healthy_proxies()
+    test_failed_and_captcha_proxies_cool_down()
+    test_scores_persist()
+    print("✅ proxy pool")
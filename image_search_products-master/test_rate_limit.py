@@ -0,0 +1,172 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+host 별 속도 제한 (token bucket + AIMD) 검사
+
+    python -m pytest test_rate_limit.py
+"""
+
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from lib.rate_limit import BLOCKED, INITIAL_LIMIT, NEUTRAL, OK, HostLimiter, RateLimiter, classify, rate_limiter
+
+
+def test_classify_block_signals():
+    assert classify(200, b'{"ret":["SUCCESS::ok"]}') == OK
+    assert classify(429) == BLOCKED
+    assert classify(503) == BLOCKED
+    assert classify(200, '{"ret":["FAIL_SYS_USER_VALIDATE::哎哟喂,被挤爆啦"]}'.encode("utf-8")) == BLOCKED
+    assert classify(200, b'{"ret":["RGV587_ERROR::SM"]}') == BLOCKED
+
+
+def test_token_bucket_rate():
+    limiter = HostLimiter(rate=20, burst=1, limit=4)
+    start = time.perf_counter()
+    for _ in range(6):
+        limiter.acquire()
+        limiter.release()
+    # burst 1 개 + 나머지 5 개는 초당 20 개 속도
+    assert time.perf_counter() - start >= 5 / 20 * 0.9
+
+
+def test_concurrency_limit():
+    limiter = HostLimiter(rate=1000, burst=100, limit=2)
+    state = {"running": 0, "max": 0}
+    lock = threading.Lock()
+
+    def work():
+        limiter.acquire()
+        with lock:
+            state["running"] += 1
+            state["max"] = max(state["max"], state["running"])
+        time.sleep(0.02)
+        with lock:
+            state["running"] -= 1
+        limiter.release()
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert state["max"] == 2
+
+
+def test_aimd():
+    limiter = HostLimiter(rate=4, limit=8)
+    for _ in range(20):
+        limiter.acquire()
+        limiter.release(OK)
+    increased = limiter.rate
+    assert increased > 4 and limiter.limit > 8
+
+    # 응답이 몰려와도 한 번만 절반으로
+    for _ in range(5):
+        limiter.acquire()
+    for _ in range(5):
+        limiter.release(BLOCKED)
+    assert abs(limiter.rate - increased / 2) < 1e-9
+    assert limiter.blocked == 5
+
+
+def test_limiters_are_per_host():
+    limiters = RateLimiter()
+    assert limiters.get("https://h5api.m.taobao.com/h5/a") is limiters.get("https://h5api.m.taobao.com/h5/b?x=1")
+    assert limiters.get("https://s.1688.com/") is not limiters.get("https://h5api.m.taobao.com/")
+
+
+def test_proxy_gateway_errors_are_neutral():
+    assert classify(502, proxied=True) == NEUTRAL
+    assert classify(504, proxied=True) == NEUTRAL
+    # 프록시를 거쳐도 host 가 보낸 것이 분명한 신호는 차단
+    assert classify(429, proxied=True) == BLOCKED
+    assert classify(500, proxied=True) == BLOCKED
+    assert classify(200, b'{"ret":["RGV587_ERROR::SM"]}', proxied=True) == BLOCKED
+
+
+def test_bad_proxy_does_not_slow_host():
+    from lib.func_txy import request_get
+
+    class BadProxy(BaseHTTPRequestHandler):
+        def do_GET(self):
+            self.send_response(502)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    proxy = ThreadingHTTPServer(("127.0.0.1", 0), BadProxy)
+    threading.Thread(target=proxy.serve_forever, daemon=True).start()
+    url = "http://rate-limit-test.invalid/item"
+    try:
+        limiter = rate_limiter.get(url)
+        rate, limit = limiter.rate, limiter.limit
+        proxies = {"http": f"http://127.0.0.1:{proxy.server_address[1]}"}
+        for _ in range(3):
+            assert request_get(url, proxies=proxies, retry=None).status_code == 502
+        assert (limiter.rate, limiter.limit, limiter.blocked) == (rate, limit, 0)
+    finally:
+        proxy.shutdown()
+
+
+def test_limits_are_per_client():
+    limiters = RateLimiter()
+    url = "https://h5api.m.taobao.com/h5/a"
+    assert limiters.get(url).limit == INITIAL_LIMIT
+    assert limiters.get(url, "aio") is not limiters.get(url)
+    assert limiters.get(url, "aio").limit > INITIAL_LIMIT
+    assert set(limiters.snapshot()) == {"h5api.m.taobao.com", "aio/h5api.m.taobao.com"}
+
+    limiters.configure_client("bulk", limit=300, max_limit=1000)
+    assert limiters.get(url, "bulk").limit == 300 and limiters.get(url, "bulk").max_limit == 1000
+
+
+def test_aio_client_goes_past_sync_limit():
+    from aiohttp import web
+
+    from lib import aio
+
+    state = {"running": 0, "max": 0}
+
+    async def slow(request):
+        state["running"] += 1
+        state["max"] = max(state["max"], state["running"])
+        await asyncio.sleep(0.2)
+        state["running"] -= 1
+        return web.Response(text="ok")
+
+    async def main():
+        app = web.Application()
+        app.router.add_get("/slow", slow)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        client = aio.AsyncClient(limit_per_host=64)
+        try:
+            url = f"http://127.0.0.1:{runner.addresses[0][1]}/slow"
+            await asyncio.gather(*(client.request("GET", url) for _ in range(40)))
+        finally:
+            await client.close()
+            await runner.cleanup()
+
+    asyncio.run(main())
+    assert state["max"] > INITIAL_LIMIT * 2
+
+
+if __name__ == "__main__":
+    test_classify_block_signals()
+    test_token_bucket_rate()
+    test_concurrency_limit()
+    test_aimd()
+    test_limiters_are_per_host()
+    test_proxy_gateway_errors_are_neutral()
+    test_bad_proxy_does_not_slow_host()
+    test_limits_are_per_client()
+    test_aio_client_goes_past_sync_limit()
+    print("✅ rate limit")
@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+결과 채널 프레임 검사
+
+    python -m pytest test_result_channel.py
+"""
+
+import io
+
+from lib.result_channel import ResultChannel, read_frames
+
+
+class Buffer(io.BytesIO):
+    def close(self):
+        # close() 뒤에도 getvalue() 로 확인
+        pass
+
+
+RESPONSE = {"data": {"imageId": "abc"}, "ret": ["SUCCESS::调用成功"], "title": "줄\n바꿈 \"따옴표\" \\u00e9"}
+
+
+def test_frames_round_trip():
+    for fmt in ("ndjson", "lp"):
+        buf = Buffer()
+        channel = ResultChannel(buf, fmt)
+        channel.result("taobao", RESPONSE)
+        channel.send("job", data={"id": 1, "ok": True})
+        channel.close()
+
+        buf = io.BytesIO(buf.getvalue())
+        frames = list(read_frames(buf, fmt))
+        assert [f["type"] for f in frames] == ["result", "job", "end"]
+        assert [f["seq"] for f in frames] == [1, 2, 3]
+        assert frames[0]["data"] == RESPONSE
+
+
+def test_ndjson_frame_is_one_line():
+    buf = io.BytesIO()
+    ResultChannel(buf).result("taobao", RESPONSE)
+    assert buf.getvalue().count(b"\n") == 1
+
+
+if __name__ == "__main__":
+    test_frames_round_trip()
+    test_ndjson_frame_is_one_line()
+    print("✅ result channel")
@@ -0,0 +1,181 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+재시도 정책 (오류 분류 + backoff/jitter) 검사
+
+    python -m pytest test_retry.py
+"""
+
+import json
+import random
+
+import requests
+
+from lib.retry import (
+    FATAL, REFRESH, RETRY, ROTATE, RetryableError, RetryPolicy, classify_exception, classify_ret, classify_status
+)
+
+
+def test_classify():
+    assert classify_exception(requests.exceptions.ProxyError("x")) == ROTATE
+    assert classify_exception(requests.exceptions.ReadTimeout("x")) == ROTATE
+    assert classify_exception(requests.exceptions.ConnectionError("x")) == RETRY
+    assert classify_exception(json.JSONDecodeError("not json", "<html>", 0)) == ROTATE
+    assert classify_exception(requests.exceptions.JSONDecodeError("not json", "<html>", 0)) == ROTATE
+    for error in (requests.exceptions.InvalidURL, requests.exceptions.MissingSchema, requests.exceptions.InvalidHeader):
+        assert classify_exception(error("x")) == FATAL, error
+    assert classify_exception(RetryableError(REFRESH, "not image id")) == REFRESH
+    assert classify_exception(FileNotFoundError("a.jpg")) == FATAL
+    assert classify_exception(requests.exceptions.TooManyRedirects("x")) == FATAL
+    # 알 수 없는 오류 (토큰 발급 실패 등) 는 다시 시도
+    assert classify_exception(Exception("cookie not found _m_h5_tk")) == RETRY
+
+    assert classify_ret({"ret": ["SUCCESS::调用成功"], "data": {"imageId": "abc"}}) is None
+    assert classify_ret({"ret": ["FAIL_SYS_TOKEN_EXOIRED::令牌过期"], "data": {}}) == REFRESH
+    assert classify_ret({"ret": ["FAIL_SYS_USER_VALIDATE::哎哟喂,被挤爆啦"]}) == ROTATE
+    assert classify_ret({"ret": ["SUCCESS::调用成功"], "data": {}}) == RETRY
+    assert classify_status(503) == RETRY and classify_status(200) is None
+
+
+def test_backoff_bounds():
+    policy = RetryPolicy(base_delay=0.5, max_delay=3.0, rnd=random.Random(1))
+    for attempt in range(8):
+        cap = min(3.0, 0.5 * 2 ** attempt)
+        delays = [policy.delay(attempt) for _ in range(200)]
+        assert all(0 <= d <= cap for d in delays)
+        # full jitter - 한 값에 몰리지 않음
+        assert max(delays) - min(delays) > cap / 2
+
+
+def test_call_reuses_state_by_kind():
+    slept = []
+    responses = [
+        {"ret": ["FAIL_SYS_USER_VALIDATE::"]},
+        {"ret": ["FAIL_SYS_TOKEN_EXOIRED::"]},
+        {"ret": ["SUCCESS::"], "data": {"imageId": "abc"}},
+    ]
+    actions = []
+    policy = RetryPolicy(max_attempts=4, sleep=slept.append, rnd=random.Random(0))
+    result = policy.call(
+        lambda attempt: responses[attempt],
+        classify=classify_ret,
+        on_retry=lambda kind, attempt, error: actions.append(kind),
+    )
+    assert result["data"]["imageId"] == "abc"
+    assert actions == [ROTATE, REFRESH]
+    assert len(slept) == 2
+
+
+def test_call_gives_up():
+    calls = []
+
+    def fail(attempt):
+        calls.append(attempt)
+        raise requests.exceptions.ConnectionError("reset")
+
+    policy = RetryPolicy(max_attempts=3, sleep=lambda s: None)
+    try:
+        policy.call(fail)
+    except requests.exceptions.ConnectionError:
+        pass
+    else:
+        assert False, "마지막 오류를 다시 던져야 함"
+    assert calls == [0, 1, 2]
+
+    # FATAL / retry_on 에 없는 분류는 바로 실패
+    calls.clear()
+    try:
+        RetryPolicy(retry_on=(RETRY,), sleep=lambda s: None).call(lambda a: calls.append(a) or open("missing/a.jpg"))
+    except FileNotFoundError:
+        pass
+    assert calls == [0]
+
+    # 응답으로 실패하면 마지막 응답을 돌려줌
+    last = RetryPolicy(max_attempts=2, sleep=lambda s: None).call(lambda a: {"ret": [], "data": {}}, classify=classify_ret)
+    assert last == {"ret": [], "data": {}}
+
+
+def test_on_retry_error_is_an_attempt_failure():
+    calls = []
+
+    def on_retry(kind, attempt, error):
+        # 토큰 발급 실패
+        raise Exception("cookie not found _m_h5_tk")
+
+    responses = [{"ret": ["FAIL_SYS_TOKEN_EXOIRED::"]}, {"ret": ["SUCCESS::"], "data": {"imageId": "abc"}}]
+    policy = RetryPolicy(max_attempts=3, sleep=lambda s: None)
+    result = policy.call(lambda a: calls.append(a) or responses[a], classify=classify_ret, on_retry=on_retry)
+    assert result["data"]["imageId"] == "abc" and calls == [0, 1]
+
+    # 다시 해도 소용없는 오류면 바로 실패
+    def missing(kind, attempt, error):
+        open("missing/cookies.json")
+
+    try:
+        policy.call(lambda a: responses[0], classify=classify_ret, on_retry=missing)
+    except FileNotFoundError:
+        pass
+    else:
+        assert False, "FATAL 오류는 다시 던져야 함"
+
+
+def test_search_taobao_acts_on_failed_host():
+    import run
+
+    class Response(object):
+        cookies = {"_m_h5_tk": "new_1"}
+
+        def __init__(self, body):
+            self.body = body
+            self.status_code = 200
+
+        def json(self):
+            return self.body
+
+    class Worker(run.SearchWorker):
+        def __init__(self, errors_1688, responses):
+            super(Worker, self).__init__(cache=False, phash=False)
+            self.errors_1688 = errors_1688
+            self.responses = responses
+            self.actions = []
+            self.taobao_upload = object()
+
+        def search_1688(self, path):
+            if self.errors_1688:
+                raise self.errors_1688.pop(0)
+            return {"image_id": "a1"}
+
+        def upload_file(self, marketplace, path, upload_func):
+            return Response(self.responses.pop(0)), 0
+
+        def taobao_upload_func(self, upload):
+            return None
+
+        def rotate_taobao_proxy(self):
+            self.actions.append("rotate")
+
+        def renew_taobao_token(self, response_cookies=None):
+            self.actions.append(("renew", response_cookies["_m_h5_tk"]))
+
+    ok = {"ret": ["SUCCESS::调用成功"], "data": {"imageId": "t1"}}
+    # 1688 timeout 은 타오바오 프록시를 바꾸지 않음
+    worker = Worker([requests.exceptions.ReadTimeout("1688")], [ok])
+    result = worker.search_taobao(__file__)
+    assert result["ali1688"] == {"image_id": "a1"} and result["taobao"] == ok
+    assert worker.actions == []
+
+    # 타오바오 토큰 만료는 TAOBAO_TOKEN 을 다시 읽지 않고 토큰 새로 발급
+    worker = Worker([], [{"ret": ["FAIL_SYS_USER_VALIDATE::"]}, {"ret": ["FAIL_SYS_TOKEN_EXOIRED::"]}, ok])
+    worker.search_taobao(__file__)
+    assert worker.actions == ["rotate", ("renew", "new_1")]
+
+
+if __name__ == "__main__":
+    test_classify()
+    test_backoff_bounds()
+    test_call_reuses_state_by_kind()
+    test_call_gives_up()
+    test_on_retry_error_is_an_attempt_failure()
+    test_search_taobao_acts_on_failed_host()
+    print("✅ retry")
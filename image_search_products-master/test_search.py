@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+한 장 검색 (python run.py <img>) 출력 검사 - 업로드 뒤 imageId 검색 페이지까지
+
+    python -m pytest test_search.py
+"""
+
+import contextlib
+import io
+
+import run
+
+RESPONSE = {"ret": ["SUCCESS::调用成功"], "data": {"imageId": "img1"}}
+
+
+class FakeWorker(run.SearchWorker):
+    """네트워크 없이 업로드 결과만 흉내"""
+
+    def __init__(self):
+        super(FakeWorker, self).__init__(cache=False, phash=False)
+        self.searched = []
+
+    def search_taobao(self, path, reload=False, with_1688=True):
+        run.print_full_response(RESPONSE)
+        return {"ali1688": None, "taobao": RESPONSE}
+
+    def get_taobao_upload(self, reload=False):
+        return None
+
+    def taobao_search(self, upload, image_id):
+        self.searched.append(image_id)
+        return type("Res", (), {"url": f"https://s.taobao.com/search?imageId={image_id}"})()
+
+    def search_alibaba(self, path):
+        return {"image_key": "k"}
+
+
+def test_search_prints_image_id_and_url():
+    worker = FakeWorker()
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        result = worker.search(__file__)
+    lines = out.getvalue().splitlines()
+
+    assert worker.searched == ["img1"]
+    assert result["taobao_search_url"] == "https://s.taobao.com/search?imageId=img1"
+    assert lines[0].startswith("Full response: ")
+    assert lines[1:] == ["🆔 Image ID: img1", "🔗 Search URL: https://s.taobao.com/search?imageId=img1"]
+
+
+if __name__ == "__main__":
+    test_search_prints_image_id_and_url()
+    print("✅ search")
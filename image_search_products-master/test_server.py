@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+로컬 검색 서버 요청 검사 (잘못된 입력은 400, 검색 오류는 작업 결과로)
+
+    python -m pytest test_server.py
+"""
+
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import server
+
+
+class FakeService(server.SearchService):
+    """작업자 없이 search_fanout 만 흉내"""
+
+    def __init__(self, error=None):
+        self.size = 1
+        self.deadline = 5
+        self.options = {}
+        self.error = error
+        self.workers = server.queue.Queue()
+        self.workers.put(self)
+        self.executor = server.ThreadPoolExecutor(max_workers=1)
+
+    def search_fanout(self, path, marketplaces, deadline, reload):
+        if self.error:
+            raise self.error
+        return {m: {"status": "ok", "ok": True} for m in marketplaces}
+
+
+def post(port, path, body):
+    data = body if isinstance(body, bytes) else json.dumps(body).encode("utf-8")
+    request = urllib.request.Request(f"http://127.0.0.1:{port}{path}", data=data, method="POST")
+    try:
+        with urllib.request.urlopen(request, timeout=5) as res:
+            return res.status, json.loads(res.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def run_server(service):
+    server.SearchHandler.service = service
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), server.SearchHandler)
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    return httpd
+
+
+def test_invalid_requests_get_400():
+    httpd = run_server(FakeService())
+    port = httpd.server_address[1]
+    try:
+        for path, body in (
+            ("/search", [1, 2]),
+            ("/search", {"image": "not base64!!"}),
+            ("/search", {"path": "a.jpg", "marketplaces": ["ebay"]}),
+            ("/search/batch", [{"path": "a.jpg"}]),
+            ("/search/batch", {"jobs": ["a.jpg"]}),
+            ("/search", b"{broken"),
+        ):
+            status, res = post(port, path, body)
+            assert status == 400 and res["ok"] is False, (path, body, res)
+
+        status, res = post(port, "/search", {"id": 1, "path": __file__, "marketplaces": ["1688"]})
+        assert status == 200 and res["ok"] and res["results"]["1688"]["ok"]
+    finally:
+        httpd.shutdown()
+
+
+def test_search_error_is_reported():
+    service = FakeService(error=RuntimeError("cookie load failed"))
+    result = service.search(server.check_job({"id": 7, "path": __file__}))
+    assert result == {"id": 7, "ok": False, "error": "cookie load failed"}
+
+
+if __name__ == "__main__":
+    test_invalid_requests_get_400()
+    test_search_error_is_reported()
+    print("✅ server")
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+sign 구현 비교
+
+    python test_sign.py            # 동등성 검사 + 속도 측정
+    python -m pytest test_sign.py  # 동등성 검사만
+"""
+
+import base64
+import os
+import random
+import time
+
+from lib.ali1688.sign import Sign, fast_sign
+
+# 무작위 문자열에 섞을 문자 범위 (ASCII, 2바이트, 3바이트, surrogate, BMP 밖)
+CHAR_RANGES = [
+    (0x00, 0x7F),
+    (0x80, 0x7FF),
+    (0x800, 0xD7FF),
+    (0xD800, 0xDFFF),
+    (0xE000, 0xFFFF),
+    (0x10000, 0x10FFFF),
+]
+
+
+def random_text(rnd: random.Random) -> str:
+    chars = []
+    for _ in range(rnd.randint(0, 200)):
+        low, high = rnd.choice(CHAR_RANGES)
+        chars.append(chr(rnd.randint(low, high)))
+    # n() 이 치환하는 문자열도 섞기
+    if rnd.random() < 0.2:
+        chars.insert(rnd.randint(0, len(chars)), r"/\r\n/g")
+    return "".join(chars)
+
+
+def test_sign_known_vectors():
+    reference = Sign(backend="reference")
+    fast = Sign(backend="fast")
+    for text, expected in [
+        ("", "d41d8cd98f00b204e9800998ecf8427e"),
+        ("abc", "900150983cd24fb0d6963f7d28e17f72"),
+        ("한글 中文", None),
+    ]:
+        assert fast.sign(text) == reference.sign(text)
+        if expected:
+            assert fast.sign(text) == expected
+
+
+def test_sign_equivalence(iterations=300, seed=1688):
+    """무작위 문자열 (경계 길이 포함) 에 대해 fast == reference"""
+    rnd = random.Random(seed)
+    reference = Sign(backend="reference")
+    fast = Sign(backend="fast")
+    texts = [random_text(rnd) for _ in range(iterations)]
+    # MD5 블록 경계 (55, 56, 63, 64 ...) 주변 길이
+    texts += ["a" * n for n in range(50, 130)]
+    for text in texts:
+        assert fast.sign(text) == reference.sign(text), repr(text)
+
+
+def test_fast_sign_falls_back_outside_bmp():
+    assert fast_sign("\U0001F600") is None
+    assert Sign(backend="fast").sign("\U0001F600") == Sign(backend="reference").sign("\U0001F600")
+
+
+def benchmark(size=64 * 1024):
+    """upload payload 와 같은 형태 (token&t&appKey&{"imageBase64": ...}) 로 속도 비교"""
+    image_b64 = base64.b64encode(os.urandom(size)).decode("ascii")
+    text = f"token&1700000000000&12574478&{{\"imageBase64\":\"{image_b64}\"}}"
+    for backend in ("reference", "fast"):
+        sign = Sign(backend=backend)
+        start = time.perf_counter()
+        sign.sign(text)
+        elapsed = time.perf_counter() - start
+        print(f"{backend:>9}: {elapsed * 1000:10.2f} ms  ({len(text) / elapsed / 1e6:8.2f} MB/s)")
+
+
+if __name__ == "__main__":
+    test_sign_known_vectors()
+    test_sign_equivalence()
+    test_fast_sign_falls_back_outside_bmp()
+    print("✅ fast sign == reference sign")
+    benchmark()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+빠른 시작 검사 - 한 번 실행하는 경로에서 무거운 모듈을 import 하지 않음 (새 프로세스의 sys.modules 확인)
+
+    python -m pytest test_startup.py
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+# 실제로 쓰는 작업에서만 로드해야 하는 모듈
+HEAVY = ("requests", "urllib3", "sqlite3", "aiohttp", "asyncio", "numpy", "PIL", "ssl", "http.client")
+MARKET_MODULES = ("lib.func_txy", "lib.alibaba", "lib.ali1688", "lib.yiwugo", "lib.taobao_search", "lib.cache", "lib.phash")
+
+
+def loaded_modules(code):
+    """새 파이썬 프로세스에서 code 실행 후 sys.modules 목록"""
+    script = f"import json, sys\n{code}\nsys.stdout.flush()\nsys.__stdout__.write('\\n' + json.dumps(sorted(sys.modules)))\n"
+    res = subprocess.run([sys.executable, "-c", script], cwd=HERE, capture_output=True, timeout=60)
+    assert res.returncode == 0, res.stderr.decode("utf-8", "replace")
+    return set(json.loads(res.stdout.decode("utf-8").splitlines()[-1]))
+
+
+def heavy_in(modules):
+    return sorted(
+        m for m in modules
+        if any(m == name or m.startswith(name + ".") for name in HEAVY + MARKET_MODULES)
+    )
+
+
+def test_import_run_is_light():
+    modules = loaded_modules("import run")
+    assert "run" in modules
+    assert heavy_in(modules) == []
+
+
+def test_one_shot_setup_is_light():
+    # 한 번 실행 경로: stdio/로그/결과 채널 설정 후 작업자 생성까지 (캐시/phash 끔)
+    modules = loaded_modules(
+        "import run\n"
+        "sys.argv = ['run.py', '다운로드.jpg', '--no-cache']\n"
+        "run.setup_logging(run.verbosity(sys.argv))\n"
+        "run.open_result_channel(sys.argv)\n"
+        "run.SearchWorker(cache=False, phash=False, **run.preprocess_options(sys.argv), **run.hedge_options(sys.argv))\n"
+    )
+    assert heavy_in(modules) == []
+
+
+def test_batch_help_is_light():
+    modules = loaded_modules(
+        "import runpy\n"
+        "sys.argv = ['run.py', 'batch', '--help']\n"
+        "try:\n"
+        "    runpy.run_path('run.py', run_name='__main__')\n"
+        "except SystemExit as e:\n"
+        "    assert not e.code, e.code\n"
+    )
+    assert heavy_in(modules) == []
+
+
+if __name__ == "__main__":
+    test_import_run_is_light()
+    test_one_shot_setup_is_light()
+    test_batch_help_is_light()
+    print("✅ startup")
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+타오바오 결과 여러 페이지 동시 요청 검사
+
+    python -m pytest test_taobao_search.py
+"""
+
+import json
+import threading
+import time
+
+from lib.taobao_search import PAGE_SIZE, page_count, parse_items, prefetch_pages
+
+DELAY = 0.05
+
+
+def fake_pages(counts, scores=None):
+    """page -> 상품 목록 (DELAY 초 걸림), 동시에 실행된 최대 요청 수도 기록"""
+    state = {"running": 0, "max_running": 0, "requested": []}
+    lock = threading.Lock()
+
+    def fetch(page):
+        with lock:
+            state["requested"].append(page)
+            state["running"] += 1
+            state["max_running"] = max(state["max_running"], state["running"])
+        # 뒤 페이지가 먼저 끝나도 순서대로 나와야 함
+        time.sleep(DELAY * (1.5 if page % 2 else 1))
+        with lock:
+            state["running"] -= 1
+        count = counts[page - 1] if page <= len(counts) else 0
+        items = [{"nid": f"{page}-{i}"} for i in range(count)]
+        if scores:
+            for item, score in zip(items, scores[page - 1]):
+                item["similarity"] = score
+        return items
+
+    return fetch, state
+
+
+def test_pages_are_fetched_concurrently_and_in_order():
+    fetch, state = fake_pages([PAGE_SIZE] * 5)
+    start = time.perf_counter()
+    pages = list(prefetch_pages(fetch, 5, window=5))
+    elapsed = time.perf_counter() - start
+    assert [page for page, _ in pages] == [1, 2, 3, 4, 5]
+    assert state["max_running"] == 5
+    # 한 페이지씩 받으면 5 * DELAY 이상
+    assert elapsed < DELAY * 3
+
+
+def test_stops_at_empty_page_or_cutoff():
+    fetch, state = fake_pages([PAGE_SIZE, PAGE_SIZE, 0, PAGE_SIZE, PAGE_SIZE, PAGE_SIZE])
+    pages = list(prefetch_pages(fetch, 6, window=2))
+    assert [page for page, _ in pages] == [1, 2]
+    # window 2 - 빈 3 페이지를 확인한 뒤로는 새 페이지를 요청하지 않음
+    assert max(state["requested"]) <= 4
+
+    scores = [[0.9, 0.8], [0.7, 0.4], [0.9]]
+    fetch, _ = fake_pages([2, 2, 1], scores)
+    pages = list(prefetch_pages(fetch, 3, window=3, min_similarity=0.5))
+    assert [[item["nid"] for item in items] for _, items in pages] == [["1-0", "1-1"], ["2-0"]]
+
+
+def test_parse_items_and_budget():
+    config = {"mods": {"itemlist": {"data": {"auctions": [{"nid": "1", "raw_title": "a {b}"}]}}}}
+    html = f"<script>g_page_config = {json.dumps(config)};\ng_srp_loadCss();</script>"
+    assert parse_items(html) == [{"nid": "1", "raw_title": "a {b}"}]
+    assert parse_items(json.dumps(config)) == [{"nid": "1", "raw_title": "a {b}"}]
+    assert parse_items("<html></html>") == []
+    assert page_count(200) == 5
+    assert page_count(200, max_pages=3) == 3
+
+
+if __name__ == "__main__":
+    test_pages_are_fetched_concurrently_and_in_order()
+    test_stops_at_empty_page_or_cutoff()
+    test_parse_items_and_budget()
+    print("✅ taobao search pages")
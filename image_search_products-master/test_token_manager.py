@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+_m_h5_tk 토큰 관리 검사 (만료 시각 파싱, 파일 잠금, invalidate, 백그라운드 갱신) - 네트워크 없이 fetch 흉내
+
+    python -m pytest test_token_manager.py
+"""
+
+import os
+import tempfile
+import threading
+import time
+
+from lib.ali1688.token_manager import TokenManager, _FileLock, token_expires_at
+
+
+class FakeFetch(object):
+    """fetch() 흉내 - 호출마다 새 토큰 (ttls 의 n 번째 값 초 뒤 만료, 다 쓰면 마지막 값)"""
+
+    def __init__(self, ttls=(3600,), delay=0):
+        self.ttls = ttls
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        time.sleep(self.delay)
+        with self._lock:
+            self.calls += 1
+            n = self.calls
+        ttl = self.ttls[min(n, len(self.ttls)) - 1]
+        return {"_m_h5_tk": f"tok{n}_{int((time.time() + ttl) * 1000)}", "_m_h5_tk_enc": f"enc{n}", "cna": "x"}
+
+
+def token(cookies):
+    return cookies["_m_h5_tk"].split("_")[0]
+
+
+def test_token_expires_at():
+    assert token_expires_at({"_m_h5_tk": "abc_1700000000000"}) == 1700000000.0
+    # 토큰 자체에 "_" 가 있어도 마지막 부분이 만료 시각
+    assert token_expires_at({"_m_h5_tk": "a_b_1700000000500"}) == 1700000000.5
+    assert token_expires_at({"_m_h5_tk": "abc_notanumber"}) == 0.0
+    assert token_expires_at({"_m_h5_tk": ""}) == 0.0
+    assert token_expires_at({}) == 0.0
+
+
+def test_cookies_are_shared_through_file():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "tokens.json")
+        fetch = FakeFetch()
+        first = TokenManager("h5api", fetch, path=path, background=False)
+        cookies = first.cookies()
+        assert token(cookies) == "tok1" and set(cookies) == {"_m_h5_tk", "_m_h5_tk_enc"}
+        assert first.cookies() == cookies
+
+        # 다른 프로세스(새 TokenManager)는 파일의 토큰을 그대로 사용
+        second = TokenManager("h5api", fetch, path=path, background=False)
+        assert second.cookies() == cookies
+        assert fetch.calls == 1
+
+        # key 가 다르면 따로 발급
+        assert token(TokenManager("other", fetch, path=path, background=False).cookies()) == "tok2"
+
+
+def test_file_lock_fetches_once():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "locks", "tokens.json")
+        fetch = FakeFetch(delay=0.1)
+        results = []
+
+        def start():
+            results.append(TokenManager("h5api", fetch, path=path, background=False).cookies())
+
+        # 잠금이 없으면 넷 다 빈 파일을 보고 각자 발급
+        threads = [threading.Thread(target=start) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        assert fetch.calls == 1
+        assert len(results) == 4 and all(r == results[0] for r in results)
+
+
+def test_file_lock_blocks_other_holder():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "tokens.json.lock")
+        acquired = threading.Event()
+
+        def other():
+            with _FileLock(path):
+                acquired.set()
+
+        with _FileLock(path):
+            thread = threading.Thread(target=other)
+            thread.start()
+            assert not acquired.wait(0.2)
+        assert acquired.wait(5)
+        thread.join(5)
+
+
+def test_invalidate():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "tokens.json")
+        fetch = FakeFetch()
+        manager = TokenManager("h5api", fetch, path=path, background=False)
+        assert token(manager.cookies()) == "tok1"
+
+        # 거절된 토큰이 파일에도 그대로면 아직 만료 전이어도 새로 발급
+        assert token(manager.invalidate()) == "tok2"
+        assert fetch.calls == 2
+
+        # 만료 응답에 새 토큰이 같이 오면 발급 요청 없이 사용하고 파일에도 저장
+        fresh = {"_m_h5_tk": f"resp_{int((time.time() + 3600) * 1000)}", "_m_h5_tk_enc": "resp_enc"}
+        assert manager.invalidate(fresh) == fresh
+        assert fetch.calls == 2
+        assert TokenManager("h5api", fetch, path=path, background=False).cookies() == fresh
+
+        # 이미 만료된 새 쿠키는 무시하고 발급
+        stale = {"_m_h5_tk": f"old_{int((time.time() - 10) * 1000)}"}
+        assert token(manager.invalidate(stale)) == "tok3"
+
+
+def test_background_refresh():
+    with tempfile.TemporaryDirectory() as tmp:
+        # 첫 토큰은 갱신 기준(만료 60초 전)까지 0.5초 - Timer 는 최소 1초 뒤 실행
+        fetch = FakeFetch(ttls=(60.5, 3600))
+        manager = TokenManager("h5api", fetch, path=os.path.join(tmp, "tokens.json"), refresh_margin=60)
+        try:
+            assert token(manager.cookies()) == "tok1"
+            assert manager._timer is not None and manager._timer.daemon
+
+            deadline = time.time() + 5
+            while fetch.calls < 2 and time.time() < deadline:
+                time.sleep(0.05)
+            assert fetch.calls == 2
+            # 호출자는 발급을 기다리지 않고 미리 갱신된 토큰을 받음
+            assert token(manager.cookies()) == "tok2"
+            assert fetch.calls == 2
+        finally:
+            if manager._timer is not None:
+                manager._timer.cancel()
+
+
+if __name__ == "__main__":
+    test_token_expires_at()
+    test_cookies_are_shared_through_file()
+    test_file_lock_fetches_once()
+    test_file_lock_blocks_other_holder()
+    test_invalidate()
+    test_background_refresh()
+    print("✅ token_manager")